@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+ETL Benchmark: dict records vs compact record types
+
+Story 3.2: Build ETL pipeline for statistics extraction
+
+This script:
+1. Generates synthetic page_stat_data rows (ordered by id_book, start_time)
+2. Measures memory (tracemalloc) and extraction time from a scratch
+   statistics.sqlite3 into dicts vs PageStatColumns (array('q') columns)
+3. Measures session aggregation throughput over both representations
+4. Measures memory of aggregated and transformed sessions as dicts vs
+   the Session / ReadingSessionRecord NamedTuples
+
+Usage:
+    python3 benchmark_etl.py [--rows N] [--books N] [--seed N]
+
+Needs the ETL's imports (psycopg2) but no database connection.
+"""
+
+import argparse
+import gc
+import logging
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from extract_koreader_stats import (  # noqa: E402
+    DataTransformer,
+    KOReaderExtractor,
+    SessionAggregator,
+)
+
+
+# ============================================================================
+# Data Generation
+# ============================================================================
+
+def generate_page_stats(rows: int, books: int, seed: int) -> List[Tuple]:
+    """Synthetic page_stat_data tuples in (id_book, start_time) order"""
+    rng = random.Random(seed)
+    per_book = max(1, rows // books)
+    data = []
+    for book in range(1, books + 1):
+        start_time = 1_700_000_000
+        for page in range(per_book):
+            # Mostly page turns under a minute, occasionally a new session
+            start_time += rng.choice((20, 35, 50, 60, 90, 3600))
+            data.append((book, page % 400 + 1, start_time, rng.randint(5, 120), 400))
+    return data[:rows]
+
+
+# ============================================================================
+# Measurement
+# ============================================================================
+
+def allocated(build: Callable[[], object]) -> Tuple[object, int]:
+    """Run build() under tracemalloc and return (result, bytes still allocated)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    allocated_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, allocated_bytes
+
+
+def timed(run: Callable[[], object], repeat: int = 3) -> float:
+    """Best wall-clock seconds of `repeat` runs (tracemalloc off)"""
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def write_statistics_db(db_path: str, page_stats: List[Tuple], books: int):
+    """Write the rows into a minimal KOReader statistics.sqlite3"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE book (id INTEGER PRIMARY KEY, title TEXT, md5 TEXT)")
+    conn.execute(
+        "CREATE TABLE page_stat_data (id_book INTEGER, page INTEGER, start_time INTEGER, "
+        "duration INTEGER, total_pages INTEGER, UNIQUE (id_book, page, start_time))"
+    )
+    conn.executemany("INSERT INTO book VALUES (?, ?, ?)",
+                     ((book, f"Book {book}", f"md5-{book}") for book in range(1, books + 1)))
+    conn.executemany("INSERT OR IGNORE INTO page_stat_data VALUES (?, ?, ?, ?, ?)", page_stats)
+    conn.commit()
+    conn.close()
+
+
+def extract_dict_rows(extractor: KOReaderExtractor) -> List[Dict]:
+    """The previous representation: one dict per sqlite3.Row"""
+    cursor = extractor.conn.cursor()
+    cursor.execute(*extractor._page_stat_query(None))
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def report(label: str, dict_value: float, compact_value: float, unit: str, higher_is_better: bool = False):
+    if higher_is_better:
+        ratio = compact_value / dict_value
+    else:
+        ratio = dict_value / compact_value
+    print(f"{label:<34} {dict_value:>12.1f} {compact_value:>12.1f} {unit:<8} {ratio:>6.1f}x")
+
+
+# ============================================================================
+# Main
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ETL record representations')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='page_stat_data rows (default: 1000000)')
+    parser.add_argument('--books', type=int, default=50, help='distinct books (default: 50)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed (default: 42)')
+    args = parser.parse_args()
+
+    logger = logging.getLogger('benchmark_etl')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    scratch = tempfile.TemporaryDirectory()
+    db_path = str(Path(scratch.name) / 'statistics.sqlite3')
+    write_statistics_db(db_path, generate_page_stats(args.rows, args.books, args.seed), args.books)
+    extractor = KOReaderExtractor(db_path, logger, snapshot='none')
+    extractor.connect()
+
+    dict_rows, dict_bytes = allocated(lambda: extract_dict_rows(extractor))
+    columns, column_bytes = allocated(extractor.extract_page_stat_data)
+    rows = len(columns)
+    print(f"Rows: {rows}, books: {args.books}\n")
+    print(f"{'':<34} {'dict':>12} {'compact':>12} {'':<8} {'gain':>7}")
+
+    # Raw page stats
+    report('page stats, bytes per row', dict_bytes / rows, column_bytes / rows, 'B')
+    report('extraction, ms', timed(lambda: extract_dict_rows(extractor)) * 1000,
+           timed(extractor.extract_page_stat_data) * 1000, 'ms')
+    extractor.disconnect()
+
+    # Aggregation throughput
+    aggregator = SessionAggregator(30, logger)
+    sessions = aggregator.aggregate(columns)
+    report('aggregation, rows/s (thousands)',
+           rows / timed(lambda: aggregator.aggregate(dict_rows)) / 1000,
+           rows / timed(lambda: aggregator.aggregate(columns)) / 1000, 'k/s', higher_is_better=True)
+    del dict_rows, columns
+
+    # Aggregated sessions
+    session_count = len(sessions)
+    _, dict_bytes = allocated(lambda: [session._asdict() for session in sessions])
+    _, tuple_bytes = allocated(lambda: [type(session)(*session) for session in sessions])
+    report('sessions, bytes per session', dict_bytes / session_count, tuple_bytes / session_count, 'B')
+
+    # Transformed sessions
+    koreader_books = [{'id': book, 'md5': f"md5-{book}"} for book in range(1, args.books + 1)]
+    transformer = DataTransformer('benchmark', logger)
+    transformed, tuple_bytes = allocated(lambda: transformer.transform_sessions(sessions, koreader_books))
+    _, dict_bytes = allocated(lambda: [record._asdict() for record in transformed])
+    # Both figures include the shared datetime/uuid values of each row
+    shared = sum(sys.getsizeof(record.start_time) + sys.getsizeof(record.read_instance_id)
+                 for record in transformed)
+    count = max(1, len(transformed))
+    report('transformed, bytes per session', (dict_bytes + shared) / count, tuple_bytes / count, 'B')
+
+    scratch.cleanup()
+    print(f"\nGenerated at {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}")
+
+
+if __name__ == '__main__':
+    main()
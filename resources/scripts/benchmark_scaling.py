@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+ETL Scaling Benchmark: extract_koreader_stats.py at 10k - 10M page stats
+
+Story 3.2: Build ETL pipeline for statistics extraction
+
+This script:
+1. Generates (or reuses) synthetic statistics.sqlite3 databases at each scale
+   with generate_koreader_stats.py
+2. Runs extraction, aggregation and transformation for each session engine in
+   a fresh process, so peak RSS belongs to that case alone
+3. Optionally loads the result into a scratch schema of a local PostgreSQL
+   (--pg-dsn / BENCHMARK_PG_DSN) with the INSERT or COPY load path; the schema
+   is dropped afterwards
+4. Appends one JSON line per case (stages, commit, host) to the results file,
+   and with --compare prints the change against the latest run of another commit
+
+Usage:
+    python3 benchmark_scaling.py [--scales 10000,100000,1000000] [--engines python,numpy[,sqlite]]
+                                 [--load-method insert|copy] [--pg-dsn DSN] [--results PATH]
+                                 [--cache-dir DIR] [--seed N] [--compare]
+
+Never point --pg-dsn at Neon.tech: the load runs in its own schema, but
+against whatever server the DSN names.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from extract_koreader_stats import (  # noqa: E402
+    LOAD_METHODS,
+    SESSION_ENGINES,
+    BookIdResolver,
+    Config,
+    DataTransformer,
+    KOReaderExtractor,
+    NeonLoader,
+    RunMetrics,
+    book_page_counts,
+    make_session_aggregator,
+)
+from generate_koreader_stats import generate_statistics_db  # noqa: E402
+
+SCRIPTS_DIR = Path(__file__).parent
+DEFAULT_RESULTS = SCRIPTS_DIR.parent / 'benchmarks' / 'etl-scaling.jsonl'
+SCHEMA_SQL = SCRIPTS_DIR / 'create_schema.sql'
+
+
+# ============================================================================
+# Benchmark Case (runs in a child process)
+# ============================================================================
+
+def _quiet_logger() -> logging.Logger:
+    logger = logging.getLogger('benchmark_scaling')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    return logger
+
+
+def _load(pg_dsn: str, books: List[Dict], sessions: List, load_method: str,
+          metrics: RunMetrics, logger: logging.Logger):
+    """Load into a throwaway schema on the local PostgreSQL"""
+    import psycopg2
+
+    schema = f"etl_benchmark_{os.getpid()}"
+    conn = psycopg2.connect(pg_dsn)
+    loader = NeonLoader(logger)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"CREATE SCHEMA {schema}")
+            cursor.execute(f"SET search_path TO {schema}")
+            cursor.execute(SCHEMA_SQL.read_text())
+        conn.commit()
+        loader.attach(conn)
+        if not loader.validate_schema():
+            raise RuntimeError("create_schema.sql did not produce the expected tables")
+
+        if load_method == 'transaction':
+            loader.begin()
+        with metrics.stage('load_books') as stage:
+            if load_method == 'copy':
+                stage['rows'] = loader.copy_books(books)
+            elif load_method == 'transaction':
+                stage['rows'] = loader.load_books_prepared(books)
+            else:
+                stage['rows'] = loader.load_books(books)
+
+        with tempfile.TemporaryDirectory() as scratch:
+            resolver = BookIdResolver(str(Path(scratch) / 'book_ids.json'), pg_dsn, logger)
+            with metrics.stage('resolve_book_ids') as stage:
+                resolver.resolve(loader, (session.file_hash for session in sessions))
+                bound = list(resolver.bind(sessions))
+                stage['rows'] = len(bound)
+
+        with metrics.stage('load_sessions') as stage:
+            if load_method == 'copy':
+                stage['rows'] = loader.copy_reading_sessions(bound)
+            elif load_method == 'transaction':
+                stage['rows'] = loader.load_reading_sessions_prepared(bound)
+                loader.finish()
+            else:
+                stage['rows'] = loader.load_reading_sessions(bound)
+        if loader.load_errors:
+            raise RuntimeError(f"{loader.load_errors} load statement(s) failed")
+    finally:
+        loader.detach()
+        conn.rollback()
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        conn.commit()
+        conn.close()
+
+
+def run_case(db_path: str, engine: str, load_method: str, pg_dsn: Optional[str]) -> Dict:
+    """Time one engine over one database; returns RunMetrics stages"""
+    logger = _quiet_logger()
+    metrics = RunMetrics('benchmark')
+    gap_minutes = Config.SESSION_GAP_MINUTES
+    aggregator = make_session_aggregator(engine, gap_minutes, logger)
+
+    extractor = KOReaderExtractor(db_path, logger, snapshot='none')
+    with metrics.stage('extract') as stage:
+        if not extractor.connect():
+            raise RuntimeError(f"Cannot open {db_path}")
+        koreader_books = extractor.extract_books()
+        if engine == 'numpy':
+            extracted = extractor.extract_page_stat_columns()
+            stage['rows'] = len(extracted['start_time'])
+        elif engine == 'sqlite':
+            extracted = extractor.extract_sessions(gap_minutes)
+            stage['rows'] = len(extracted)
+        else:
+            extracted = extractor.extract_page_stat_data()
+            stage['rows'] = len(extracted)
+        extractor.disconnect()
+
+    book_pages = book_page_counts(koreader_books)
+    with metrics.stage('aggregate') as stage:
+        if engine == 'numpy':
+            aggregated = aggregator.aggregate_columns(extracted, book_pages)
+        else:
+            aggregated = aggregator.aggregate(extracted, book_pages)
+        stage['rows'] = aggregator.records_processed
+    del extracted
+
+    with metrics.stage('transform') as stage:
+        transformer = DataTransformer('benchmark', logger)
+        books = transformer.transform_books(koreader_books)
+        sessions = transformer.transform_sessions(aggregated, koreader_books)
+        stage['rows'] = len(sessions)
+    del aggregated
+
+    if pg_dsn:
+        _load(pg_dsn, books, sessions, load_method, metrics, logger)
+
+    return {
+        'sessions': len(sessions),
+        'wall_seconds': round(time.perf_counter() - metrics.started, 3),
+        'stages': metrics.stages,
+    }
+
+
+# ============================================================================
+# Results
+# ============================================================================
+
+def git_commit() -> str:
+    """Short HEAD hash, suffixed -dirty when tracked files have changes"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPTS_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=SCRIPTS_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f"{commit}-dirty" if dirty else commit
+
+
+def case_key(result: Dict) -> tuple:
+    return result['rows'], result['seed'], result['engine'], result['load_method'], result['loaded']
+
+
+def read_results(path: Path) -> List[Dict]:
+    if not path.exists():
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_result(path: Path, result: Dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(result, sort_keys=True) + '\n')
+
+
+def print_result(result: Dict, baseline: Optional[Dict]):
+    print(f"\n{result['rows']:,} rows, {result['engine']} engine"
+          f"{', ' + result['load_method'] + ' load' if result['loaded'] else ''}: "
+          f"{result['sessions']:,} sessions in {result['wall_seconds']:.2f}s")
+    header = f"  {'stage':<18} {'wall s':>9} {'cpu s':>9} {'rows/s':>12} {'peak RSS MB':>12}"
+    if baseline:
+        header += f"  vs {baseline['commit']}"
+    print(header)
+    for name, stage in result['stages'].items():
+        line = (f"  {name:<18} {stage['wall_seconds']:>9.3f} {stage['cpu_seconds']:>9.3f} "
+                f"{stage['rows_per_second']:>12,.0f} {stage['peak_rss_bytes'] / 2**20:>12.1f}")
+        before = baseline['stages'].get(name) if baseline else None
+        if before and stage['wall_seconds']:
+            line += f"  {before['wall_seconds'] / stage['wall_seconds']:>5.2f}x"
+        print(line)
+
+
+# ============================================================================
+# Main
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ETL at increasing database sizes')
+    parser.add_argument('--scales', default='10000,100000,1000000',
+                        help='comma-separated page_stat_data row counts (default: 10000,100000,1000000)')
+    parser.add_argument('--engines', default='python,numpy',
+                        help=f"comma-separated session engines, of {','.join(SESSION_ENGINES)} "
+                             "(default: python,numpy)")
+    parser.add_argument('--load-method', choices=LOAD_METHODS, default='insert',
+                        help='load path for the PostgreSQL stage (default: insert)')
+    parser.add_argument('--pg-dsn', default=os.getenv('BENCHMARK_PG_DSN'),
+                        help='local PostgreSQL DSN; the load stage is skipped without one '
+                             '(default: BENCHMARK_PG_DSN)')
+    parser.add_argument('--results', default=str(DEFAULT_RESULTS),
+                        help=f"JSON lines file results are appended to (default: {DEFAULT_RESULTS})")
+    parser.add_argument('--cache-dir', default=str(Path(tempfile.gettempdir()) / 'koreader-benchmark'),
+                        help='where generated databases are kept between runs')
+    parser.add_argument('--seed', type=int, default=42, help='generator seed (default: 42)')
+    parser.add_argument('--compare', action='store_true',
+                        help='show the change against the latest result from another commit')
+    args = parser.parse_args()
+
+    scales = [int(scale) for scale in args.scales.split(',')]
+    engines = args.engines.split(',')
+    unknown = set(engines) - set(SESSION_ENGINES)
+    if unknown:
+        parser.error(f"Unknown engine(s): {', '.join(sorted(unknown))}")
+
+    results_path = Path(args.results)
+    history = read_results(results_path)
+    commit = git_commit()
+    host = {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count()}
+    print(f"Commit {commit}, {host['platform']}, Python {host['python']}")
+    if not args.pg_dsn:
+        print("No --pg-dsn / BENCHMARK_PG_DSN - skipping the PostgreSQL load stage")
+
+    for rows in scales:
+        db_path = Path(args.cache_dir) / f"statistics-{rows}-{args.seed}.sqlite3"
+        if not db_path.exists():
+            summary = generate_statistics_db(str(db_path), rows, seed=args.seed)
+            print(f"\nGenerated {db_path} ({summary['books']} books, {summary['days']} days)")
+
+        for engine in engines:
+            # One process per case: peak RSS is a process high-water mark
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                try:
+                    case = pool.submit(run_case, str(db_path), engine, args.load_method, args.pg_dsn).result()
+                except ImportError as e:
+                    print(f"\nSkipping {engine} engine: {e}")
+                    continue
+
+            result = {
+                'rows': rows,
+                'seed': args.seed,
+                'engine': engine,
+                'load_method': args.load_method,
+                'loaded': bool(args.pg_dsn),
+                'commit': commit,
+                'recorded_at': datetime.now(timezone.utc).isoformat(),
+                **host,
+                **case,
+            }
+            baseline = None
+            if args.compare:
+                earlier = [past for past in history
+                           if case_key(past) == case_key(result) and past['commit'] != commit]
+                baseline = earlier[-1] if earlier else None
+            print_result(result, baseline)
+            append_result(results_path, result)
+
+    print(f"\nResults appended to {results_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark: import time and short-circuit runs of the ETL CLIs
+
+Story 3.2: Build ETL pipeline for statistics extraction
+
+This script:
+1. Profiles `import extract_koreader_stats` and `import enrich_hardcover_metadata`
+   with python -X importtime in fresh interpreters and lists the heaviest modules
+2. Checks that the deferred dependencies (psycopg2, numpy, pyarrow, requests,
+   dotenv) are not imported by the import or by any short-circuit run
+3. Times short-circuit runs in fresh processes: --help, an argument error and
+   an ETL run against a backup whose fingerprint is already recorded
+4. Appends one JSON line per run to the results file; with --compare it prints
+   the change against the latest run of another commit
+
+Exits 1 when a deferred dependency is imported or a short-circuit run takes
+longer than --budget-ms (interpreter start-up included), so run it on the Pi.
+
+Usage:
+    python3 benchmark_startup.py [--repeat N] [--budget-ms MS] [--results PATH] [--compare]
+"""
+
+import argparse
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from benchmark_scaling import append_result, git_commit, read_results  # noqa: E402
+from extract_koreader_stats import FingerprintStore, backup_fingerprint  # noqa: E402
+from generate_koreader_stats import generate_statistics_db  # noqa: E402
+
+SCRIPTS_DIR = Path(__file__).parent
+DEFAULT_RESULTS = SCRIPTS_DIR.parent / 'benchmarks' / 'etl-startup.jsonl'
+
+# Only the stages that need them may import these
+DEFERRED_MODULES = ('psycopg2', 'numpy', 'pyarrow', 'requests', 'dotenv')
+
+
+# ============================================================================
+# Measurements
+# ============================================================================
+
+def _run(args: List[str], env: Dict[str, str]) -> Tuple[float, subprocess.CompletedProcess]:
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, *args], cwd=SCRIPTS_DIR, env=env,
+                               capture_output=True, text=True)
+    return (time.perf_counter() - started) * 1000, completed
+
+
+def imported_modules(importtime_output: str) -> List[Tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) from -X importtime output"""
+    modules = []
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def deferred_loaded(modules: List[Tuple[str, int, int]]) -> List[str]:
+    return sorted({name for name, _, _ in modules if name.split('.')[0] in DEFERRED_MODULES})
+
+
+def profile_import(module: str, env: Dict[str, str]) -> Dict:
+    """Cumulative import time of `module` and its heaviest dependencies"""
+    _, completed = _run(['-X', 'importtime', '-c', f"import {module}"], env)
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr}")
+    modules = imported_modules(completed.stderr)
+    total = next(cumulative for name, _, cumulative in modules if name == module)
+    heaviest = sorted((entry for entry in modules if entry[0] != module), key=lambda entry: -entry[1])[:8]
+    return {
+        'import_ms': round(total / 1000, 2),
+        'heaviest_ms': {name: round(self_us / 1000, 2) for name, self_us, _ in heaviest},
+        'deferred_loaded': deferred_loaded(modules),
+    }
+
+
+def time_run(args: List[str], env: Dict[str, str], repeat: int, expect: int) -> Dict:
+    """Median wall time of a CLI invocation, and what it imported"""
+    _, completed = _run(['-X', 'importtime', *args], env)
+    if completed.returncode != expect:
+        raise RuntimeError(f"{' '.join(args)} exited {completed.returncode}, expected {expect}:\n"
+                           f"{completed.stdout}{completed.stderr}")
+    timings = [_run(args, env)[0] for _ in range(repeat)]
+    return {
+        'median_ms': round(statistics.median(timings), 2),
+        'min_ms': round(min(timings), 2),
+        'deferred_loaded': deferred_loaded(imported_modules(completed.stderr)),
+    }
+
+
+def unchanged_backup_env(scratch: Path) -> Dict[str, str]:
+    """Environment for an ETL run whose backup matches the recorded fingerprint"""
+    backup = scratch / 'statistics.sqlite3'
+    generate_statistics_db(str(backup), 2000, seed=1)
+    env = dict(
+        os.environ,
+        NEON_HOST='startup-benchmark.invalid', NEON_USER='etl', NEON_PASSWORD='unused',
+        NEON_DATABASE='bookhelper', DEVICE_ID='startup-benchmark', KOREADER_BACKUP=str(backup),
+        ETL_LOG_PATH=str(scratch / 'etl.log'), ETL_FINGERPRINT_PATH=str(scratch / 'fingerprints.json'),
+    )
+    store = FingerprintStore(env['ETL_FINGERPRINT_PATH'], logging.getLogger('benchmark_startup'))
+    store.record(env['DEVICE_ID'], backup_fingerprint(str(backup)))
+    return env
+
+
+# ============================================================================
+# Main
+# ============================================================================
+
+def print_result(result: Dict, baseline: Optional[Dict], budget_ms: float):
+    print(f"\nPython start-up (-c pass): {result['python_startup_ms']:.1f} ms")
+    for module, profile in result['imports'].items():
+        before = baseline['imports'].get(module) if baseline else None
+        change = f"  (was {before['import_ms']:.1f} ms)" if before else ''
+        print(f"import {module}: {profile['import_ms']:.1f} ms{change}")
+        print('  heaviest: ' + ', '.join(f"{name} {ms:.1f}" for name, ms in profile['heaviest_ms'].items()))
+    print(f"\n  {'run':<40} {'median ms':>10} {'min ms':>8}")
+    for name, run in result['runs'].items():
+        line = f"  {name:<40} {run['median_ms']:>10.1f} {run['min_ms']:>8.1f}"
+        before = baseline['runs'].get(name) if baseline else None
+        if before:
+            line += f"  was {before['median_ms']:.1f}"
+        if run['median_ms'] > budget_ms:
+            line += f"  over {budget_ms:.0f} ms budget"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark import time and short-circuit runs of the ETL CLIs')
+    parser.add_argument('--repeat', type=int, default=9, help='timed runs per case (default: 9)')
+    parser.add_argument('--budget-ms', type=float, default=100.0,
+                        help='maximum median wall time of a short-circuit run (default: 100)')
+    parser.add_argument('--results', default=str(DEFAULT_RESULTS),
+                        help=f"JSON lines file results are appended to (default: {DEFAULT_RESULTS})")
+    parser.add_argument('--compare', action='store_true',
+                        help='show the change against the latest result from another commit')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    commit = git_commit()
+    host = {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count()}
+    print(f"Commit {commit}, {host['platform']}, Python {host['python']}")
+
+    with tempfile.TemporaryDirectory() as scratch:
+        unchanged_env = unchanged_backup_env(Path(scratch))
+        runs = {
+            'extract --help': time_run(['extract_koreader_stats.py', '--help'], env, args.repeat, 0),
+            'extract -m --help': time_run(['-m', 'extract_koreader_stats', '--help'], env, args.repeat, 0),
+            'extract argument error': time_run(['extract_koreader_stats.py', '--engine', 'abacus'],
+                                               env, args.repeat, 2),
+            'extract unchanged backup': time_run(['extract_koreader_stats.py'], unchanged_env, args.repeat, 0),
+            'extract -m unchanged backup': time_run(['-m', 'extract_koreader_stats'],
+                                                    unchanged_env, args.repeat, 0),
+            'enrich --help': time_run(['enrich_hardcover_metadata.py', '--help'], env, args.repeat, 0),
+            'enrich argument error': time_run(['enrich_hardcover_metadata.py', '--bogus'], env, args.repeat, 2),
+        }
+
+    result = {
+        'commit': commit,
+        'recorded_at': datetime.now(timezone.utc).isoformat(),
+        **host,
+        'python_startup_ms': round(statistics.median(_run(['-c', 'pass'], env)[0] for _ in range(args.repeat)), 2),
+        'imports': {module: profile_import(module, env)
+                    for module in ('extract_koreader_stats', 'enrich_hardcover_metadata')},
+        'runs': runs,
+    }
+
+    baseline = None
+    results_path = Path(args.results)
+    if args.compare:
+        earlier = [past for past in read_results(results_path) if past['commit'] != commit]
+        baseline = earlier[-1] if earlier else None
+    print_result(result, baseline, args.budget_ms)
+    append_result(results_path, result)
+    print(f"\nResults appended to {results_path}")
+
+    failures = [f"{name} imported {', '.join(entry['deferred_loaded'])}"
+                for name, entry in (*result['imports'].items(), *runs.items()) if entry['deferred_loaded']]
+    failures += [f"{name} took {run['median_ms']:.1f} ms" for name, run in runs.items()
+                 if run['median_ms'] > args.budget_ms]
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
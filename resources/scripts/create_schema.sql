@@ -11,6 +11,7 @@
 -- - book_editions: Physical/format edition tracking for owned copies
 -- - reading_sessions: Fact table for reading events (ebook + audiobook)
 -- - sync_status: ETL synchronization tracking
+-- - reading_daily_rollups: Per-day reading totals, maintained by the ETL
 -- - Views: Computed aggregations for multi-source analytics
 --
 -- Key Features:
@@ -362,15 +363,65 @@ CREATE TABLE IF NOT EXISTS sync_status (
   sync_duration_seconds INT,
   next_scheduled_sync TIMESTAMP,
   sync_mode VARCHAR(50) DEFAULT 'incremental',
+  run_metrics JSONB,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Added after the initial release; brings existing databases up to date
+ALTER TABLE sync_status ADD COLUMN IF NOT EXISTS run_metrics JSONB;
+
 COMMENT ON TABLE sync_status IS 'ETL synchronization tracking for incremental updates. Sources: koreader, hardcover_books, hardcover_activities, hardcover_editions, kindle, audible.';
 COMMENT ON COLUMN sync_status.source_name IS 'Data source identifier (koreader, hardcover_books, etc.). Source: ETL.';
 COMMENT ON COLUMN sync_status.last_sync_cursor IS 'Cursor/bookmark for incremental queries (max timestamp, last_id, offset). Source: ETL.';
 COMMENT ON COLUMN sync_status.sync_status IS 'Status: pending, in_progress, success, partial_success, failed. Source: ETL.';
 COMMENT ON COLUMN sync_status.sync_mode IS 'Type of sync: full_refresh, incremental, or validation. Source: ETL.';
+COMMENT ON COLUMN sync_status.run_metrics IS 'Per-stage wall time, CPU time, rows/sec and peak RSS of the last run. Source: ETL.';
+
+-- ============================================================================
+-- TABLE 7: reading_daily_rollups (Daily Reading Totals)
+-- ============================================================================
+-- Purpose: Pre-aggregated reading_sessions per day for heatmaps and yearly totals
+-- Strategy: The ETL recomputes only the days touched by each session batch, in
+--           the same transaction as the sessions; a session counts on its start day
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS reading_daily_rollups (
+  day DATE NOT NULL,
+  book_id INT NOT NULL REFERENCES books(book_id) ON DELETE CASCADE,
+  device VARCHAR(50) NOT NULL,
+  media_type VARCHAR(20) NOT NULL,
+  minutes_read INT NOT NULL,
+  pages_read INT,
+  session_count INT NOT NULL,
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (day, book_id, device, media_type)
+);
+
+CREATE INDEX IF NOT EXISTS idx_reading_daily_rollups_book_id ON reading_daily_rollups(book_id);
+
+-- Backfill from existing sessions: every day is recomputed with the ETL's
+-- statement, so re-running the script repairs stale rows and only rewrites
+-- the ones that changed
+INSERT INTO reading_daily_rollups (day, book_id, device, media_type, minutes_read, pages_read, session_count)
+SELECT start_time::date, book_id, device, COALESCE(media_type, 'ebook'),
+       SUM(duration_minutes), SUM(pages_read), COUNT(*)
+FROM reading_sessions
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (day, book_id, device, media_type) DO UPDATE SET
+    minutes_read = EXCLUDED.minutes_read,
+    pages_read = EXCLUDED.pages_read,
+    session_count = EXCLUDED.session_count,
+    updated_at = CURRENT_TIMESTAMP
+WHERE (reading_daily_rollups.minutes_read, reading_daily_rollups.pages_read,
+       reading_daily_rollups.session_count)
+    IS DISTINCT FROM (EXCLUDED.minutes_read, EXCLUDED.pages_read, EXCLUDED.session_count);
+
+COMMENT ON TABLE reading_daily_rollups IS 'Daily reading totals per book, device and media type. Read this instead of aggregating reading_sessions for calendars and yearly totals. Sources: Computed from reading_sessions by the ETL.';
+COMMENT ON COLUMN reading_daily_rollups.day IS 'Calendar day of the sessions start_time (as stored, UTC). Source: Computed.';
+COMMENT ON COLUMN reading_daily_rollups.minutes_read IS 'Sum of duration_minutes of the day''s sessions. Source: Computed.';
+COMMENT ON COLUMN reading_daily_rollups.pages_read IS 'Sum of pages_read (NULL for audiobook only days). Source: Computed.';
+COMMENT ON COLUMN reading_daily_rollups.session_count IS 'Number of sessions started that day. Source: Computed.';
 
 -- ============================================================================
 -- COMPUTED VIEWS FOR MULTI-SOURCE AGGREGATION
@@ -11,7 +11,7 @@ Architecture:
 - HardcoverExtractor: Query Hardcover GraphQL API for personal library
 - DataTransformer: Map Hardcover fields to Neon.tech schema
 - NeonEnricher: Insert/update books, authors, publishers with conflict resolution
-- Structured logging with file rotation
+- Structured JSON logging, written and rotated by a background thread
 - Dry-run mode for safe testing
 
 Author: BookHelper Development Team
@@ -28,13 +28,14 @@ from datetime import datetime
 from dataclasses import dataclass, asdict
 import re
 
+from etl_imports import LazyModule
+
+# Imported on first use: --help, argument errors and configuration errors
+# exit without loading requests or psycopg2
 try:
-    import requests
-    import psycopg2
-    from psycopg2 import pool
-    from psycopg2.extras import execute_values, RealDictCursor
-    from dotenv import load_dotenv
-    from difflib import SequenceMatcher
+    requests = LazyModule('requests')
+    psycopg2 = LazyModule('psycopg2')
+    dotenv = LazyModule('dotenv')
 except ImportError as e:
     print(f"ERROR: Missing required dependency: {e}")
     print("Install with: pip3 install requests psycopg2-binary python-dotenv")
@@ -51,7 +52,6 @@ class Config:
     # Hardcover API
     hardcover_api_key: str
     hardcover_endpoint: str
-    hardcover_user_id: Optional[int] = None
 
     # Neon.tech Database
     neon_host: str
@@ -60,9 +60,13 @@ class Config:
     neon_database: str
     neon_port: int = 5432
 
+    # Optional: resolved from the API token when unset
+    hardcover_user_id: Optional[int] = None
+
     # Logging
     log_dir: str = "/home/alexhouse/logs"
     log_file: str = "hardcover-enrichment.log"
+    log_debug_per_second: int = 20
 
     # Matching thresholds
     fuzzy_match_threshold: float = 0.85
@@ -71,7 +75,7 @@ class Config:
     def load_from_env(cls, env_file: str = "/home/alexhouse/.env.hardcover") -> 'Config':
         """Load configuration from environment file"""
         if os.path.exists(env_file):
-            load_dotenv(env_file)
+            dotenv.load_dotenv(env_file)
             logging.info(f"Loaded configuration from {env_file}")
         else:
             logging.warning(f"Environment file not found: {env_file}, using system environment variables")
@@ -87,6 +91,7 @@ class Config:
                 neon_database=os.getenv('NEON_DATABASE', 'neondb'),
                 neon_port=int(os.getenv('NEON_PORT', '5432')),
                 log_dir=os.getenv('LOG_DIR', '/home/alexhouse/logs'),
+                log_debug_per_second=int(os.getenv('LOG_DEBUG_PER_SECOND', '20')),
                 fuzzy_match_threshold=float(os.getenv('FUZZY_MATCH_THRESHOLD', '0.85'))
             )
         except (ValueError, TypeError) as e:
@@ -99,37 +104,42 @@ class Config:
 # ============================================================================
 
 def setup_logging(config: Config, verbose: bool = False) -> logging.Logger:
-    """Configure structured logging with file rotation"""
+    """
+    Configure structured logging with file rotation. The per-book loop only
+    queues records; a QueueListener thread formats them, writes the JSON log
+    file and the console, and rotates the file. DEBUG is rate-limited per
+    call site.
+    """
     os.makedirs(config.log_dir, exist_ok=True)
     log_path = os.path.join(config.log_dir, config.log_file)
 
     # Create logger
     logger = logging.getLogger('hardcover_enrichment')
     logger.setLevel(logging.DEBUG if verbose else logging.INFO)
+    if logger.handlers:
+        return logger
 
-    # File handler with rotation
     from logging.handlers import RotatingFileHandler
+    from etl_logging import JsonFormatter, start_queue_logging
+
+    # File handler with rotation (JSON lines)
     file_handler = RotatingFileHandler(
         log_path,
         maxBytes=10 * 1024 * 1024,  # 10 MB
         backupCount=7
     )
     file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(JsonFormatter())
 
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.DEBUG if verbose else logging.INFO)
-
-    # Formatter
-    formatter = logging.Formatter(
+    console_handler.setFormatter(logging.Formatter(
         '[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
+    ))
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    start_queue_logging(logger, (file_handler, console_handler), config.log_debug_per_second)
 
     return logger
 
@@ -356,6 +366,7 @@ class FuzzyMatcher:
         """Calculate similarity ratio between two strings"""
         if not a or not b:
             return 0.0
+        from difflib import SequenceMatcher
         return SequenceMatcher(None, a.lower().strip(), b.lower().strip()).ratio()
 
     @staticmethod
@@ -471,6 +482,7 @@ class NeonEnricher:
 
     def _init_connection_pool(self):
         """Initialize PostgreSQL connection pool"""
+        from psycopg2 import pool
         try:
             self.conn_pool = pool.SimpleConnectionPool(
                 1,  # minconn
@@ -510,6 +522,7 @@ class NeonEnricher:
             self.logger.info("[DRY-RUN] Would fetch existing books from database")
             return []
 
+        from psycopg2.extras import RealDictCursor
         conn = self.get_connection()
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
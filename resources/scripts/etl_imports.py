@@ -0,0 +1,34 @@
+"""
+Deferred imports shared by extract_koreader_stats.py and
+enrich_hardcover_metadata.py.
+
+Both scripts bind their heavy dependencies (psycopg2, numpy, pyarrow,
+requests) to LazyModule stand-ins at import time, so --help, argument
+errors and runs that end early never load them.
+
+Deploy this file next to the scripts: both import it at startup.
+"""
+
+import importlib
+import sys
+from importlib.machinery import PathFinder
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+    Raises ImportError up front if the module is not installed, so optional
+    dependencies can still be probed with try/except at import time.
+    """
+
+    _module = None
+
+    def __init__(self, name: str):
+        if name not in sys.modules and PathFinder.find_spec(name) is None:
+            raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+        self._name = name
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
@@ -0,0 +1,146 @@
+"""
+Logging shared by extract_koreader_stats.py and enrich_hardcover_metadata.py.
+
+The scripts' threads only queue records. A QueueListener thread formats
+them and writes the JSON log file and the console, and rotates the file,
+so none of that lands in the pipeline's timings. DEBUG is rate-limited per
+call site before it is queued. Worker processes queue their records back
+to a listener in the parent, which hands them to the same handlers.
+
+Deploy this file next to the scripts: both import it when they set up
+logging.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Sequence, Tuple
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time (UTC), level, logger, thread and message"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            entry['suppressed'] = suppressed
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DebugRateLimiter(logging.Filter):
+    """
+    Let at most `per_second` DEBUG records per call site through each
+    second; the rest are dropped before they are queued. The next record
+    let through from that call site carries the number dropped as
+    `suppressed`. INFO and above always pass, as does everything when
+    `per_second` is 0.
+    """
+
+    def __init__(self, per_second: int):
+        super().__init__()
+        self.per_second = per_second
+        # (pathname, lineno) -> [window start, passed in window, dropped since last passed]
+        self._sites: Dict[Tuple[str, int], List] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.per_second <= 0:
+            return True
+        with self._lock:
+            site = self._sites.setdefault((record.pathname, record.lineno), [record.created, 0, 0])
+            if record.created - site[0] >= 1.0:
+                site[0], site[1] = record.created, 0
+            if site[1] >= self.per_second:
+                site[2] += 1
+                return False
+            site[1] += 1
+            record.suppressed, site[2] = site[2], 0
+        return True
+
+
+class RecordQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves the formatting to the listener's handlers.
+
+    The stdlib prepare() formats the record here and folds the traceback
+    into the message, which would lose the JSON log's 'exception' field.
+    This one only merges the arguments (they may be mutated before the
+    listener gets to them) and turns the traceback into text, so the record
+    can also be pickled to another process.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def start_queue_logging(logger: logging.Logger, handlers: Sequence[logging.Handler],
+                        debug_per_second: int) -> QueueListener:
+    """
+    Route `logger` through a queue to a QueueListener thread that writes to
+    `handlers`, and stop that thread (writing out anything still queued) at
+    exit.
+    """
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    queue_handler = RecordQueueHandler(records)
+    queue_handler.addFilter(DebugRateLimiter(debug_per_second))
+    queue_handler.listener = listener
+    logger.addHandler(queue_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def listen_for_workers(logger: logging.Logger) -> QueueListener:
+    """
+    Start a listener for records that worker processes queue with
+    init_worker_logging(), and hand them to the handlers behind `logger`.
+    Pass `listener.queue` to the workers, and stop the listener once they
+    have exited.
+    """
+    import multiprocessing
+
+    handlers: List[logging.Handler] = []
+    for handler in logger.handlers:
+        listener = getattr(handler, 'listener', None)
+        handlers.extend(listener.handlers if listener else [handler])
+    listener = QueueListener(multiprocessing.Queue(), *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def init_worker_logging(name: str, records, debug_per_second: int):
+    """
+    Process pool initializer: send the `name` logger's records to the
+    parent's listen_for_workers() queue. A forked worker inherits the
+    parent's queue handler but not its listener thread, so that handler is
+    replaced.
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.DEBUG)
+    logger.handlers = []
+    queue_handler = RecordQueueHandler(records)
+    queue_handler.addFilter(DebugRateLimiter(debug_per_second))
+    logger.addHandler(queue_handler)
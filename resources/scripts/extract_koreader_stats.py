@@ -13,7 +13,9 @@ This script:
 6. Logs all operations with timestamps and record counts
 
 Usage:
-    python3 extract_koreader_stats.py [--dry-run]
+    python3 extract_koreader_stats.py [--dry-run] [--incremental] [--stream | --pipeline]
+                                      [--engine {python,numpy,sqlite}] [--load-method {insert,copy,transaction}]
+                                      [--force] [--outbox | --flush-only] [--manifest PATH] [--watch]
 
 Environment Variables (required):
     NEON_HOST: Neon.tech PostgreSQL hostname
@@ -24,22 +26,86 @@ Environment Variables (required):
 Optional:
     KOREADER_BACKUP: Path to statistics.sqlite3 (default: /home/alexhouse/backups/koreader-statistics/statistics.sqlite3)
     ETL_LOG_PATH: Path for log file (default: /home/alexhouse/logs/etl.log)
+    ETL_LOG_BACKUP_DAYS: Daily rotated log files kept (default: 7)
+    ETL_LOG_DEBUG_PER_SECOND: DEBUG records written per call site and second; 0 for all (default: 20)
     DEVICE_ID: Device identifier (default: boox-palma-2)
     SESSION_GAP_MINUTES: Gap threshold for session aggregation (default: 30)
+    ETL_BATCH_SIZE: Rows per fetchmany()/insert batch in --stream mode (default: 1000)
+    ETL_QUEUE_SIZE: Batches buffered between --pipeline stages (default: 8)
+    SESSION_ENGINE: Session aggregation engine, python, numpy or sqlite (slower; default: python)
+    ETL_LOAD_METHOD: Neon.tech load path, insert, copy or transaction (default: insert)
+    KOREADER_MANIFEST: JSON list of {"device_id", "backup"} entries for multi-device runs
+    ETL_WORKERS: Max worker processes and pooled Neon.tech connections (default: 4)
+    ETL_SNAPSHOT: Snapshot statistics.sqlite3 before extraction: file, memory or none (default: file)
+    ETL_SQLITE_MMAP_SIZE: SQLite mmap_size in bytes for file reads (default: 268435456)
+    ETL_FINGERPRINT_PATH: Per-device backup fingerprints used to skip unchanged runs
+                          (default: /home/alexhouse/etl/fingerprints.json)
+    ETL_OUTBOX_PATH: Local SQLite spool for --outbox / --flush-only (default: /home/alexhouse/etl/outbox.sqlite3)
+    ETL_OUTBOX_RETENTION_DAYS: Days delivered outbox rows are kept (default: 7)
+    ETL_BOOK_ID_CACHE_PATH: Local file_hash -> Neon.tech book_id cache
+                            (default: /home/alexhouse/etl/book_ids.json)
+    ETL_SESSION_KEYS_PATH: Local set of reading_sessions already in Neon.tech, per device
+                           (default: /home/alexhouse/etl/session_keys.bin)
+    ETL_WATCH_DEBOUNCE_SECONDS: --watch runs once the backup has been quiet this long (default: 5)
+    ETL_WATCH_RETRY_SECONDS: --watch retries a failed run after this long without a new backup
+                             (default: 300)
+    ETL_CONNECT_RETRIES: Extra Neon.tech connection attempts while the compute wakes (default: 5)
+    ETL_CONNECT_BACKOFF_SECONDS: Base of the jittered exponential retry backoff (default: 1)
+    ETL_METRICS_PATH: JSON file with the last run's per-stage metrics
+                      (default: /home/alexhouse/etl/metrics.json)
+    ETL_PROMETHEUS_TEXTFILE: node_exporter textfile-collector .prom file for the same metrics (default: off)
+    ETL_PARQUET_PATH: Directory of the local Parquet cache of page stats and sessions, partitioned
+                      by device and month; needs pyarrow (default: off)
 """
 
 import sqlite3
-import psycopg2
-from psycopg2.extras import execute_values
 import logging
 import sys
 import os
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 from pathlib import Path
 import argparse
+import time
+import random
 from uuid import uuid4
-from typing import List, Dict, Tuple, Optional
+from typing import Callable, List, Dict, Tuple, Optional, Iterable, Iterator, Mapping, NamedTuple
+from array import array
 import json
+import io
+import tempfile
+import hashlib
+import threading
+import resource
+import select
+import signal
+import struct
+from contextlib import contextmanager
+import queue
+from itertools import chain, islice
+from bisect import bisect_left
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+from etl_imports import LazyModule
+
+# Imported on first use: --help, argument errors and runs that end early
+# (unchanged backup, nothing to flush) never load psycopg2, numpy or pyarrow
+psycopg2 = LazyModule('psycopg2')
+
+try:
+    np = LazyModule('numpy')
+except ImportError:  # Optional: only required for SESSION_ENGINE=numpy
+    np = None
+
+try:
+    pa = LazyModule('pyarrow')
+except ImportError:  # Optional: only required for ETL_PARQUET_PATH
+    pa = None
+
+
+def execute_values(cursor, sql: str, argslist, **kwargs):
+    """psycopg2.extras.execute_values, imported on first use"""
+    from psycopg2.extras import execute_values as _execute_values
+    return _execute_values(cursor, sql, argslist, **kwargs)
 
 
 # ============================================================================
@@ -62,8 +128,45 @@ class Config:
         'ETL_LOG_PATH',
         '/home/alexhouse/logs/etl.log'
     )
+    LOG_BACKUP_DAYS = int(os.getenv('ETL_LOG_BACKUP_DAYS', '7'))
+    LOG_DEBUG_PER_SECOND = int(os.getenv('ETL_LOG_DEBUG_PER_SECOND', '20'))
     DEVICE_ID = os.getenv('DEVICE_ID', 'boox-palma-2')
     SESSION_GAP_MINUTES = int(os.getenv('SESSION_GAP_MINUTES', '30'))
+    BATCH_SIZE = int(os.getenv('ETL_BATCH_SIZE', '1000'))
+    QUEUE_SIZE = int(os.getenv('ETL_QUEUE_SIZE', '8'))
+    SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'python')
+    LOAD_METHOD = os.getenv('ETL_LOAD_METHOD', 'insert')
+    KOREADER_MANIFEST = os.getenv('KOREADER_MANIFEST')
+    ETL_WORKERS = int(os.getenv('ETL_WORKERS', '4'))
+    SNAPSHOT_MODE = os.getenv('ETL_SNAPSHOT', 'file')
+    SQLITE_MMAP_SIZE = int(os.getenv('ETL_SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+    FINGERPRINT_PATH = os.getenv(
+        'ETL_FINGERPRINT_PATH',
+        '/home/alexhouse/etl/fingerprints.json'
+    )
+    OUTBOX_PATH = os.getenv(
+        'ETL_OUTBOX_PATH',
+        '/home/alexhouse/etl/outbox.sqlite3'
+    )
+    OUTBOX_RETENTION_DAYS = int(os.getenv('ETL_OUTBOX_RETENTION_DAYS', '7'))
+    BOOK_ID_CACHE_PATH = os.getenv(
+        'ETL_BOOK_ID_CACHE_PATH',
+        '/home/alexhouse/etl/book_ids.json'
+    )
+    SESSION_KEYS_PATH = os.getenv(
+        'ETL_SESSION_KEYS_PATH',
+        '/home/alexhouse/etl/session_keys.bin'
+    )
+    WATCH_DEBOUNCE_SECONDS = float(os.getenv('ETL_WATCH_DEBOUNCE_SECONDS', '5'))
+    WATCH_RETRY_SECONDS = float(os.getenv('ETL_WATCH_RETRY_SECONDS', '300'))
+    CONNECT_RETRIES = int(os.getenv('ETL_CONNECT_RETRIES', '5'))
+    CONNECT_BACKOFF_SECONDS = float(os.getenv('ETL_CONNECT_BACKOFF_SECONDS', '1'))
+    METRICS_PATH = os.getenv(
+        'ETL_METRICS_PATH',
+        '/home/alexhouse/etl/metrics.json'
+    )
+    PROMETHEUS_TEXTFILE = os.getenv('ETL_PROMETHEUS_TEXTFILE')
+    PARQUET_PATH = os.getenv('ETL_PARQUET_PATH')
 
     @classmethod
     def validate(cls) -> bool:
@@ -80,23 +183,29 @@ class Config:
 # ============================================================================
 
 def setup_logging(log_path: str, dry_run: bool = False) -> logging.Logger:
-    """Configure structured logging with file and console handlers"""
+    """
+    Configure logging: JSON lines to a file rotated at midnight and INFO and
+    above to stdout. Callers only queue records; a QueueListener thread does
+    the formatting, the disk and journald writes and the rotation, so none of
+    it lands in the per-batch timings. DEBUG is rate-limited per call site.
+    """
 
     # Ensure log directory exists
     Path(log_path).parent.mkdir(parents=True, exist_ok=True)
 
     logger = logging.getLogger('etl_koreader')
     logger.setLevel(logging.DEBUG)
+    if logger.handlers:
+        # Already configured by an earlier run in this process (--watch)
+        return logger
+
+    from logging.handlers import TimedRotatingFileHandler
+    from etl_logging import JsonFormatter, start_queue_logging
 
-    # File handler (detailed)
-    file_handler = logging.FileHandler(log_path)
+    # File handler (detailed, structured)
+    file_handler = TimedRotatingFileHandler(log_path, when='midnight', backupCount=Config.LOG_BACKUP_DAYS)
     file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter(
-        '[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
+    file_handler.setFormatter(JsonFormatter())
 
     # Console handler (info and above)
     console_handler = logging.StreamHandler(sys.stdout)
@@ -105,39 +214,216 @@ def setup_logging(log_path: str, dry_run: bool = False) -> logging.Logger:
         '[%(levelname)s] %(message)s'
     )
     console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+
+    start_queue_logging(logger, (file_handler, console_handler), Config.LOG_DEBUG_PER_SECOND)
 
     return logger
 
 
+# ============================================================================
+# Record Types
+# ============================================================================
+# Rows and sessions travel between stages as NamedTuples (a tuple per record,
+# no per-instance dict) and raw page stats as array('q') columns. The records
+# also accept record['field'] so stages and tests can pass plain dicts too.
+
+def _field_getitem(record: tuple, key):
+    """record['field'] as well as record[index]"""
+    if isinstance(key, str):
+        try:
+            return getattr(record, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    return tuple.__getitem__(record, key)
+
+
+class PageStat(NamedTuple):
+    """One page_stat_data row"""
+    id_book: int
+    page: int
+    start_time: int
+    duration: int
+    total_pages: int
+
+    __getitem__ = _field_getitem
+
+
+class Session(NamedTuple):
+    """One aggregated reading session, as emitted by every session engine"""
+    id_book: int
+    session_start_time: int
+    session_end_time: int
+    duration_minutes: int
+    # Distinct pages, rescaled to the book's current page count
+    pages_read: int
+
+    __getitem__ = _field_getitem
+
+
+class ReadingSessionRecord(NamedTuple):
+    """
+    One reading_sessions row, fields in NeonLoader.SESSION_COLUMNS order,
+    plus the book's file_hash. book_id stays None until BookIdResolver.bind()
+    maps file_hash to Neon.tech's books.book_id.
+    """
+    book_id: int
+    start_time: datetime
+    duration_minutes: int
+    pages_read: int
+    device: str
+    media_type: str
+    data_source: str
+    device_stats_source: str
+    read_instance_id: str
+    read_number: int
+    is_parallel_read: bool
+    end_time: Optional[datetime] = None
+    file_hash: Optional[str] = None
+
+    __getitem__ = _field_getitem
+
+
+class PageStatColumns:
+    """
+    page_stat_data as one array('q') per column: 8 bytes per value, instead
+    of a dict and boxed ints per row. Iterating yields PageStat rows.
+    """
+
+    __slots__ = PageStat._fields
+
+    def __init__(self):
+        for name in PageStat._fields:
+            setattr(self, name, array('q'))
+
+    def _columns(self) -> List[array]:
+        return [getattr(self, name) for name in PageStat._fields]
+
+    def extend(self, rows: List[Tuple]):
+        """Append rows given as tuples in PageStat field order"""
+        for column, values in zip(self._columns(), zip(*rows)):
+            column.extend(values)
+
+    def session_fields(self) -> Iterator[Tuple[int, int, int, int, int]]:
+        """(id_book, start_time, duration, page, total_pages) per row, without building records"""
+        return zip(self.id_book, self.start_time, self.duration, self.page, self.total_pages)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.itemsize * len(column) for column in self._columns())
+
+    def __len__(self) -> int:
+        return len(self.start_time)
+
+    def __getitem__(self, index: int) -> PageStat:
+        return PageStat._make(column[index] for column in self._columns())
+
+    def __iter__(self) -> Iterator[PageStat]:
+        return map(PageStat._make, zip(*self._columns()))
+
+
 # ============================================================================
 # KOReader Statistics Extraction
 # ============================================================================
 
+SNAPSHOT_MODES = ('memory', 'file', 'none')
+
+
 class KOReaderExtractor:
     """Extract data from KOReader statistics.sqlite3"""
 
-    def __init__(self, db_path: str, logger: logging.Logger):
+    SNAPSHOT_RETRIES = 5
+    BUSY_TIMEOUT_SECONDS = 5
+
+    def __init__(self, db_path: str, logger: logging.Logger, snapshot: Optional[str] = None):
         self.db_path = db_path
         self.logger = logger
+        self.snapshot = snapshot or Config.SNAPSHOT_MODE
         self.conn: Optional[sqlite3.Connection] = None
+        self.snapshot_path: Optional[str] = None
+        # {id_book: session start} re-read by incremental runs, see find_open_sessions()
+        self.open_sessions: Dict[int, int] = {}
+        # Set when a streaming read fails part-way; the caller must not advance its cursor
+        self.stream_error: Optional[str] = None
+
+    @classmethod
+    def _open_read_only(cls, path: str) -> sqlite3.Connection:
+        """
+        Open a file read-only without writing anything beside it: mode=ro
+        never creates a missing file, and immutable=1 keeps SQLite from
+        creating the -wal and -shm files of a WAL-mode database in the folder
+        Syncthing manages. Syncthing replaces the backup by renaming a new
+        file over it, so an open connection keeps reading the old one.
+        """
+        uri = f"{Path(path).resolve().as_uri()}?mode=ro&immutable=1"
+        conn = sqlite3.connect(uri, uri=True, timeout=cls.BUSY_TIMEOUT_SECONDS)
+        conn.execute(f"PRAGMA mmap_size = {Config.SQLITE_MMAP_SIZE}")
+        return conn
+
+    def _take_snapshot(self, source: sqlite3.Connection) -> sqlite3.Connection:
+        """
+        Copy the live database with the online backup API in a single step
+        (pages=-1), so the copy reflects one committed state even if Syncthing
+        replaces the file mid-run. Retries with backoff while the file is busy.
+        """
+        for attempt in range(1, self.SNAPSHOT_RETRIES + 1):
+            if self.snapshot == 'file':
+                fd, self.snapshot_path = tempfile.mkstemp(prefix='koreader-', suffix='.sqlite3')
+                os.close(fd)
+                target = sqlite3.connect(self.snapshot_path)
+            else:
+                target = sqlite3.connect(':memory:')
+            try:
+                source.backup(target, pages=-1)
+                return target
+            except sqlite3.OperationalError as e:
+                target.close()
+                self._remove_snapshot()
+                if attempt == self.SNAPSHOT_RETRIES:
+                    raise
+                delay = 0.2 * 2 ** attempt
+                self.logger.warning(f"Snapshot attempt {attempt} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _remove_snapshot(self):
+        if self.snapshot_path:
+            Path(self.snapshot_path).unlink(missing_ok=True)
+            self.snapshot_path = None
 
     def connect(self) -> bool:
-        """Open connection to statistics.sqlite3"""
+        """Open statistics.sqlite3 read-only and, unless disabled, snapshot it"""
+        if self.snapshot not in SNAPSHOT_MODES:
+            self.logger.error(f"Unknown snapshot mode '{self.snapshot}' (expected one of {', '.join(SNAPSHOT_MODES)})")
+            return False
+
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            source = self._open_read_only(self.db_path)
+            if self.snapshot == 'none':
+                self.conn = source
+            else:
+                started = time.monotonic()
+                try:
+                    self.conn = self._take_snapshot(source)
+                finally:
+                    source.close()
+                if self.snapshot == 'file':
+                    self.conn.execute(f"PRAGMA mmap_size = {Config.SQLITE_MMAP_SIZE}")
+                self.logger.debug(
+                    f"Snapshot ({self.snapshot}) taken in {time.monotonic() - started:.2f}s"
+                )
             self.conn.row_factory = sqlite3.Row
             self.logger.info(f"Connected to KOReader backup: {self.db_path}")
             return True
         except sqlite3.Error as e:
+            self._remove_snapshot()
             self.logger.error(f"Failed to connect to KOReader database: {e}")
             return False
 
     def disconnect(self):
-        """Close connection"""
+        """Close connection and discard any scratch snapshot"""
         if self.conn:
             self.conn.close()
             self.logger.debug("Disconnected from KOReader database")
+        self._remove_snapshot()
 
     def extract_books(self) -> List[Dict]:
         """Extract books from KOReader book table"""
@@ -161,107 +447,772 @@ class KOReaderExtractor:
             self.logger.error(f"Failed to extract books: {e}")
             return []
 
-    def extract_page_stat_data(self) -> List[Dict]:
-        """Extract reading sessions from page_stat_data"""
+    def find_open_sessions(self, cursor: int, gap_minutes: int) -> Dict[int, int]:
+        """
+        Find sessions that the next incremental read could still extend.
+
+        Only a book with a page turn less than the gap before `cursor` can
+        continue across it. For each such book, walk back through its page
+        turns to the start of that session. The result ({id_book: session
+        start_time}) is kept in open_sessions and widens every later read
+        with `since`, so the whole session is re-read and re-aggregated with
+        its original start_time.
+        """
+        self.open_sessions = {}
         if not self.conn:
-            return []
+            return self.open_sessions
+
+        gap_seconds = gap_minutes * 60
+        try:
+            recent = self.conn.execute(
+                "SELECT id_book, MAX(start_time) FROM page_stat_data "
+                "WHERE id_book IS NOT NULL AND start_time > ? AND start_time <= ? "
+                "GROUP BY id_book",
+                (cursor - gap_seconds, cursor)
+            ).fetchall()
+            for id_book, last_turn in recent:
+                session_start = last_turn
+                earlier = self.conn.execute(
+                    "SELECT start_time FROM page_stat_data "
+                    "WHERE id_book = ? AND start_time < ? ORDER BY start_time DESC",
+                    (id_book, last_turn)
+                )
+                for (start_time,) in earlier:
+                    if session_start - start_time > gap_seconds:
+                        break
+                    session_start = start_time
+                self.open_sessions[id_book] = session_start
+        except sqlite3.Error as e:
+            self.logger.warning(f"Failed to find open sessions near the cursor: {e}")
+            self.open_sessions = {}
+
+        if self.open_sessions:
+            self.logger.info(
+                f"Re-reading {len(self.open_sessions)} session(s) still open at the cursor "
+                f"(from {min(self.open_sessions.values())})"
+            )
+        return self.open_sessions
+
+    def _page_stat_filter(self, since: Optional[int]) -> Tuple[str, Dict]:
+        """
+        WHERE clause for page_stat_data reads. Rows without an id_book can never
+        be matched to a book and are skipped. With `since`, only rows after the
+        cursor are read, plus the whole of any session in open_sessions.
+        """
+        where = "WHERE id_book IS NOT NULL"
+        params: Dict = {}
+        if since is not None:
+            conditions = ["start_time > :since"]
+            params['since'] = since
+            for i, (id_book, session_start) in enumerate(sorted(self.open_sessions.items())):
+                conditions.append(f"(id_book = :open_book_{i} AND start_time >= :open_start_{i})")
+                params[f'open_book_{i}'] = id_book
+                params[f'open_start_{i}'] = session_start
+            where += f" AND ({' OR '.join(conditions)})"
+        return where, params
+
+    def _page_stat_query(self, since: Optional[int]) -> Tuple[str, Dict]:
+        """Build the page_stat_data query, optionally filtered by a start_time cursor"""
+        where, params = self._page_stat_filter(since)
+        query = f"""
+            SELECT id_book, page, start_time, duration, total_pages
+            FROM page_stat_data
+            {where}
+            ORDER BY id_book, start_time
+        """
+        return query, params
+
+    def extract_page_stat_data(
+        self,
+        since: Optional[int] = None,
+        batch_size: int = 10000
+    ) -> PageStatColumns:
+        """
+        Extract reading sessions from page_stat_data into array-backed columns.
+
+        When `since` is given (incremental mode), only rows with a start_time
+        strictly after that cursor are returned. KOReader indexes
+        page_stat_data(start_time), so the filter avoids a full table scan.
+        """
+        sessions = PageStatColumns()
+        if not self.conn:
+            return sessions
 
         try:
             cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT id_book, page, start_time, duration, total_pages
-                FROM page_stat_data
-                ORDER BY id_book, start_time
-            """)
+            cursor.row_factory = None
+            cursor.execute(*self._page_stat_query(since))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                sessions.extend(rows)
 
-            sessions = [dict(row) for row in cursor.fetchall()]
-            self.logger.info(f"Extracted {len(sessions)} page_stat_data records from KOReader")
+            if since is not None:
+                self.logger.info(
+                    f"Extracted {len(sessions)} page_stat_data records from KOReader "
+                    f"(start_time > {since})"
+                )
+            else:
+                self.logger.info(f"Extracted {len(sessions)} page_stat_data records from KOReader")
             return sessions
 
         except sqlite3.Error as e:
             self.logger.error(f"Failed to extract page_stat_data: {e}")
+            return PageStatColumns()
+
+    # One row per chunk of page_stat_data: its row count and each column as a
+    # comma-separated string, in the same row order for all five
+    COLUMN_CHUNK_QUERY = """
+        SELECT COUNT(*),
+               group_concat(id_book), group_concat(page), group_concat(start_time),
+               group_concat(duration), group_concat(total_pages)
+        FROM page_stat_data
+        {where}
+    """
+    COLUMN_CHUNK_ROWS = 250000
+
+    def extract_page_stat_columns(self, since: Optional[int] = None) -> Dict[str, 'np.ndarray']:
+        """
+        Extract page_stat_data as int64 NumPy columns for the vectorized engine,
+        in the same (id_book, start_time) order as extract_page_stat_data().
+
+        The sqlite3 module builds a Python int for every value it returns,
+        which cost ten times the aggregation itself. Instead SQLite joins each
+        column into one group_concat() string per rowid range of
+        COLUMN_CHUNK_ROWS (so the strings stay small), NumPy parses the
+        strings, and np.lexsort replaces ORDER BY. An incremental read is
+        small and uses the start_time index in a single chunk.
+        """
+        empty = {name: np.empty(0, dtype=np.int64) for name in PageStat._fields}
+        if not self.conn:
+            return empty
+
+        where, params = self._page_stat_filter(since)
+        try:
+            cursor = self.conn.cursor()
+            cursor.row_factory = None
+            if since is None:
+                where += " AND rowid > :after AND rowid <= :after + :chunk_rows"
+                last_rowid = cursor.execute("SELECT MAX(rowid) FROM page_stat_data").fetchone()[0] or 0
+                ranges = range(0, last_rowid, self.COLUMN_CHUNK_ROWS)
+            else:
+                ranges = range(1)
+            query = self.COLUMN_CHUNK_QUERY.format(where=where)
+
+            chunks = []
+            for after in ranges:
+                count, *texts = cursor.execute(
+                    query, dict(params, after=after, chunk_rows=self.COLUMN_CHUNK_ROWS)
+                ).fetchone()
+                if not count:
+                    continue
+                chunk = [np.fromstring(text, dtype=np.int64, sep=',') for text in texts]
+                if any(len(column) != count for column in chunk):
+                    # group_concat() skips NULLs, which would misalign the columns
+                    raise ValueError("page_stat_data has NULL or non-integer values")
+                chunks.append(chunk)
+        except (sqlite3.Error, ValueError) as e:
+            self.logger.error(f"Failed to extract page_stat_data columns: {e}")
+            return empty
+
+        if not chunks:
+            columns = empty
+        else:
+            # One column at a time, so at most one extra column is held in memory
+            columns = {}
+            for i, name in enumerate(PageStat._fields):
+                columns[name] = np.concatenate([chunk[i] for chunk in chunks])
+                for chunk in chunks:
+                    chunk[i] = None
+            order = np.lexsort((columns['start_time'], columns['id_book']))
+            for name in PageStat._fields:
+                columns[name] = columns[name][order]
+        self.logger.info(f"Extracted {len(columns['start_time'])} page_stat_data records from KOReader (columnar)")
+        return columns
+
+    # Gap-based sessionization as window functions: LAG() flags a page turn
+    # that follows the previous one of the same book by more than the gap, and
+    # a running SUM() of those flags numbers the sessions within each book.
+    # Gap is compared in seconds to avoid SQLite's integer division.
+    # pages_read is the union of each row's normalized page interval: rows
+    # ordered by first page count only the pages past the running maximum of
+    # the earlier rows' last pages (see the Session Aggregation notes). That
+    # window re-sorts every row, about a tenth of the query's time.
+    SESSIONS_QUERY = """
+        WITH normalized AS (
+            SELECT id_book, start_time, duration, total_pages,
+                   MAX(page, 1) AS page,
+                   CASE WHEN book.pages > 0 THEN book.pages ELSE total_pages END AS pages
+            FROM page_stat_data
+            LEFT JOIN book ON book.id = page_stat_data.id_book
+            {where}
+        ),
+        spans AS (
+            SELECT id_book, start_time, duration,
+                   CASE WHEN total_pages > 0 THEN (page - 1) * pages / total_pages + 1
+                        ELSE page END AS first_page,
+                   CASE WHEN total_pages > 0
+                        THEN MAX((page - 1) * pages / total_pages + 1, page * pages / total_pages)
+                        ELSE page END AS last_page
+            FROM normalized
+        ),
+        flagged AS (
+            SELECT id_book, start_time, duration, first_page, last_page,
+                   CASE WHEN start_time - LAG(start_time) OVER by_book > :gap_seconds
+                        THEN 1 ELSE 0 END AS opens_session
+            FROM spans
+            WINDOW by_book AS (PARTITION BY id_book ORDER BY start_time)
+        ),
+        numbered AS (
+            SELECT id_book, start_time, duration, first_page, last_page,
+                   SUM(opens_session) OVER (
+                       PARTITION BY id_book ORDER BY start_time ROWS UNBOUNDED PRECEDING
+                   ) AS session_number
+            FROM flagged
+        ),
+        covered AS (
+            SELECT id_book, start_time, duration, session_number, first_page, last_page,
+                   MAX(last_page) OVER (
+                       PARTITION BY id_book, session_number ORDER BY first_page, last_page
+                       ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                   ) AS reach
+            FROM numbered
+        )
+        SELECT id_book,
+               MIN(start_time) AS session_start_time,
+               MAX(start_time) AS session_end_time,
+               SUM(duration) AS duration_minutes,
+               SUM(MAX(last_page - MAX(first_page, COALESCE(reach, 0) + 1) + 1, 0)) AS pages_read,
+               COUNT(*) AS records
+        FROM covered
+        GROUP BY id_book, session_number
+        ORDER BY id_book, session_start_time
+    """
+
+    def extract_sessions(self, gap_minutes: int, since: Optional[int] = None) -> List[Dict]:
+        """
+        Extract already-aggregated reading sessions, computed inside SQLite
+        with window functions (requires SQLite 3.25+).
+
+        Returns one dict per session with the same keys and values as
+        SessionAggregator, plus 'records' (page_stat_data rows in the session).
+        """
+        if not self.conn:
+            return []
+        if sqlite3.sqlite_version_info < (3, 25, 0):
+            self.logger.error(f"SQLite {sqlite3.sqlite_version} has no window functions (3.25+ required)")
+            return []
+
+        where, params = self._page_stat_filter(since)
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                self.SESSIONS_QUERY.format(where=where),
+                {'gap_seconds': gap_minutes * 60, **params}
+            )
+            sessions = [dict(row) for row in cursor.fetchall()]
+            self.logger.info(
+                f"Extracted {len(sessions)} sessions from "
+                f"{sum(session['records'] for session in sessions)} page_stat_data records (sqlite engine)"
+            )
+            return sessions
+
+        except sqlite3.Error as e:
+            self.logger.error(f"Failed to extract sessions: {e}")
             return []
 
+    def iter_page_stat_data(
+        self,
+        since: Optional[int] = None,
+        batch_size: int = 1000
+    ) -> Iterator[sqlite3.Row]:
+        """
+        Streaming form of extract_page_stat_data(): yield rows via fetchmany()
+        so at most `batch_size` rows are materialised at a time. Rows are
+        sqlite3.Row objects, which support the same key access as dicts.
+        """
+        if not self.conn:
+            return
+
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(*self._page_stat_query(since))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        except sqlite3.Error as e:
+            self.stream_error = str(e)
+            self.logger.error(f"Failed to stream page_stat_data: {e}")
+
+
+# ============================================================================
+# Backup Fingerprints
+# ============================================================================
+
+def backup_fingerprint(db_path: str) -> Optional[Dict]:
+    """
+    Fingerprint a KOReader backup: file size and mtime from stat(), plus a
+    digest of page_stat_data (max rowid and start_time, row count, and the
+    sums of start_time and duration, so rows edited in place change it too)
+    and of every book column the ETL reads, so edited notes, highlights or
+    page counts change it as well. The page_stat_data aggregates cost one
+    scan of the table; the book table holds one row per book. Returns None
+    if the file cannot be read.
+    """
+    try:
+        stat = os.stat(db_path)
+        conn = KOReaderExtractor._open_read_only(db_path)
+        try:
+            digest = hashlib.sha256(json.dumps(conn.execute(
+                "SELECT MAX(rowid), MAX(start_time), COUNT(*), SUM(start_time), SUM(duration) "
+                "FROM page_stat_data"
+            ).fetchone()).encode())
+            for book in conn.execute(
+                "SELECT id, title, authors, pages, language, md5, notes, highlights, series "
+                "FROM book ORDER BY id"
+            ):
+                digest.update(json.dumps(book).encode())
+        finally:
+            conn.close()
+    except (OSError, sqlite3.Error):
+        return None
+
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': digest.hexdigest()}
+
+
+class FingerprintStore:
+    """
+    Local JSON store of the last successfully loaded backup fingerprint per
+    device, with the sync cursor that load stored in Neon.tech. The local
+    cursor lets an incremental run start extracting while Neon.tech wakes up.
+    """
+
+    def __init__(self, path: str, logger: logging.Logger):
+        self.path = Path(path)
+        self.logger = logger
+        self.fingerprints: Dict[str, Dict] = {}
+        try:
+            self.fingerprints = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable fingerprint store {self.path}: {e}")
+
+    def is_unchanged(self, device_id: str, fingerprint: Optional[Dict]) -> bool:
+        """
+        True if the backup matches the stored fingerprint: same size and mtime,
+        or the same digest of page_stat_data and the book table (Syncthing
+        re-wrote the file without new data)
+        """
+        stored = self.fingerprints.get(device_id)
+        if not stored or not fingerprint:
+            return False
+        same_stat = (stored.get('size'), stored.get('mtime_ns')) == \
+            (fingerprint['size'], fingerprint['mtime_ns'])
+        return same_stat or stored.get('digest') == fingerprint['digest']
+
+    def sync_cursor(self, device_id: str) -> Optional[int]:
+        """The sync cursor recorded with the device's last successful load, if any"""
+        return self.fingerprints.get(device_id, {}).get('sync_cursor')
+
+    def record(self, device_id: str, fingerprint: Optional[Dict], sync_cursor: Optional[int] = None):
+        """Store a device fingerprint, keeping the stored cursor unless a new one is given"""
+        if not fingerprint:
+            return
+        if sync_cursor is None:
+            sync_cursor = self.sync_cursor(device_id)
+        self.fingerprints[device_id] = {**fingerprint, 'sync_cursor': sync_cursor}
+        self._save()
+
+    def forget_cursor(self, device_id: str):
+        """Drop a device's local cursor; the next run reads it from Neon.tech"""
+        if self.fingerprints.get(device_id, {}).pop('sync_cursor', None) is not None:
+            self._save()
+
+    def _save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps(self.fingerprints, indent=2, sort_keys=True))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.warning(f"Failed to write fingerprint store {self.path}: {e}")
+
 
 # ============================================================================
 # Session Aggregation
 # ============================================================================
 
+# pages_read follows KOReader's page_stat view: a page turned at
+# (page, total_pages) covers pages first..last of the book's current layout
+# (book.pages), so reflows and font changes don't inflate the count:
+#
+#   first = (page - 1) * book.pages / total_pages + 1
+#   last  = max(first, page * book.pages / total_pages)
+#
+# A session's pages_read is the size of the union of those intervals, i.e.
+# distinct normalized pages. Without book.pages the row's own total_pages is
+# used (no rescaling); pages below 1 count as page 1, and rows without a
+# total_pages cover just their page. Every engine computes the same value.
+
+def book_page_counts(koreader_books: List[Dict]) -> Dict[int, int]:
+    """{KOReader book id: book.pages} for the books with a known page count"""
+    return {book['id']: book['pages'] for book in koreader_books if (book.get('pages') or 0) > 0}
+
+
+def page_span(page: int, total_pages: int, pages: Optional[int]) -> Tuple[int, int]:
+    """
+    Inclusive (first, last) pages of the current layout covered by one row.
+
+    Same rule as above; the session loops inline it to save a call per row.
+    """
+    if page < 1:
+        page = 1
+    if total_pages > 0 and pages and pages != total_pages:
+        first = (page - 1) * pages // total_pages + 1
+        return first, max(first, page * pages // total_pages)
+    return page, page
+
+
+def _distinct_pages(spans: List[Tuple[int, int]]) -> int:
+    """Number of pages covered by the union of inclusive (first, last) intervals"""
+    covered = 0
+    reach = 0
+    for first, last in sorted(spans):
+        if last > reach:
+            covered += last - max(first, reach + 1) + 1
+            reach = last
+    return covered
+
+
 class SessionAggregator:
     """Aggregate page_stat_data into reading sessions"""
 
     def __init__(self, gap_minutes: int, logger: logging.Logger):
         self.gap_minutes = gap_minutes
         self.logger = logger
+        self.records_processed = 0
+        self.sessions_emitted = 0
+        self.high_water_mark: Optional[int] = None
 
-    def aggregate(self, page_stat_data: List[Dict]) -> List[Dict]:
+    def aggregate(
+        self,
+        page_stat_data: Iterable[Mapping],
+        book_pages: Optional[Mapping[int, int]] = None
+    ) -> List[Session]:
         """
         Aggregate consecutive page_stat_data rows into reading sessions.
 
         A new session starts when:
         1. Book ID changes
         2. Time gap > gap_minutes (default 30 minutes)
+
+        `book_pages` ({id_book: book.pages}, see book_page_counts()) rescales
+        pages_read to each book's current layout.
         """
-        sessions = []
-        current_session = None
-
-        for record in page_stat_data:
-            book_id = record['id_book']
-            start_time = record['start_time']
-            duration = record['duration']
-            page = record['page']
-
-            if current_session is None:
-                # Start first session
-                current_session = {
-                    'id_book': book_id,
-                    'session_start_time': start_time,
-                    'session_end_time': start_time,
-                    'duration_minutes': duration,
-                    'pages_read': page
-                }
+        sessions = list(self.iter_sessions(page_stat_data, book_pages))
+        self.logger.info(f"Aggregated {self.records_processed} records into {len(sessions)} sessions")
+        return sessions
+
+    def iter_sessions(
+        self,
+        page_stat_data: Iterable[Mapping],
+        book_pages: Optional[Mapping[int, int]] = None
+    ) -> Iterator[Session]:
+        """
+        Streaming form of aggregate(): yield each session as soon as a book
+        change or time gap closes it, so only one open session is held in memory.
+
+        Rows must arrive ordered by (id_book, start_time), either as
+        PageStatColumns or as mappings (dicts, sqlite3.Row, PageStat).
+        records_processed, sessions_emitted and high_water_mark (max
+        start_time seen) are updated as rows are consumed.
+        """
+        if isinstance(page_stat_data, PageStatColumns):
+            rows = page_stat_data.session_fields()
+        else:
+            rows = (
+                (record['id_book'], record['start_time'], record['duration'], record['page'],
+                 record['total_pages'])
+                for record in page_stat_data
+            )
+        yield from self._iter_sessions(rows, book_pages or {})
+
+    def _iter_sessions(
+        self,
+        rows: Iterable[Tuple[int, int, int, int, int]],
+        book_pages: Mapping[int, int]
+    ) -> Iterator[Session]:
+        """
+        Session loop over (id_book, start_time, duration, page, total_pages)
+        tuples. Normalized pages are merged into runs as they arrive; only a
+        session that turns back to an earlier page keeps its out-of-order
+        spans for a full union when it closes.
+        """
+        self.records_processed = 0
+        self.sessions_emitted = 0
+        self.high_water_mark = None
+        gap_seconds = self.gap_minutes * 60
+        current_book = None
+
+        def pages_read() -> int:
+            if backtracks:
+                return _distinct_pages(runs + [(run_first, run_last)] + backtracks)
+            return covered + run_last - run_first + 1
+
+        for book_id, start_time, duration, page, total_pages in rows:
+            self.records_processed += 1
+            if self.high_water_mark is None or start_time > self.high_water_mark:
+                self.high_water_mark = start_time
+
+            # Normalize the page to the book's current layout (see above)
+            if book_id != current_book:
+                pages = book_pages.get(book_id)
+            if page < 1:
+                page = 1
+            if total_pages > 0 and pages and pages != total_pages:
+                first = (page - 1) * pages // total_pages + 1
+                last = page * pages // total_pages
+                if last < first:
+                    last = first
             else:
-                # Check if we should continue or start new session
-                if book_id != current_session['id_book']:
-                    # Different book - save and start new
-                    sessions.append(current_session)
-                    current_session = {
-                        'id_book': book_id,
-                        'session_start_time': start_time,
-                        'session_end_time': start_time,
-                        'duration_minutes': duration,
-                        'pages_read': page
-                    }
+                first = last = page
+
+            if self.records_processed > 1 and book_id == current_book \
+                    and start_time - session_end <= gap_seconds:
+                # Same book within the gap - continue current session
+                session_end = start_time
+                session_duration += duration
+                if first < run_first:
+                    backtracks.append((first, last))
+                elif first <= run_last + 1:
+                    if last > run_last:
+                        run_last = last
                 else:
-                    # Same book - check time gap
-                    time_gap_minutes = (start_time - current_session['session_end_time']) / 60
-
-                    if time_gap_minutes > self.gap_minutes:
-                        # Gap exceeds threshold - save and start new
-                        sessions.append(current_session)
-                        current_session = {
-                            'id_book': book_id,
-                            'session_start_time': start_time,
-                            'session_end_time': start_time,
-                            'duration_minutes': duration,
-                            'pages_read': page
-                        }
-                    else:
-                        # Continue current session
-                        current_session['session_end_time'] = start_time
-                        current_session['duration_minutes'] += duration
-                        current_session['pages_read'] = max(
-                            current_session['pages_read'], page
-                        )
+                    runs.append((run_first, run_last))
+                    covered += run_last - run_first + 1
+                    run_first, run_last = first, last
+                continue
+
+            if self.records_processed > 1:
+                # Different book or gap exceeds threshold - close the session
+                self.sessions_emitted += 1
+                yield Session(current_book, session_start, session_end, session_duration, pages_read())
+
+            current_book = book_id
+            session_start = session_end = start_time
+            session_duration = duration
+            run_first, run_last = first, last
+            runs = []
+            backtracks = []
+            covered = 0
 
         # Don't forget final session
-        if current_session:
-            sessions.append(current_session)
+        if self.records_processed:
+            self.sessions_emitted += 1
+            yield Session(current_book, session_start, session_end, session_duration, pages_read())
+
+
+class VectorizedSessionAggregator:
+    """
+    NumPy session aggregation engine.
+
+    Produces exactly the same sessions as SessionAggregator, but works on
+    columnar arrays: session boundaries come from one vectorized book-change
+    and gap mask, and per-session totals from segmented reductions
+    (np.add.reduceat) instead of a Python loop per row. Distinct normalized
+    pages come from interval arithmetic: rows in (session, first page) order,
+    a running maximum of last pages, and each row counting only the pages
+    past that reach. Only the rows of sessions that turn back to an earlier
+    page need sorting into that order.
+    """
+
+    def __init__(self, gap_minutes: int, logger: logging.Logger):
+        if np is None:
+            raise ImportError("numpy is required for the vectorized session engine "
+                              "(pip3 install numpy)")
+        self.gap_minutes = gap_minutes
+        self.logger = logger
+        self.records_processed = 0
+        self.sessions_emitted = 0
+        self.high_water_mark: Optional[int] = None
+
+    def aggregate(
+        self,
+        page_stat_data: Iterable[Mapping],
+        book_pages: Optional[Mapping[int, int]] = None
+    ) -> List[Session]:
+        """Drop-in replacement for SessionAggregator.aggregate() on rows or PageStatColumns"""
+        if isinstance(page_stat_data, PageStatColumns):
+            # array('q') shares its buffer with int64 NumPy arrays without copying
+            return self.aggregate_columns({
+                name: np.frombuffer(getattr(page_stat_data, name), dtype=np.int64)
+                for name in PageStat._fields
+            }, book_pages)
+        # Any iterable of rows, sized or not: collect it into columns first
+        columns = PageStatColumns()
+        for batch in _batched(page_stat_data, 10000):
+            columns.extend([tuple(row[name] for name in PageStat._fields) for row in batch])
+        return self.aggregate(columns, book_pages)
+
+    @staticmethod
+    def _session_pages(
+        columns: Dict[str, 'np.ndarray'],
+        session: 'np.ndarray',
+        starts: 'np.ndarray',
+        book_pages: Mapping[int, int]
+    ) -> 'np.ndarray':
+        """Distinct normalized pages per session (see the Session Aggregation notes)"""
+        page = np.maximum(columns['page'], 1)
+        total_pages = columns['total_pages']
+        id_book = columns['id_book']
+
+        # book.pages per row: rows are grouped by book, so look up each book once
+        book_starts = np.flatnonzero(np.diff(id_book, prepend=id_book[0] - 1))
+        run_pages = np.fromiter(
+            (book_pages.get(book_id) or 0 for book_id in id_book[book_starts].tolist()),
+            dtype=np.int64, count=len(book_starts)
+        )
+        pages = np.repeat(run_pages, np.diff(np.append(book_starts, len(id_book))))
+
+        # Only rows laid out with another page count than book.pages are rescaled
+        first = page.copy()
+        last = page.copy()
+        rescaled = np.flatnonzero((total_pages > 0) & (pages > 0) & (pages != total_pages))
+        if len(rescaled):
+            scaled_page, scaled_pages, scaled_total = page[rescaled], pages[rescaled], total_pages[rescaled]
+            first[rescaled] = (scaled_page - 1) * scaled_pages // scaled_total + 1
+            last[rescaled] = np.maximum(first[rescaled], scaled_page * scaled_pages // scaled_total)
+
+        # Offset every session past the previous one's pages, so one running
+        # maximum over the whole array never carries across sessions. A
+        # session whose first pages never decrease is already in page order;
+        # like the python engine, only sessions that turn back are sorted.
+        offset = session * (int(last.max()) + 1)
+        first += offset
+        last += offset
+        turns_back = np.zeros(len(starts), dtype=bool)
+        turns_back[session[1:][first[1:] < first[:-1]]] = True
+        if turns_back.any():
+            rows = np.flatnonzero(turns_back[session])
+            order = rows[np.argsort(first[rows], kind='stable')]
+            first[rows] = first[order]
+            last[rows] = last[order]
+        reach = np.empty_like(last)
+        reach[0] = 0
+        np.maximum.accumulate(last[:-1], out=reach[1:])
+        covered = np.maximum(last - np.maximum(first, reach + 1) + 1, 0)
+        return np.add.reduceat(covered, starts)
+
+    def aggregate_columns(
+        self,
+        columns: Dict[str, 'np.ndarray'],
+        book_pages: Optional[Mapping[int, int]] = None
+    ) -> List[Session]:
+        """
+        Aggregate int64 columns (id_book, page, start_time, duration,
+        total_pages) ordered by (id_book, start_time) into reading sessions.
+        """
+        id_book = columns['id_book']
+        start_time = columns['start_time']
+        count = len(start_time)
+
+        self.records_processed = count
+        if count == 0:
+            self.sessions_emitted = 0
+            self.high_water_mark = None
+            self.logger.info("Aggregated 0 records into 0 sessions")
+            return []
+
+        # Row i opens a session when the book changes or the gap to the
+        # previous page turn of the same book exceeds the threshold
+        boundary = np.empty(count, dtype=bool)
+        boundary[0] = True
+        np.not_equal(id_book[1:], id_book[:-1], out=boundary[1:])
+        boundary[1:] |= (np.diff(start_time) / 60) > self.gap_minutes
+
+        first = np.flatnonzero(boundary)
+        last = np.append(first[1:], count) - 1
+        session = np.cumsum(boundary) - 1
+
+        sessions = list(map(Session._make, zip(
+            id_book[first].tolist(),
+            start_time[first].tolist(),
+            start_time[last].tolist(),
+            np.add.reduceat(columns['duration'], first).tolist(),
+            self._session_pages(columns, session, first, book_pages or {}).tolist(),
+        )))
+
+        self.sessions_emitted = len(sessions)
+        self.high_water_mark = int(start_time.max())
+        self.logger.info(f"Aggregated {count} records into {len(sessions)} sessions (numpy engine)")
+        return sessions
+
+
+class SQLiteSessionAggregator:
+    """
+    SQLite session aggregation engine.
+
+    Sessions are built inside statistics.sqlite3 by
+    KOReaderExtractor.extract_sessions(); this class only takes those rows
+    (one per session instead of one per page turn) and keeps the same
+    counters as SessionAggregator.
+
+    Slower than the python engine: SQLite sorts all rows again for each of
+    the query's window passes, and an (id_book, start_time) index does not
+    avoid that. Kept as a parity check and for its lower Python memory use,
+    not as a default.
+    """
+
+    def __init__(self, gap_minutes: int, logger: logging.Logger):
+        self.gap_minutes = gap_minutes
+        self.logger = logger
+        self.records_processed = 0
+        self.sessions_emitted = 0
+        self.high_water_mark: Optional[int] = None
+
+    def aggregate(
+        self,
+        extracted_sessions: List[Dict],
+        book_pages: Optional[Mapping[int, int]] = None
+    ) -> List[Session]:
+        """
+        Accept sessions from extract_sessions() and update the counters.
+        `book_pages` is accepted for parity with the other engines; the query
+        already rescaled pages_read with book.pages.
+        """
+        sessions = []
+        self.records_processed = 0
+        self.high_water_mark = None
+        for extracted in extracted_sessions:
+            session = Session._make(extracted[field] for field in Session._fields)
+            self.records_processed += extracted['records']
+            if self.high_water_mark is None or session.session_end_time > self.high_water_mark:
+                self.high_water_mark = session.session_end_time
+            sessions.append(session)
 
-        self.logger.info(f"Aggregated {len(page_stat_data)} records into {len(sessions)} sessions")
+        self.sessions_emitted = len(sessions)
+        self.logger.info(f"Aggregated {self.records_processed} records into {len(sessions)} sessions (sqlite engine)")
         return sessions
 
 
+SESSION_ENGINES = ('python', 'numpy', 'sqlite')
+
+
+def make_session_aggregator(engine: str, gap_minutes: int, logger: logging.Logger):
+    """Build the session aggregator for SESSION_ENGINE / --engine"""
+    if engine == 'numpy':
+        return VectorizedSessionAggregator(gap_minutes, logger)
+    if engine == 'sqlite':
+        return SQLiteSessionAggregator(gap_minutes, logger)
+    if engine == 'python':
+        return SessionAggregator(gap_minutes, logger)
+    raise ValueError(f"Unknown session engine '{engine}' (expected one of {', '.join(SESSION_ENGINES)})")
+
+
 # ============================================================================
 # Data Transformation
 # ============================================================================
@@ -300,44 +1251,59 @@ class DataTransformer:
 
     def transform_sessions(
         self,
-        aggregated_sessions: List[Dict],
+        aggregated_sessions: List[Session],
+        koreader_books: List[Dict]
+    ) -> List[ReadingSessionRecord]:
+        """
+        Transform aggregated sessions to reading_sessions table schema.
+
+        Sessions carry their book's file_hash; book_id is bound after the books
+        are loaded, by BookIdResolver.bind().
+        """
+        sessions = list(self.iter_transform_sessions(aggregated_sessions, koreader_books))
+        self.logger.info(f"Transformed {len(sessions)} sessions to schema")
+        return sessions
+
+    def iter_transform_sessions(
+        self,
+        aggregated_sessions: Iterable[Session],
         koreader_books: List[Dict]
-    ) -> List[Dict]:
-        """Transform aggregated sessions to reading_sessions table schema"""
+    ) -> Iterator[ReadingSessionRecord]:
+        """Streaming form of transform_sessions(): yield one transformed session at a time"""
 
-        # Create book_id lookup by file_hash (KOReader MD5)
-        book_id_by_md5 = {book['md5']: book['id'] for book in koreader_books}
+        # Sessions reference KOReader's local book id; map it to the file_hash (MD5)
+        md5_by_book_id = {book['id']: book['md5'] for book in koreader_books}
 
-        sessions = []
         for session in aggregated_sessions:
-            book_id = book_id_by_md5.get(session['id_book'])
+            file_hash = md5_by_book_id.get(session['id_book'])
 
-            if not book_id:
+            if not file_hash:
                 self.logger.warning(
                     f"Book ID {session['id_book']} not found in books list - skipping session"
                 )
                 continue
 
-            transformed = {
-                'book_id': book_id,
-                'start_time': datetime.fromtimestamp(
+            yield ReadingSessionRecord(
+                book_id=None,
+                start_time=datetime.fromtimestamp(
                     session['session_start_time'],
                     tz=timezone.utc
                 ),
-                'duration_minutes': max(1, session['duration_minutes']),  # Ensure > 0
-                'pages_read': session['pages_read'],
-                'device': self.device_id,
-                'media_type': 'ebook',
-                'data_source': 'koreader',
-                'device_stats_source': 'statistics.sqlite3',
-                'read_instance_id': str(uuid4()),
-                'read_number': 1,
-                'is_parallel_read': False,
-            }
-            sessions.append(transformed)
-
-        self.logger.info(f"Transformed {len(sessions)} sessions to schema")
-        return sessions
+                duration_minutes=max(1, session['duration_minutes']),  # Ensure > 0
+                pages_read=session['pages_read'],
+                device=self.device_id,
+                media_type='ebook',
+                data_source='koreader',
+                device_stats_source='statistics.sqlite3',
+                read_instance_id=str(uuid4()),
+                read_number=1,
+                is_parallel_read=False,
+                end_time=datetime.fromtimestamp(
+                    session['session_end_time'],
+                    tz=timezone.utc
+                ),
+                file_hash=file_hash,
+            )
 
     @staticmethod
     def _extract_series_name(series_str: Optional[str]) -> Optional[str]:
@@ -362,6 +1328,109 @@ class DataTransformer:
 # Neon.tech Database Operations
 # ============================================================================
 
+def sync_source_name(device_id: str) -> str:
+    """sync_status.source_name for a KOReader device (one cursor per device)"""
+    return f"koreader:{device_id}"
+
+
+def _copy_text(value) -> str:
+    """Render one value in PostgreSQL COPY text format (\\N for NULL, escaped specials)"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+class _CopyStream(io.TextIOBase):
+    """
+    File-like object feeding COPY FROM STDIN from an iterator of value tuples.
+
+    Lines are rendered lazily as psycopg2 calls read(), so rows are streamed
+    to the server without building the whole payload in memory. `rows`
+    counts the tuples rendered so far.
+    """
+
+    def __init__(self, rows: Iterable[Tuple]):
+        super().__init__()
+        self._rows = iter(rows)
+        self._buffer = ''
+        self.rows = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        chunks = [self._buffer]
+        buffered = len(self._buffer)
+        while size < 0 or buffered < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            line = '\t'.join(_copy_text(value) for value in row) + '\n'
+            chunks.append(line)
+            buffered += len(line)
+            self.rows += 1
+        data = ''.join(chunks)
+        if size < 0:
+            self._buffer = ''
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def _prepared_insert(
+    name: str,
+    table: str,
+    columns: Tuple[str, ...],
+    types: Tuple[str, ...],
+    conflict_clause: str
+) -> Tuple[str, str]:
+    """
+    (PREPARE, EXECUTE) statements for a set-based insert into `table` that
+    takes one array per column and expands them with unnest(). The statement
+    text does not depend on the batch size, so it is parsed and planned once
+    per connection. Like _copy_merge(), it returns (inserted, updated),
+    counted from RETURNING (xmax = 0).
+    """
+    column_list = ', '.join(columns)
+    parameters = ', '.join(f"${number}" for number in range(1, len(columns) + 1))
+    prepare = (
+        f"PREPARE {name} ({', '.join(f'{kind}[]' for kind in types)}) AS "
+        f"WITH merged AS ("
+        f"INSERT INTO {table} ({column_list}) "
+        f"SELECT * FROM unnest({parameters}) "
+        f"{conflict_clause} "
+        f"RETURNING (xmax = 0) AS inserted) "
+        f"SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM merged"
+    )
+    execute = f"EXECUTE {name} ({', '.join(f'%s::{kind}[]' for kind in types)})"
+    return prepare, execute
+
+
+LOAD_METHODS = ('insert', 'copy', 'transaction')
+
+# SQLSTATE for a reading_sessions.book_id that no longer exists in books
+FOREIGN_KEY_VIOLATION = '23503'
+
+# Upper bound for one retry delay
+MAX_BACKOFF_SECONDS = 30.0
+
+
+def backoff_delay(attempt: int, base: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff: uniform in [0, base * 2**attempt], capped"""
+    base = Config.CONNECT_BACKOFF_SECONDS if base is None else base
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, base * 2 ** attempt))
+
+
 class NeonLoader:
     """Load transformed data into Neon.tech PostgreSQL"""
 
@@ -369,24 +1438,186 @@ class NeonLoader:
         self.logger = logger
         self.conn: Optional[psycopg2.extensions.connection] = None
         self.cursor: Optional[psycopg2.extensions.cursor] = None
+        # Number of failed load statements; the sync cursor only advances when zero
+        self.load_errors = 0
+        # Existing sessions that ON CONFLICT DO UPDATE extended (stitched) this run
+        self.sessions_extended = 0
+        # Set when a session load referenced a missing book_id (stale resolver cache)
+        self.stale_book_ids = False
+        # sync_status.run_metrics exists (added after the original schema)
+        self.has_run_metrics = False
+        # reading_daily_rollups exists; touched days are re-rolled with each session batch
+        self.has_daily_rollups = False
+        self.rollup_rows = 0
+        # Set by connect(); attached (pooled) connections are never reopened here
+        self._connect_options: Optional[Dict] = None
+        self.reconnects = 0
+        # Set by begin(): statements share one run transaction until finish()
+        self.in_transaction = False
+        self._transaction_counts = (0, 0)
+        # Connection the load statements were last PREPAREd on
+        self._prepared_conn = None
+
+    # Shared by every Neon.tech connection. TCP keepalives stop NAT and the
+    # Neon.tech proxy from dropping a socket that idles through extraction.
+    CONNECT_OPTIONS = {
+        'connect_timeout': 30,
+        'keepalives': 1,
+        'keepalives_idle': 30,
+        'keepalives_interval': 10,
+        'keepalives_count': 5,
+    }
 
     def connect(self, host: str, user: str, password: str, database: str) -> bool:
-        """Connect to Neon.tech PostgreSQL"""
-        try:
-            self.conn = psycopg2.connect(
-                host=host,
-                user=user,
-                password=password,
-                database=database,
-                connect_timeout=30
-            )
-            self.cursor = self.conn.cursor()
-            self.logger.info(f"Connected to Neon.tech: {host}/{database}")
+        """
+        Connect to Neon.tech PostgreSQL. Waking a suspended compute can take
+        several seconds, so failed attempts are retried ETL_CONNECT_RETRIES
+        times with jittered exponential backoff.
+        """
+        self._connect_options = dict(
+            self.CONNECT_OPTIONS, host=host, user=user, password=password, database=database
+        )
+        for attempt in range(Config.CONNECT_RETRIES + 1):
+            try:
+                self.conn = psycopg2.connect(**self._connect_options)
+                self.cursor = self.conn.cursor()
+                self.logger.info(f"Connected to Neon.tech: {host}/{database}")
+                return True
+            except psycopg2.Error as e:
+                if attempt == Config.CONNECT_RETRIES:
+                    self.logger.error(f"Failed to connect to Neon.tech: {e}")
+                    return False
+                delay = backoff_delay(attempt)
+                self.logger.warning(f"Neon.tech connection attempt {attempt + 1} failed - "
+                                    f"retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+        return False
+
+    def reconnect(self) -> bool:
+        """Replace a dropped connection opened by connect()"""
+        if self._connect_options is None:
+            return False
+        options = self._connect_options
+        self.disconnect()
+        return self.connect(options['host'], options['user'], options['password'], options['database'])
+
+    def _with_reconnect(self, operation: Callable, *args):
+        """
+        Run `operation(*args)`, one whole transaction. If the connection was
+        lost, reconnect and run it once more: committed batches are not
+        re-sent, and the interrupted one is an ON CONFLICT upsert, so
+        resending it is harmless even if its commit did reach Neon.tech.
+        """
+        if self.conn is None:
+            raise psycopg2.InterfaceError("not connected to Neon.tech")
+        if self.in_transaction:
+            return self._in_savepoint(operation, *args)
+        try:
+            return operation(*args)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            if self.conn is None or not self.conn.closed or not self.reconnect():
+                raise
+            self.reconnects += 1
+            self.logger.warning(f"Neon.tech connection lost ({e}) - reconnected, resending the batch")
+            return operation(*args)
+
+    def _in_savepoint(self, operation: Callable, *args):
+        """
+        Run `operation(*args)` inside the open run transaction. If it fails,
+        only its own statements are undone, so the transaction stays usable.
+        A dropped connection is not reconnected here: the batches before it
+        went down with the transaction, so resending one batch would not
+        restore them.
+        """
+        self.cursor.execute("SAVEPOINT etl_batch")
+        try:
+            result = operation(*args)
+        except psycopg2.Error:
+            try:
+                self.cursor.execute("ROLLBACK TO SAVEPOINT etl_batch")
+            except psycopg2.Error:
+                pass  # Connection gone; finish() rolls back whatever is left
+            raise
+        self.cursor.execute("RELEASE SAVEPOINT etl_batch")
+        return result
+
+    def _commit(self):
+        """Commit, unless the statements belong to an open run transaction"""
+        if not self.in_transaction:
+            self.conn.commit()
+
+    def _rollback(self):
+        """Roll back a failed transaction, unless the connection is already gone"""
+        if self.conn is None or self.in_transaction:
+            # In a run transaction, the failed operation's savepoint is already rolled back
+            return
+        try:
+            self.conn.rollback()
+        except psycopg2.InterfaceError:
+            pass
+
+    def begin(self):
+        """
+        Open a run transaction. Until finish() ends it, the load methods stop
+        committing each batch. Every operation instead runs under a savepoint
+        (see _in_savepoint()). A failed batch is undone and counted in
+        load_errors, and the rest of the run still reports its own errors.
+        Books, sessions, daily rollups and sync_status are then committed
+        or rolled back together.
+        """
+        self.in_transaction = True
+        self._transaction_counts = (self.sessions_extended, self.rollup_rows)
+
+    def finish(self, commit: bool = True) -> bool:
+        """
+        End the run transaction: commit it, or roll it back when `commit` is
+        False or the commit fails. Returns True if the run was committed.
+        """
+        self.in_transaction = False
+        if commit and self.conn is not None:
+            try:
+                self.conn.commit()
+                return True
+            except psycopg2.Error as e:
+                self.load_errors += 1
+                self.logger.error(f"Failed to commit the load transaction: {e}")
+        self._rollback()
+        # Rolled-back work is not counted, and a PREPARE may have gone with it
+        self.sessions_extended, self.rollup_rows = self._transaction_counts
+        self._prepared_conn = None
+        self.logger.warning("Load transaction rolled back - this run left Neon.tech unchanged")
+        return False
+
+    def reset_counters(self):
+        """Start a new run's tallies on a connection kept from the previous run"""
+        self.load_errors = 0
+        self.sessions_extended = 0
+        self.stale_book_ids = False
+        self.rollup_rows = 0
+        self.reconnects = 0
+
+    def ping(self) -> bool:
+        """Round trip on the open connection; False if it is gone"""
+        try:
+            self.cursor.execute("SELECT 1")
+            self.cursor.fetchone()
+            self.conn.commit()
             return True
-        except psycopg2.Error as e:
-            self.logger.error(f"Failed to connect to Neon.tech: {e}")
+        except (psycopg2.Error, AttributeError):
             return False
 
+    def attach(self, conn: 'psycopg2.extensions.connection'):
+        """Use an existing connection (e.g. from a pool); the caller owns its lifetime"""
+        self.conn = conn
+        self.cursor = conn.cursor()
+
+    def detach(self):
+        """Release an attached connection without closing it"""
+        if self.cursor:
+            self.cursor.close()
+        self.cursor = None
+        self.conn = None
+
     def disconnect(self):
         """Close connection"""
         if self.cursor:
@@ -394,10 +1625,12 @@ class NeonLoader:
         if self.conn:
             self.conn.close()
             self.logger.debug("Disconnected from Neon.tech")
+        self.cursor = None
+        self.conn = None
 
     def validate_schema(self) -> bool:
         """Validate that required tables exist"""
-        required_tables = ['books', 'reading_sessions', 'authors', 'publishers']
+        required_tables = ['books', 'reading_sessions', 'authors', 'publishers', 'sync_status']
 
         try:
             for table in required_tables:
@@ -409,6 +1642,22 @@ class NeonLoader:
                     self.logger.error(f"Required table '{table}' not found in Neon.tech")
                     return False
 
+            self.cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'sync_status' AND column_name = 'run_metrics')"
+            )
+            self.has_run_metrics = bool(self.cursor.fetchone()[0])
+            if not self.has_run_metrics:
+                self.logger.debug("sync_status.run_metrics missing - run metrics kept local only")
+
+            self.cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM information_schema.tables "
+                "WHERE table_name = 'reading_daily_rollups')"
+            )
+            self.has_daily_rollups = bool(self.cursor.fetchone()[0])
+            if not self.has_daily_rollups:
+                self.logger.warning("reading_daily_rollups missing - run create_schema.sql to enable daily rollups")
+
             self.logger.info("Schema validation passed - all required tables exist")
             return True
 
@@ -416,6 +1665,54 @@ class NeonLoader:
             self.logger.error(f"Schema validation failed: {e}")
             return False
 
+    def _upsert_returning(self, sql: str, values: List[Tuple]) -> Tuple[int, int]:
+        """
+        Like _insert_returning() for statements that RETURN (xmax = 0): a row
+        inserted by this statement has xmax 0, one updated by ON CONFLICT DO
+        UPDATE does not. Returns (inserted, updated).
+        """
+        rows = execute_values(self.cursor, sql, values, page_size=len(values), fetch=True)
+        inserted = sum(1 for (was_inserted,) in rows if was_inserted)
+        return inserted, len(rows) - inserted
+
+    def _insert_returning(self, sql: str, values: List[Tuple]) -> int:
+        """
+        Expand `VALUES %s` with execute_values in a single statement and
+        return the number of RETURNING rows (rows actually inserted).
+        """
+        rows = execute_values(self.cursor, sql, values, page_size=len(values), fetch=True)
+        return len(rows)
+
+    def _insert_committed(self, sql: str, values: List[Tuple]) -> int:
+        inserted = self._insert_returning(sql, values)
+        self._commit()
+        return inserted
+
+    BOOK_COLUMNS = (
+        'title', 'file_hash', 'page_count', 'language', 'notes', 'highlights',
+        'source', 'device_stats_source', 'series_name', 'series_number',
+    )
+    SESSION_COLUMNS = (
+        'book_id', 'start_time', 'duration_minutes', 'pages_read', 'device',
+        'media_type', 'data_source', 'device_stats_source',
+        'read_instance_id', 'read_number', 'is_parallel_read', 'end_time',
+    )
+    # PostgreSQL types of the same columns, for the prepared statements' array parameters
+    BOOK_COLUMN_TYPES = (
+        'text', 'text', 'integer', 'text', 'integer', 'integer',
+        'text', 'text', 'text', 'numeric',
+    )
+    SESSION_COLUMN_TYPES = (
+        'integer', 'timestamptz', 'integer', 'integer', 'text',
+        'text', 'text', 'text',
+        'uuid', 'integer', 'boolean', 'timestamptz',
+    )
+
+    @staticmethod
+    def _book_values(book: Dict) -> Tuple:
+        """Column tuple for one books row, in BOOK_COLUMNS order"""
+        return tuple(book[column] for column in NeonLoader.BOOK_COLUMNS)
+
     def load_books(self, books: List[Dict], dry_run: bool = False) -> int:
         """Load books into Neon.tech (with ON CONFLICT for duplicates)"""
         if not books:
@@ -433,221 +1730,3126 @@ class NeonLoader:
                 RETURNING book_id
             """
 
-            values = [
-                (
-                    book['title'],
-                    book['file_hash'],
-                    book['page_count'],
-                    book['language'],
-                    book['notes'],
-                    book['highlights'],
-                    book['source'],
-                    book['device_stats_source'],
-                    book['series_name'],
-                    book['series_number'],
-                )
-                for book in books
-            ]
+            values = [self._book_values(book) for book in books]
 
             if dry_run:
                 self.logger.info(f"[DRY-RUN] Would insert {len(books)} books")
                 return len(books)
 
-            self.cursor.execute(sql, (values,))
-            inserted = len(self.cursor.fetchall())
-            self.conn.commit()
+            inserted = self._with_reconnect(self._insert_committed, sql, values)
             self.logger.info(f"Inserted {inserted} new books into Neon.tech (duplicates skipped)")
             return inserted
 
         except psycopg2.Error as e:
-            self.conn.rollback()
+            self._rollback()
+            self.load_errors += 1
             self.logger.error(f"Failed to load books: {e}")
             return 0
 
+    # A session re-read from the tail window keeps its start_time, so it
+    # conflicts with the truncated row loaded by the previous run and extends
+    # it in place. Unchanged rows are skipped and not returned.
+    READING_SESSIONS_CONFLICT_SQL = """
+        ON CONFLICT (book_id, start_time, device) DO UPDATE SET
+            duration_minutes = EXCLUDED.duration_minutes,
+            end_time = EXCLUDED.end_time,
+            pages_read = EXCLUDED.pages_read
+        WHERE (reading_sessions.duration_minutes, reading_sessions.end_time, reading_sessions.pages_read)
+            IS DISTINCT FROM (EXCLUDED.duration_minutes, EXCLUDED.end_time, EXCLUDED.pages_read)
+    """
+
+    READING_SESSIONS_INSERT_SQL = """
+        INSERT INTO reading_sessions (
+            book_id, start_time, duration_minutes, pages_read, device,
+            media_type, data_source, device_stats_source,
+            read_instance_id, read_number, is_parallel_read, end_time
+        ) VALUES %s
+    """ + READING_SESSIONS_CONFLICT_SQL + """
+        RETURNING (xmax = 0) AS inserted
+    """
+
+    # Recompute reading_daily_rollups for every day a batch of session
+    # start_times falls on, from all of that day's reading_sessions (any
+    # source). Days are taken with the same timestamptz -> timestamp cast as
+    # the session insert, so they match the stored start_time.
+    DAILY_ROLLUPS_SQL = """
+        WITH touched AS (
+            SELECT DISTINCT (start_time::timestamp)::date AS day
+            FROM unnest(%s::timestamptz[]) AS start_time
+        )
+        INSERT INTO reading_daily_rollups (
+            day, book_id, device, media_type, minutes_read, pages_read, session_count
+        )
+        SELECT touched.day, rs.book_id, rs.device, COALESCE(rs.media_type, 'ebook'),
+               SUM(rs.duration_minutes), SUM(rs.pages_read), COUNT(*)
+        FROM touched
+        JOIN reading_sessions rs
+          ON rs.start_time >= touched.day AND rs.start_time < touched.day + 1
+        GROUP BY touched.day, rs.book_id, rs.device, COALESCE(rs.media_type, 'ebook')
+        ON CONFLICT (day, book_id, device, media_type) DO UPDATE SET
+            minutes_read = EXCLUDED.minutes_read,
+            pages_read = EXCLUDED.pages_read,
+            session_count = EXCLUDED.session_count,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE (reading_daily_rollups.minutes_read, reading_daily_rollups.pages_read,
+               reading_daily_rollups.session_count)
+            IS DISTINCT FROM (EXCLUDED.minutes_read, EXCLUDED.pages_read, EXCLUDED.session_count)
+    """
+
+    def _refresh_daily_rollups(self, start_times: Iterable):
+        """Re-roll the days of `start_times` inside the current (uncommitted) transaction"""
+        if not self.has_daily_rollups:
+            return
+        start_times = list(set(start_times))
+        if not start_times:
+            return
+        self.cursor.execute(self.DAILY_ROLLUPS_SQL, (start_times,))
+        self.rollup_rows += max(0, self.cursor.rowcount)
+
+    @staticmethod
+    def _session_values(session: Mapping) -> Tuple:
+        """Column tuple for one reading_sessions row, in INSERT order"""
+        if isinstance(session, ReadingSessionRecord):
+            return session[:len(NeonLoader.SESSION_COLUMNS)]
+        return (
+            session['book_id'],
+            session['start_time'],
+            session['duration_minutes'],
+            session['pages_read'],
+            session['device'],
+            session['media_type'],
+            session['data_source'],
+            session['device_stats_source'],
+            session['read_instance_id'],
+            session['read_number'],
+            session['is_parallel_read'],
+            session.get('end_time'),
+        )
+
+    def _upsert_sessions(self, values: List[Tuple]) -> Tuple[int, int]:
+        """Upsert one batch and re-roll its days in a single committed transaction"""
+        inserted, extended = self._upsert_returning(self.READING_SESSIONS_INSERT_SQL, values)
+        self._refresh_daily_rollups(value[1] for value in values)
+        self._commit()
+        return inserted, extended
+
     def load_reading_sessions(self, sessions: List[Dict], dry_run: bool = False) -> int:
         """Load reading_sessions into Neon.tech (with ON CONFLICT for duplicates)"""
         if not sessions:
             return 0
 
         try:
-            sql = """
-                INSERT INTO reading_sessions (
-                    book_id, start_time, duration_minutes, pages_read, device,
-                    media_type, data_source, device_stats_source,
-                    read_instance_id, read_number, is_parallel_read
-                ) VALUES %s
-                ON CONFLICT (book_id, start_time, device) DO NOTHING
-                RETURNING session_id
-            """
-
-            values = [
-                (
-                    session['book_id'],
-                    session['start_time'],
-                    session['duration_minutes'],
-                    session['pages_read'],
-                    session['device'],
-                    session['media_type'],
-                    session['data_source'],
-                    session['device_stats_source'],
-                    session['read_instance_id'],
-                    session['read_number'],
-                    session['is_parallel_read'],
-                )
-                for session in sessions
-            ]
+            values = [self._session_values(session) for session in sessions]
 
             if dry_run:
                 self.logger.info(f"[DRY-RUN] Would insert {len(sessions)} reading sessions")
                 return len(sessions)
 
-            self.cursor.execute(sql, (values,))
-            inserted = len(self.cursor.fetchall())
-            self.conn.commit()
-            self.logger.info(f"Inserted {inserted} new reading sessions (duplicates skipped)")
+            inserted, extended = self._with_reconnect(self._upsert_sessions, values)
+            self.sessions_extended += extended
+            self.logger.info(f"Inserted {inserted} new reading sessions, extended {extended} "
+                             f"(unchanged duplicates skipped)")
             return inserted
 
         except psycopg2.Error as e:
-            self.conn.rollback()
+            self._rollback()
+            self.load_errors += 1
+            self.stale_book_ids |= e.pgcode == FOREIGN_KEY_VIOLATION
             self.logger.error(f"Failed to load reading_sessions: {e}")
             return 0
 
-    def get_record_counts(self) -> Dict[str, int]:
-        """Get current record counts from Neon.tech"""
+    def load_reading_sessions_stream(
+        self,
+        sessions: Iterable[Dict],
+        batch_size: int = 1000,
+        dry_run: bool = False
+    ) -> int:
+        """
+        Load reading_sessions from an iterator, flushing and committing every
+        `batch_size` rows. A batch interrupted by a dropped connection is
+        re-sent after reconnecting; any other failed batch is rolled back and
+        counted in load_errors. ON CONFLICT makes re-sending batches harmless.
+        """
+        inserted = 0
+        seen = 0
+        extended_before = self.sessions_extended
+        batch: List[Tuple] = []
+
+        def flush() -> int:
+            if dry_run:
+                return len(batch)
+            try:
+                count, extended = self._with_reconnect(self._upsert_sessions, batch)
+                self.sessions_extended += extended
+                self.logger.debug(f"Flushed batch of {len(batch)} sessions ({count} new, {extended} extended)")
+                return count
+            except psycopg2.Error as e:
+                self._rollback()
+                self.load_errors += 1
+                self.stale_book_ids |= e.pgcode == FOREIGN_KEY_VIOLATION
+                self.logger.error(f"Failed to load reading_sessions batch: {e}")
+                return 0
+
+        for session in sessions:
+            batch.append(self._session_values(session))
+            seen += 1
+            if len(batch) >= batch_size:
+                inserted += flush()
+                batch = []
+        if batch:
+            inserted += flush()
+
+        if dry_run:
+            self.logger.info(f"[DRY-RUN] Would insert {seen} reading sessions")
+        else:
+            self.logger.info(
+                f"Inserted {inserted} new reading sessions from {seen} streamed, extended "
+                f"{self.sessions_extended - extended_before} (unchanged duplicates skipped)"
+            )
+        return inserted
+
+    def _copy_merge(
+        self,
+        table: str,
+        columns: Tuple[str, ...],
+        rows: Iterable[Tuple],
+        conflict_clause: str,
+        before_commit: Optional[Callable[[], None]] = None
+    ) -> Tuple[int, int, int]:
+        """
+        COPY rows into a temporary staging table shaped like `table`, then merge
+        them with one set-based INSERT ... SELECT ... ON CONFLICT.
+
+        Returns (staged, inserted, updated), counted server-side from
+        RETURNING (xmax = 0). `before_commit` runs in the same transaction,
+        after the merge. The staging table is dropped on commit; inside a run
+        transaction a later call finds it still there and empties it first.
+        """
+        column_list = ', '.join(columns)
+        staging = f"staging_{table}"
+
+        self.cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DROP AS "
+            f"SELECT {column_list} FROM {table} WITH NO DATA"
+        )
+        self.cursor.execute(f"TRUNCATE {staging}")
+        stream = _CopyStream(rows)
+        self.cursor.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN", stream)
+        self.cursor.execute(
+            f"WITH merged AS ("
+            f"INSERT INTO {table} ({column_list}) "
+            f"SELECT {column_list} FROM {staging} "
+            f"{conflict_clause} "
+            f"RETURNING (xmax = 0) AS inserted) "
+            f"SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM merged"
+        )
+        inserted, updated = self.cursor.fetchone()
+        if before_commit is not None:
+            before_commit()
+        self._commit()
+        return stream.rows, inserted, updated
+
+    def copy_books(self, books: List[Dict], dry_run: bool = False) -> int:
+        """Load books via COPY into a staging table and a single merge statement"""
+        if not books:
+            return 0
+        if dry_run:
+            self.logger.info(f"[DRY-RUN] Would COPY {len(books)} books")
+            return len(books)
+
         try:
-            counts = {}
-            for table in ['books', 'reading_sessions']:
-                self.cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                counts[table] = self.cursor.fetchone()[0]
-            return counts
+            staged, inserted, _ = self._with_reconnect(
+                self._copy_merge, 'books', self.BOOK_COLUMNS,
+                [self._book_values(book) for book in books],
+                "ON CONFLICT (file_hash) DO NOTHING"
+            )
+            self.logger.info(
+                f"Inserted {inserted} new books into Neon.tech via COPY "
+                f"({staged - inserted} duplicates skipped)"
+            )
+            return inserted
         except psycopg2.Error as e:
-            self.logger.error(f"Failed to get record counts: {e}")
-            return {}
+            self._rollback()
+            self.load_errors += 1
+            self.logger.error(f"Failed to COPY books: {e}")
+            return 0
 
+    def copy_reading_sessions(self, sessions: Iterable[Dict], dry_run: bool = False) -> int:
+        """
+        Load reading_sessions via COPY into a staging table and a single merge
+        statement. Accepts a list or an iterator; rows are streamed to the
+        server as they are produced.
+        """
+        if dry_run:
+            count = sum(1 for _ in sessions)
+            self.logger.info(f"[DRY-RUN] Would COPY {count} reading sessions")
+            return count
 
-# ============================================================================
-# Main ETL Pipeline
-# ============================================================================
+        start_times = set()
 
-def run_etl(dry_run: bool = False) -> bool:
-    """Execute complete ETL pipeline"""
+        def rows() -> Iterator[Tuple]:
+            for session in sessions:
+                values = self._session_values(session)
+                start_times.add(values[1])
+                yield values
 
-    # Validate configuration
-    try:
-        Config.validate()
-    except ValueError as e:
-        print(f"Configuration Error: {e}")
-        return False
+        merge = (
+            'reading_sessions', self.SESSION_COLUMNS, rows(), self.READING_SESSIONS_CONFLICT_SQL,
+            lambda: self._refresh_daily_rollups(start_times)
+        )
+        try:
+            # Not _with_reconnect(): the rows are consumed as they stream, so
+            # they cannot be resent. In a run transaction the savepoint keeps
+            # a failed COPY from aborting the whole transaction.
+            if self.in_transaction:
+                staged, inserted, extended = self._in_savepoint(self._copy_merge, *merge)
+            else:
+                staged, inserted, extended = self._copy_merge(*merge)
+            self.sessions_extended += extended
+            self.logger.info(
+                f"Inserted {inserted} new reading sessions via COPY, extended {extended} "
+                f"({staged - inserted - extended} unchanged duplicates skipped)"
+            )
+            return inserted
+        except psycopg2.Error as e:
+            self._rollback()
+            self.load_errors += 1
+            self.stale_book_ids |= e.pgcode == FOREIGN_KEY_VIOLATION
+            self.logger.error(f"Failed to COPY reading_sessions: {e}")
+            return 0
 
-    # Setup logging
-    logger = setup_logging(Config.ETL_LOG_PATH, dry_run)
+    PREPARED_LOADS = {
+        'etl_insert_books': _prepared_insert(
+            'etl_insert_books', 'books', BOOK_COLUMNS, BOOK_COLUMN_TYPES,
+            "ON CONFLICT (file_hash) DO NOTHING"
+        ),
+        'etl_upsert_sessions': _prepared_insert(
+            'etl_upsert_sessions', 'reading_sessions', SESSION_COLUMNS, SESSION_COLUMN_TYPES,
+            READING_SESSIONS_CONFLICT_SQL
+        ),
+    }
 
-    logger.info("=" * 70)
-    logger.info("ETL Pipeline: KOReader Statistics → Neon.tech PostgreSQL")
-    logger.info("=" * 70)
-    logger.info(f"Started at {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}")
-    logger.info(f"Mode: {'DRY-RUN' if dry_run else 'NORMAL'}")
-    logger.info(f"Source: {Config.KOREADER_BACKUP}")
-    logger.info(f"Target: {Config.NEON_HOST}/{Config.NEON_DATABASE}")
-    logger.info(f"Device: {Config.DEVICE_ID}")
-    logger.info(f"Session Gap Threshold: {Config.SESSION_GAP_MINUTES} minutes")
+    def _prepare_loads(self):
+        """
+        PREPARE the load statements on this connection. A pooled or kept
+        connection (or one behind a pooler) may already have them, so look
+        them up first.
+        """
+        if self._prepared_conn is self.conn:
+            return
+        self.cursor.execute(
+            "SELECT name FROM pg_prepared_statements WHERE name = ANY(%s)", (list(self.PREPARED_LOADS),)
+        )
+        existing = {row[0] for row in self.cursor.fetchall()}
+        for name, (prepare, _) in self.PREPARED_LOADS.items():
+            if name not in existing:
+                self.cursor.execute(prepare)
+        self._prepared_conn = self.conn
 
-    # Step 1: Extract from KOReader
-    logger.info("\n[STEP 1] Extracting from KOReader statistics.sqlite3...")
-    extractor = KOReaderExtractor(Config.KOREADER_BACKUP, logger)
+    def _execute_prepared(self, name: str, values: List[Tuple]) -> Tuple[int, int]:
+        """EXECUTE a prepared load with the batch's values as one array per column"""
+        self._prepare_loads()
+        try:
+            self.cursor.execute(self.PREPARED_LOADS[name][1], [list(column) for column in zip(*values)])
+        except psycopg2.Error:
+            # Look the statements up again rather than assume they survived
+            self._prepared_conn = None
+            raise
+        inserted, updated = self.cursor.fetchone()
+        return inserted, updated
 
-    if not extractor.connect():
-        logger.error("Failed to connect to KOReader database - aborting")
-        return False
+    def _insert_books_prepared(self, values: List[Tuple]) -> int:
+        inserted, _ = self._execute_prepared('etl_insert_books', values)
+        self._commit()
+        return inserted
 
-    koreader_books = extractor.extract_books()
-    koreader_sessions = extractor.extract_page_stat_data()
-    extractor.disconnect()
+    def _upsert_sessions_prepared(self, values: List[Tuple]) -> Tuple[int, int]:
+        """Prepared form of _upsert_sessions()"""
+        inserted, extended = self._execute_prepared('etl_upsert_sessions', values)
+        self._refresh_daily_rollups(value[1] for value in values)
+        self._commit()
+        return inserted, extended
 
-    if not koreader_books or not koreader_sessions:
-        logger.error("No data extracted from KOReader - aborting")
-        return False
+    def load_books_prepared(self, books: List[Dict], dry_run: bool = False) -> int:
+        """Load books with the prepared insert statement (ON CONFLICT for duplicates)"""
+        if not books:
+            return 0
+        if dry_run:
+            self.logger.info(f"[DRY-RUN] Would insert {len(books)} books")
+            return len(books)
 
-    # Step 2: Aggregate sessions
-    logger.info("\n[STEP 2] Aggregating reading sessions...")
-    aggregator = SessionAggregator(Config.SESSION_GAP_MINUTES, logger)
-    aggregated_sessions = aggregator.aggregate(koreader_sessions)
+        try:
+            inserted = self._with_reconnect(
+                self._insert_books_prepared, [self._book_values(book) for book in books]
+            )
+            self.logger.info(f"Inserted {inserted} new books into Neon.tech (duplicates skipped)")
+            return inserted
+        except psycopg2.Error as e:
+            self._rollback()
+            self.load_errors += 1
+            self.logger.error(f"Failed to load books: {e}")
+            return 0
 
-    # Step 3: Transform data
-    logger.info("\n[STEP 3] Transforming data to Neon.tech schema...")
-    transformer = DataTransformer(Config.DEVICE_ID, logger)
-    books = transformer.transform_books(koreader_books)
-    sessions = transformer.transform_sessions(aggregated_sessions, koreader_books)
+    def load_reading_sessions_prepared(
+        self,
+        sessions: Iterable[Dict],
+        batch_size: int = 1000,
+        dry_run: bool = False
+    ) -> int:
+        """
+        Load reading_sessions from a list or an iterator with the prepared
+        upsert statement, `batch_size` rows per EXECUTE. Inside a run
+        transaction (see begin()) each batch has its own savepoint; otherwise
+        each batch is committed as in load_reading_sessions_stream().
+        """
+        inserted = 0
+        seen = 0
+        extended_before = self.sessions_extended
 
-    # Step 4: Connect to Neon.tech
-    logger.info("\n[STEP 4] Connecting to Neon.tech...")
-    loader = NeonLoader(logger)
+        for batch in _batched((self._session_values(session) for session in sessions), batch_size):
+            seen += len(batch)
+            if dry_run:
+                continue
+            try:
+                count, extended = self._with_reconnect(self._upsert_sessions_prepared, batch)
+                inserted += count
+                self.sessions_extended += extended
+                self.logger.debug(f"Loaded batch of {len(batch)} sessions ({count} new, {extended} extended)")
+            except psycopg2.Error as e:
+                self._rollback()
+                self.load_errors += 1
+                self.stale_book_ids |= e.pgcode == FOREIGN_KEY_VIOLATION
+                self.logger.error(f"Failed to load reading_sessions batch: {e}")
 
-    if not loader.connect(
-        Config.NEON_HOST,
-        Config.NEON_USER,
-        Config.NEON_PASSWORD,
-        Config.NEON_DATABASE
-    ):
-        logger.error("Failed to connect to Neon.tech - aborting")
-        return False
+        if dry_run:
+            self.logger.info(f"[DRY-RUN] Would insert {seen} reading sessions")
+            return seen
+        self.logger.info(
+            f"Inserted {inserted} new reading sessions from {seen}, extended "
+            f"{self.sessions_extended - extended_before} (unchanged duplicates skipped)"
+        )
+        return inserted
 
-    # Step 5: Validate schema
-    logger.info("\n[STEP 5] Validating Neon.tech schema...")
-    if not loader.validate_schema():
-        logger.error("Schema validation failed - aborting")
-        loader.disconnect()
-        return False
+    def fetch_book_ids(self, file_hashes: Iterable[str]) -> Dict[str, int]:
+        """Map file_hash -> books.book_id for the given hashes, in one query"""
+        file_hashes = list(file_hashes)
 
-    # Get pre-load counts
-    counts_before = loader.get_record_counts()
-    logger.info(f"Pre-load counts: books={counts_before.get('books', 0)}, "
-                f"sessions={counts_before.get('reading_sessions', 0)}")
+        def fetch() -> Dict[str, int]:
+            self.cursor.execute(
+                "SELECT file_hash, book_id FROM books WHERE file_hash = ANY(%s)",
+                (file_hashes,)
+            )
+            rows = self.cursor.fetchall()
+            self._commit()
+            return dict(rows)
 
-    # Step 6: Load data
-    logger.info("\n[STEP 6] Loading data into Neon.tech...")
-    books_inserted = loader.load_books(books, dry_run=dry_run)
-    sessions_inserted = loader.load_reading_sessions(sessions, dry_run=dry_run)
+        try:
+            return self._with_reconnect(fetch)
+        except psycopg2.Error as e:
+            self._rollback()
+            self.logger.error(f"Failed to fetch book ids: {e}")
+            return {}
 
-    # Get post-load counts
-    counts_after = loader.get_record_counts()
-    logger.info(f"Post-load counts: books={counts_after.get('books', 0)}, "
-                f"sessions={counts_after.get('reading_sessions', 0)}")
+    def get_sync_cursor(self, source_name: str) -> Optional[int]:
+        """Read the stored page_stat_data cursor (max start_time) for a source"""
 
-    loader.disconnect()
+        def fetch() -> Optional[Tuple]:
+            self.cursor.execute(
+                "SELECT last_sync_cursor FROM sync_status WHERE source_name = %s",
+                (source_name,)
+            )
+            row = self.cursor.fetchone()
+            self._commit()
+            return row
 
-    # Summary
-    logger.info("\n" + "=" * 70)
-    logger.info("ETL SUMMARY")
-    logger.info("=" * 70)
-    logger.info(f"KOReader books extracted: {len(koreader_books)}")
-    logger.info(f"Page stat data records: {len(koreader_sessions)}")
-    logger.info(f"Aggregated sessions: {len(aggregated_sessions)}")
-    logger.info(f"Books inserted into Neon.tech: {books_inserted}")
-    logger.info(f"Reading sessions inserted: {sessions_inserted}")
-    logger.info(f"Completed at {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}")
-    logger.info("=" * 70)
+        try:
+            row = self._with_reconnect(fetch)
+            if not row or row[0] is None:
+                return None
+            return int(row[0])
+        except (psycopg2.Error, ValueError) as e:
+            self._rollback()
+            self.logger.warning(f"Could not read sync cursor for '{source_name}': {e}")
+            return None
 
-    return True
+    def update_sync_status(
+        self,
+        source_name: str,
+        cursor: Optional[int],
+        records_synced: int,
+        records_created: int,
+        duration_seconds: float,
+        status: str,
+        sync_mode: str,
+        error_message: Optional[str] = None,
+        records_updated: int = 0,
+        run_metrics: Optional[Dict] = None
+    ) -> bool:
+        """
+        Record the outcome of a run in sync_status.
+
+        A None cursor keeps the previously stored value, so failed runs never
+        move the cursor past rows that were not loaded. Inside a run
+        transaction a failed update counts as a load error. `run_metrics` (see
+        RunMetrics) is stored in sync_status.run_metrics when that column exists.
+        """
+        row = {
+            'source_name': source_name,
+            'last_sync_cursor': str(cursor) if cursor is not None else None,
+            'records_synced': records_synced,
+            'records_created': records_created,
+            'records_updated': records_updated,
+            'sync_status': status,
+            'error_message': error_message,
+            'sync_duration_seconds': int(round(duration_seconds)),
+            'sync_mode': sync_mode,
+        }
+        if self.has_run_metrics and run_metrics is not None:
+            row['run_metrics'] = json.dumps(run_metrics)
+        updates = ',\n                    '.join(
+            f"{column} = EXCLUDED.{column}" for column in row
+            if column not in ('source_name', 'last_sync_cursor')
+        )
+
+        def record():
+            self.cursor.execute(f"""
+                INSERT INTO sync_status (
+                    last_sync_time, {', '.join(row)}
+                ) VALUES (CURRENT_TIMESTAMP, {', '.join(['%s'] * len(row))})
+                ON CONFLICT (source_name) DO UPDATE SET
+                    last_sync_time = EXCLUDED.last_sync_time,
+                    last_sync_cursor = COALESCE(EXCLUDED.last_sync_cursor,
+                                                sync_status.last_sync_cursor),
+                    {updates}
+            """, tuple(row.values()))
+            self._commit()
+
+        try:
+            self._with_reconnect(record)
+            self.logger.info(
+                f"Updated sync_status for {source_name}: status={status}, cursor={cursor}"
+            )
+            return True
+        except psycopg2.Error as e:
+            self._rollback()
+            if self.in_transaction:
+                # The row commits with the run's rows; the run must not commit without it
+                self.load_errors += 1
+            self.logger.error(f"Failed to update sync_status: {e}")
+            return False
 
 
 # ============================================================================
-# CLI Entry Point
+# Book ID Resolution
 # ============================================================================
 
-def main():
-    parser = argparse.ArgumentParser(
-        description='Extract KOReader statistics and load into Neon.tech PostgreSQL'
-    )
-    parser.add_argument(
-        '--dry-run',
-        action='store_true',
-        help='Preview what would be loaded without writing to database'
+class BookIdResolver:
+    """
+    file_hash -> Neon.tech books.book_id, cached in a local JSON file.
+
+    resolve() fetches only hashes missing from the cache, in one query, so a
+    run over known books binds every session without a round trip. The cache
+    is tied to one Neon.tech host/database and is dropped when the target
+    changes or when a session load hits a foreign key violation (a cached
+    book was deleted). Safe to share between loader threads, one device each.
+
+    bind() drops sessions of books that did not resolve and counts them per
+    device; unresolved() > 0 fails the run, so the sync cursor does not
+    advance past sessions that were never loaded. A dry run inserts no
+    books, so it keeps them unbound (book_id None) to be counted as new.
+    """
+
+    def __init__(self, path: str, target: str, logger: logging.Logger, read_only: bool = False):
+        self.path = Path(path)
+        self.target = target
+        self.logger = logger
+        self.read_only = read_only
+        self.book_ids: Dict[str, int] = {}
+        self.fetched = 0
+        # Per-device bind() tallies: sessions dropped for an unresolved book
+        self.missing: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        try:
+            stored = json.loads(self.path.read_text())
+            if stored.get('target') == target:
+                self.book_ids = {file_hash: int(book_id) for file_hash, book_id in stored['book_ids'].items()}
+            else:
+                self.logger.info(f"Book id cache {self.path} is for another database - starting empty")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            self.logger.warning(f"Ignoring unreadable book id cache {self.path}: {e}")
+
+    def resolve(self, loader: NeonLoader, file_hashes: Iterable[Optional[str]]) -> Dict[str, int]:
+        """Make sure every known hash in `file_hashes` is cached; returns the cache"""
+        with self._lock:
+            unseen = {file_hash for file_hash in file_hashes if file_hash} - self.book_ids.keys()
+            if unseen:
+                found = loader.fetch_book_ids(sorted(unseen))
+                self.fetched += len(found)
+                self.book_ids.update(found)
+                self.logger.debug(f"Resolved {len(found)} of {len(unseen)} uncached book hashes")
+                if found:
+                    self._save()
+            return self.book_ids
+
+    def bind(
+        self, sessions: Iterable[ReadingSessionRecord], device: str, keep_unresolved: bool = False
+    ) -> Iterator[ReadingSessionRecord]:
+        """Fill in book_id from the cache; sessions of unresolved books are tallied in missing[device] and skipped"""
+        missing = set()
+        with self._lock:
+            self.missing[device] = 0
+        for session in sessions:
+            if session.book_id is not None:
+                yield session
+                continue
+            book_id = self.book_ids.get(session.file_hash)
+            if book_id is None:
+                if session.file_hash not in missing and keep_unresolved:
+                    self.logger.info(f"Book {session.file_hash} has no cached Neon.tech id - its sessions count as new")
+                elif session.file_hash not in missing:
+                    self.logger.warning(
+                        f"Book {session.file_hash} not found in Neon.tech books - skipping its sessions"
+                    )
+                missing.add(session.file_hash)
+                self.missing[device] += 1
+                if keep_unresolved:
+                    yield session
+                continue
+            yield session._replace(book_id=book_id)
+
+    def unresolved(self, device: str) -> int:
+        """Sessions the last bind() for `device` dropped because their book has no id"""
+        return self.missing.get(device, 0)
+
+    def invalidate(self):
+        """Forget every cached id; the next resolve() fetches them again"""
+        with self._lock:
+            self.logger.warning("Book id cache invalidated after a foreign key violation")
+            self.book_ids = {}
+            self._save()
+
+    def _save(self):
+        if self.read_only:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps(
+                {'target': self.target, 'book_ids': self.book_ids}, indent=2, sort_keys=True
+            ))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.warning(f"Failed to write book id cache {self.path}: {e}")
+
+
+def make_book_id_resolver(logger: logging.Logger, read_only: bool = False) -> BookIdResolver:
+    """BookIdResolver for the configured Neon.tech database"""
+    return BookIdResolver(
+        Config.BOOK_ID_CACHE_PATH, f"{Config.NEON_HOST}/{Config.NEON_DATABASE}", logger, read_only
     )
 
-    args = parser.parse_args()
 
-    success = run_etl(dry_run=args.dry_run)
+# ============================================================================
+# Known Session Keys
+# ============================================================================
+
+def _epoch_seconds(value) -> Optional[int]:
+    """Unix seconds of a session timestamp; naive datetimes are UTC, as stored in Neon.tech"""
+    if value is None or isinstance(value, int):
+        return value
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+class SessionKeySet:
+    """
+    The reading_sessions rows already in Neon.tech, per device, kept in a
+    local file so unchanged sessions are dropped before they are sent.
+
+    Each device's rows are two array('q') columns sorted by key: the exact
+    (book_id, start_time) conflict key packed into one integer, and a 64-bit
+    digest of the columns ON CONFLICT DO UPDATE may change (duration_minutes,
+    end_time, pages_read). filter() drops a session only when its key is
+    known and its digest matches - the rows the upsert would skip anyway - so
+    new and extended sessions are still sent. 16 bytes per session.
+
+    sync() loads a device's keys from Neon.tech the first time it is seen,
+    and again when `reload` is set (--force), e.g. after rows were deleted by
+    hand; otherwise it costs no query. commit() adds the rows a successful
+    run sent; rows a failed run left behind are missing from the set and
+    only get sent again. Like BookIdResolver the set is tied to one Neon.tech
+    host/database; it is safe to share between loader threads, one device each.
+    """
+
+    # Packed key: book_id in the high bits, start_time (Unix seconds) below
+    START_TIME_BITS = 34
+    BOOK_ID_BITS = 63 - START_TIME_BITS
+
+    KEYS_QUERY = """
+        SELECT book_id, EXTRACT(EPOCH FROM start_time)::bigint,
+               duration_minutes, EXTRACT(EPOCH FROM end_time)::bigint, pages_read
+        FROM reading_sessions
+        WHERE device = %s
+    """
+
+    def __init__(self, path: str, target: str, logger: logging.Logger, read_only: bool = False):
+        self.path = Path(path)
+        self.target = target
+        self.logger = logger
+        self.read_only = read_only
+        self.keys: Dict[str, Tuple[array, array]] = {}
+        # Per-device filter() tallies: new, changed and unchanged sessions
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self._pending: Dict[str, Dict[int, int]] = {}
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, 'rb') as f:
+                header = json.loads(f.readline())
+                if header.get('target') != target or header.get('byteorder') != sys.byteorder:
+                    self.logger.info(f"Session key set {self.path} is for another database - starting empty")
+                else:
+                    for device, count in header['devices'].items():
+                        keys, versions = array('q'), array('q')
+                        keys.fromfile(f, count)
+                        versions.fromfile(f, count)
+                        self.keys[device] = (keys, versions)
+        except FileNotFoundError:
+            pass
+        except (OSError, EOFError, ValueError, KeyError, AttributeError) as e:
+            self.logger.warning(f"Ignoring unreadable session key set {self.path}: {e}")
+            self.keys = {}
+
+    @classmethod
+    def _key(cls, book_id: Optional[int], start_time) -> Optional[int]:
+        """(book_id, start_time) packed into one int64, or None if it does not fit"""
+        start = _epoch_seconds(start_time)
+        if book_id is None or start is None:
+            return None
+        if not (0 <= book_id < 1 << cls.BOOK_ID_BITS and 0 <= start < 1 << cls.START_TIME_BITS):
+            return None
+        return (book_id << cls.START_TIME_BITS) | start
+
+    @staticmethod
+    def _version(duration_minutes: Optional[int], end_time: Optional[int], pages_read: Optional[int]) -> int:
+        digest = hashlib.blake2b(f"{duration_minutes}|{end_time}|{pages_read}".encode(), digest_size=8)
+        return int.from_bytes(digest.digest(), 'little', signed=True)
+
+    def known(self, device: str) -> bool:
+        """Whether `device` has keys loaded, i.e. filter() counts are exact"""
+        return device in self.keys
+
+    def sync(self, loader: NeonLoader, device: str, reload: bool = False) -> bool:
+        """Load `device`'s keys from Neon.tech unless they are stored already and `reload` is not set"""
+        if device in self.keys and not reload:
+            return True
+
+        def fetch() -> List[Tuple[int, int]]:
+            rows = []
+            with loader.conn.cursor(name='session_keys') as cursor:
+                cursor.itersize = 10000
+                cursor.execute(self.KEYS_QUERY, (device,))
+                for book_id, start, duration_minutes, end, pages_read in cursor:
+                    key = self._key(book_id, start)
+                    if key is not None:
+                        rows.append((key, self._version(duration_minutes, end, pages_read)))
+            loader._commit()
+            return rows
+
+        try:
+            rows = loader._with_reconnect(fetch)
+        except psycopg2.Error as e:
+            loader._rollback()
+            self.logger.warning(f"Could not sync session keys for {device} - sending every session: {e}")
+            with self._lock:
+                self.keys.pop(device, None)
+            return False
+
+        rows.sort()
+        with self._lock:
+            self.keys[device] = (array('q', (key for key, _ in rows)),
+                                 array('q', (version for _, version in rows)))
+            self._save()
+        self.logger.info(f"Session keys for {device} reloaded: {len(rows)} rows in Neon.tech")
+        return True
+
+    def filter(
+        self, device: str, sessions: Iterable[ReadingSessionRecord], resume: bool = False
+    ) -> Iterator[ReadingSessionRecord]:
+        """
+        Drop bound sessions already in Neon.tech with the same values; tallies
+        in counts[device]. With `resume` the tallies and the sessions awaiting
+        commit() add to the previous call's, for a run filtered batch by batch.
+        """
+        keys, versions = self.keys.get(device) or (array('q'), array('q'))
+        with self._lock:
+            if resume and device in self._pending:
+                counts, pending = self.counts[device], self._pending[device]
+            else:
+                counts = self.counts[device] = {'new': 0, 'changed': 0, 'unchanged': 0}
+                pending = self._pending[device] = {}
+
+        for session in sessions:
+            key = self._key(session['book_id'], session['start_time'])
+            if key is None:
+                counts['new'] += 1
+                yield session
+                continue
+            version = self._version(
+                session['duration_minutes'], _epoch_seconds(session['end_time']), session['pages_read']
+            )
+            index = bisect_left(keys, key)
+            if index < len(keys) and keys[index] == key:
+                if versions[index] == version:
+                    counts['unchanged'] += 1
+                    continue
+                counts['changed'] += 1
+            else:
+                counts['new'] += 1
+            pending[key] = version
+            yield session
+
+    def commit(self, device: str):
+        """Add the sessions filter() let through for `device`, once they are loaded"""
+        with self._lock:
+            pending = self._pending.pop(device, None)
+            if not pending:
+                return
+            keys, versions = self.keys.get(device) or (array('q'), array('q'))
+            added = []
+            for key, version in pending.items():
+                index = bisect_left(keys, key)
+                if index < len(keys) and keys[index] == key:
+                    versions[index] = version
+                else:
+                    added.append((key, version))
+            if added:
+                rows = sorted(chain(zip(keys, versions), added))
+                keys = array('q', (key for key, _ in rows))
+                versions = array('q', (version for _, version in rows))
+            self.keys[device] = (keys, versions)
+            self._save()
+
+    def skipped(self, device: str) -> int:
+        """Sessions of `device` that filter() dropped as already in Neon.tech"""
+        return self.counts.get(device, {}).get('unchanged', 0)
+
+    def log_counts(self, device: str, dry_run: bool = False):
+        counts = self.counts.get(device)
+        if counts is None:
+            return
+        if dry_run and not self.known(device):
+            self.logger.info(f"[DRY-RUN] No session keys stored for {device} - "
+                             f"all {counts['new']} sessions counted as new")
+        elif dry_run:
+            self.logger.info(f"[DRY-RUN] {counts['new']} sessions would be new, {counts['changed']} "
+                             f"would be updated, {counts['unchanged']} are already in Neon.tech")
+        else:
+            self.logger.info(f"Known sessions for {device}: {counts['unchanged']} unchanged not sent, "
+                             f"{counts['new']} new and {counts['changed']} changed sent")
+
+    def _save(self):
+        if self.read_only:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            devices = {device: len(keys) for device, (keys, _) in sorted(self.keys.items())}
+            with open(tmp_path, 'wb') as f:
+                f.write(json.dumps({
+                    'target': self.target, 'byteorder': sys.byteorder, 'devices': devices
+                }, sort_keys=True).encode() + b'\n')
+                for device in devices:
+                    keys, versions = self.keys[device]
+                    keys.tofile(f)
+                    versions.tofile(f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.warning(f"Failed to write session key set {self.path}: {e}")
+
+
+def make_session_key_set(logger: logging.Logger, read_only: bool = False) -> SessionKeySet:
+    """SessionKeySet for the configured Neon.tech database"""
+    return SessionKeySet(
+        Config.SESSION_KEYS_PATH, f"{Config.NEON_HOST}/{Config.NEON_DATABASE}", logger, read_only
+    )
+
+
+# ============================================================================
+# Columnar Cache
+# ============================================================================
+
+class ColumnarCache:
+    """
+    Local Parquet copy of the reading history for offline analytics, so
+    scans over years of page turns never touch Neon.tech or statistics.sqlite3.
+    Tables are Hive-partitioned by device and by month of start_time:
+
+        <path>/page_stats/device=<id>/month=YYYY-MM/part-<first start_time>-<n>.parquet
+        <path>/sessions/device=<id>/month=YYYY-MM/sessions.parquet
+        <path>/books/device=<id>/books.parquet
+        <path>/_cursors/<id>.json
+
+    page_stats is append-only: a run writes only the rows newer than the
+    device's cache cursor (the max start_time cached so far) as new part
+    files. A cached session can still grow (see find_open_sessions()), so
+    each month a run touches is rewritten with that run's sessions replacing
+    any with the same (file_hash, start_time). books is replaced every run.
+    """
+
+    PARTITIONING = [('device', 'string'), ('month', 'string')]
+
+    def __init__(self, path: str, logger: logging.Logger):
+        if pa is None:
+            raise ImportError("the columnar cache requires pyarrow (pip3 install pyarrow)")
+        self.path = Path(path)
+        self.logger = logger
+        self.page_stats_written = 0
+        self.sessions_written = 0
+
+    def cursor(self, device: str) -> Optional[int]:
+        """Max page_stat_data start_time cached for `device`"""
+        try:
+            return json.loads(self._cursor_path(device).read_text()).get('page_stats')
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable columnar cache cursor for {device}: {e}")
+            return None
+
+    def update(
+        self,
+        device: str,
+        koreader_books: List[Dict],
+        books: List[Dict],
+        sessions: List[ReadingSessionRecord],
+        page_stats=None
+    ) -> bool:
+        """
+        Cache one run's books, transformed sessions and (when the engine read
+        them) page_stat_data rows, as PageStatColumns or a dict of NumPy
+        columns. Returns False, leaving the cursor unchanged, if a write fails.
+        """
+        self.page_stats_written = 0
+        self.sessions_written = 0
+        try:
+            self._write_books(device, books)
+            self.sessions_written = self._upsert_sessions(device, sessions)
+            if page_stats is not None:
+                md5_by_book_id = {book['id']: book['md5'] for book in koreader_books}
+                self.page_stats_written = self._append_page_stats(device, page_stats, md5_by_book_id)
+        except (OSError, pa.ArrowException) as e:
+            self.logger.error(f"Failed to update columnar cache {self.path}: {e}")
+            return False
+        self.logger.info(f"Columnar cache: {self.page_stats_written} page stats appended, "
+                         f"{self.sessions_written} sessions written for {device}")
+        return True
+
+    def _cursor_path(self, device: str) -> Path:
+        return self.path / '_cursors' / f"{device}.json"
+
+    def _device_dir(self, table: str, device: str) -> Path:
+        return self.path / table / f"device={device}"
+
+    @staticmethod
+    def _write_table(table: 'pa.Table', path: Path):
+        import pyarrow.parquet as pq
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _write_books(self, device: str, books: List[Dict]):
+        columns = ('file_hash', 'title', 'page_count', 'language', 'series_name', 'series_number')
+        table = pa.table({name: [book.get(name) for book in books] for name in columns})
+        self._write_table(table, self._device_dir('books', device) / 'books.parquet')
+
+    def _upsert_sessions(self, device: str, sessions: List[ReadingSessionRecord]) -> int:
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            ('file_hash', pa.string()),
+            ('start_time', pa.timestamp('ms', tz='UTC')),
+            ('end_time', pa.timestamp('ms', tz='UTC')),
+            ('duration_minutes', pa.int64()),
+            ('pages_read', pa.int64()),
+        ])
+        by_month: Dict[str, List[ReadingSessionRecord]] = {}
+        for session in sessions:
+            by_month.setdefault(session.start_time.strftime('%Y-%m'), []).append(session)
+
+        for month, month_sessions in sorted(by_month.items()):
+            table = pa.table({
+                'file_hash': [session.file_hash for session in month_sessions],
+                'start_time': [session.start_time for session in month_sessions],
+                'end_time': [session.end_time for session in month_sessions],
+                'duration_minutes': [session.duration_minutes for session in month_sessions],
+                'pages_read': [session.pages_read for session in month_sessions],
+            }, schema=schema)
+            path = self._device_dir('sessions', device) / f"month={month}" / 'sessions.parquet'
+            if path.exists():
+                cached = pq.read_table(path, schema=schema)
+                replaced = set(zip(table['file_hash'].to_pylist(), table['start_time'].to_pylist()))
+                keep = [key not in replaced for key in
+                        zip(cached['file_hash'].to_pylist(), cached['start_time'].to_pylist())]
+                table = pa.concat_tables([cached.filter(pa.array(keep, pa.bool_())), table])
+            self._write_table(table.sort_by('start_time'), path)
+        return len(sessions)
+
+    def _append_page_stats(self, device: str, page_stats, md5_by_book_id: Mapping[int, str]) -> int:
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+
+        if isinstance(page_stats, PageStatColumns):
+            # Zero-copy: array('q') already holds native int64 values
+            columns = {name: pa.Array.from_buffers(pa.int64(), len(page_stats),
+                                                   [None, pa.py_buffer(getattr(page_stats, name))])
+                       for name in PageStat._fields}
+        else:
+            columns = {name: pa.array(page_stats[name], pa.int64()) for name in PageStat._fields}
+        table = pa.table(columns)
+
+        cursor = self.cursor(device)
+        if cursor is not None:
+            table = table.filter(pc.greater(table['start_time'], cursor))
+        if not table.num_rows:
+            return 0
+        first, new_cursor = pc.min(table['start_time']).as_py(), pc.max(table['start_time']).as_py()
+
+        # KOReader book ids are per device; the file_hash identifies the book
+        book_ids = sorted(md5_by_book_id)
+        hashes = pa.DictionaryArray.from_arrays(
+            pc.index_in(table['id_book'], value_set=pa.array(book_ids, pa.int64())),
+            pa.array([md5_by_book_id[book_id] for book_id in book_ids], pa.string())
+        )
+        # Parquet has no seconds unit; store milliseconds rather than have it coerced
+        start_time = table['start_time'].cast(pa.timestamp('s', tz='UTC')).cast(pa.timestamp('ms', tz='UTC'))
+        table = table.set_column(table.schema.get_field_index('start_time'), 'start_time', start_time)
+        table = table.append_column('file_hash', hashes)
+        table = table.append_column('month', pc.strftime(start_time, format='%Y-%m'))
+
+        ds.write_dataset(
+            table, self._device_dir('page_stats', device), format='parquet',
+            partitioning=ds.partitioning(pa.schema([('month', pa.string())]), flavor='hive'),
+            basename_template=f"part-{first}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore',
+        )
+
+        cursor_path = self._cursor_path(device)
+        cursor_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cursor_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({'page_stats': new_cursor}))
+        os.replace(tmp_path, cursor_path)
+        return table.num_rows
+
+
+def update_columnar_cache(
+    device: str,
+    koreader_books: List[Dict],
+    books: List[Dict],
+    sessions: List[ReadingSessionRecord],
+    page_stats,
+    since: Optional[int],
+    logger: logging.Logger
+) -> int:
+    """
+    Write a run into the columnar cache at ETL_PARQUET_PATH; returns the rows
+    written. Failures are logged and never fail the ETL run.
+    """
+    try:
+        cache = ColumnarCache(Config.PARQUET_PATH, logger)
+    except ImportError as e:
+        logger.warning(f"Columnar cache disabled: {e}")
+        return 0
+    if page_stats is None:
+        logger.info("Session engine 'sqlite' reads no page stats - caching sessions and books only")
+    elif since is not None and (cache.cursor(device) or 0) < since:
+        logger.warning(f"Columnar cache for {device} has no page stats up to the sync cursor - "
+                       f"run once without --incremental (with --force) to backfill it")
+    cache.update(device, koreader_books, books, sessions, page_stats)
+    return cache.page_stats_written + cache.sessions_written
+
+
+def read_columnar_cache(path: str, table: str) -> 'pa.Table':
+    """
+    Load one cached table (page_stats, sessions or books) across all devices
+    and months, with the device (and month) partition columns filled in.
+    """
+    if pa is None:
+        raise ImportError("the columnar cache requires pyarrow (pip3 install pyarrow)")
+    import pyarrow.dataset as ds
+
+    fields = ColumnarCache.PARTITIONING if table != 'books' else ColumnarCache.PARTITIONING[:1]
+    partitioning = ds.partitioning(pa.schema([(name, pa.string()) for name, _ in fields]), flavor='hive')
+    return ds.dataset(Path(path) / table, format='parquet', partitioning=partitioning).to_table()
+
+
+# ============================================================================
+# Local Outbox
+# ============================================================================
+
+class Outbox:
+    """
+    Durable local spool of transformed rows, in SQLite.
+
+    Each ETL run is enqueued as one outbox_runs row plus its books and
+    reading_sessions in a single transaction, before Neon.tech is touched.
+    flush_outbox() later drains pending runs in order and marks rows as
+    delivered, so a Neon.tech outage only delays delivery; nothing has to be
+    re-extracted. Re-delivering a row after a crash is harmless because both
+    tables load with ON CONFLICT (sessions upsert to the same values).
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS outbox_runs (
+            run_id INTEGER PRIMARY KEY,
+            device_id TEXT NOT NULL,
+            sync_cursor INTEGER,
+            records_synced INTEGER NOT NULL,
+            sync_mode TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            delivered_at TEXT
+        );
+        CREATE TABLE IF NOT EXISTS outbox_books (
+            id INTEGER PRIMARY KEY,
+            run_id INTEGER NOT NULL REFERENCES outbox_runs(run_id),
+            title TEXT, file_hash TEXT, page_count INTEGER, language TEXT,
+            notes INTEGER, highlights INTEGER, source TEXT, device_stats_source TEXT,
+            series_name TEXT, series_number REAL,
+            delivered_at TEXT
+        );
+        CREATE TABLE IF NOT EXISTS outbox_sessions (
+            id INTEGER PRIMARY KEY,
+            run_id INTEGER NOT NULL REFERENCES outbox_runs(run_id),
+            book_id INTEGER, start_time TEXT, duration_minutes INTEGER, pages_read INTEGER,
+            device TEXT, media_type TEXT, data_source TEXT, device_stats_source TEXT,
+            read_instance_id TEXT, read_number INTEGER, is_parallel_read INTEGER,
+            end_time TEXT, file_hash TEXT,
+            delivered_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS outbox_books_run ON outbox_books(run_id, delivered_at);
+        CREATE INDEX IF NOT EXISTS outbox_sessions_run ON outbox_sessions(run_id, delivered_at);
+    """
+
+    def __init__(self, path: str, logger: logging.Logger):
+        self.path = path
+        self.logger = logger
+        self.conn: Optional[sqlite3.Connection] = None
+
+    def open(self) -> bool:
+        """Open (and create if needed) the spool database"""
+        try:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(self.path)
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            self.conn.execute("PRAGMA synchronous = FULL")
+            self.conn.executescript(self.SCHEMA)
+            self._migrate()
+            return True
+        except (OSError, sqlite3.Error) as e:
+            self.logger.error(f"Failed to open outbox {self.path}: {e}")
+            return False
+
+    def _migrate(self):
+        """Add columns introduced after an outbox file was created"""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(outbox_sessions)")}
+        if 'end_time' not in columns:
+            self.conn.execute("ALTER TABLE outbox_sessions ADD COLUMN end_time TEXT")
+        if 'file_hash' not in columns:
+            self.conn.execute("ALTER TABLE outbox_sessions ADD COLUMN file_hash TEXT")
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+    def enqueue(
+        self,
+        device_id: str,
+        books: List[Dict],
+        sessions: Iterable[Mapping],
+        sync_cursor: Optional[int],
+        records_synced: int,
+        sync_mode: str
+    ) -> Optional[int]:
+        """Spool one run atomically; returns its run_id, or None on failure"""
+        try:
+            with self.conn:
+                run_id = self.conn.execute(
+                    "INSERT INTO outbox_runs (device_id, sync_cursor, records_synced, sync_mode, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (device_id, sync_cursor, records_synced, sync_mode, self._now())
+                ).lastrowid
+                self.conn.executemany(
+                    f"INSERT INTO outbox_books (run_id, {', '.join(NeonLoader.BOOK_COLUMNS)}) "
+                    f"VALUES (?, {', '.join('?' * len(NeonLoader.BOOK_COLUMNS))})",
+                    ((run_id, *NeonLoader._book_values(book)) for book in books)
+                )
+                self.conn.executemany(
+                    f"INSERT INTO outbox_sessions (run_id, {', '.join(self.SESSION_COLUMNS)}) "
+                    f"VALUES (?, {', '.join('?' * len(self.SESSION_COLUMNS))})",
+                    ((run_id, *self._session_row(session)) for session in sessions)
+                )
+            return run_id
+        except sqlite3.Error as e:
+            self.logger.error(f"Failed to spool run to outbox: {e}")
+            return None
+
+    # Sessions are spooled before their book_id is known; flush_outbox() binds it
+    SESSION_COLUMNS = NeonLoader.SESSION_COLUMNS + ('file_hash',)
+
+    @staticmethod
+    def _session_row(session: Mapping) -> Tuple:
+        return tuple(
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in NeonLoader._session_values(session)
+        ) + (session.get('file_hash') if isinstance(session, dict) else session.file_hash,)
+
+    def latest_cursor(self, device_id: str) -> Optional[int]:
+        """Cursor of the newest spooled run for a device, delivered or not"""
+        row = self.conn.execute(
+            "SELECT sync_cursor FROM outbox_runs WHERE device_id = ? AND sync_cursor IS NOT NULL "
+            "ORDER BY run_id DESC LIMIT 1",
+            (device_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def pending_runs(self) -> List[Dict]:
+        cursor = self.conn.execute(
+            "SELECT run_id, device_id, sync_cursor, records_synced, sync_mode, created_at "
+            "FROM outbox_runs WHERE delivered_at IS NULL ORDER BY run_id"
+        )
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def pending_counts(self) -> Dict[str, int]:
+        return {
+            table: self.conn.execute(
+                f"SELECT COUNT(*) FROM outbox_{table} WHERE delivered_at IS NULL"
+            ).fetchone()[0]
+            for table in ('runs', 'books', 'sessions')
+        }
+
+    def iter_pending_books(self, run_id: int, batch_size: int) -> Iterator[Tuple[List[int], List[Dict]]]:
+        """Yield (outbox ids, book dicts) batches of undelivered books for a run"""
+        columns = NeonLoader.BOOK_COLUMNS
+        query = (f"SELECT id, {', '.join(columns)} FROM outbox_books "
+                 "WHERE run_id = ? AND delivered_at IS NULL AND id > ? ORDER BY id LIMIT ?")
+        last_id = 0
+        while True:
+            rows = self.conn.execute(query, (run_id, last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [row[0] for row in rows], [dict(zip(columns, row[1:])) for row in rows]
+
+    def iter_pending_sessions(
+        self,
+        run_id: int,
+        batch_size: int
+    ) -> Iterator[Tuple[List[int], List[ReadingSessionRecord]]]:
+        """Yield (outbox ids, session records) batches of undelivered sessions for a run"""
+        query = (f"SELECT id, {', '.join(self.SESSION_COLUMNS)} FROM outbox_sessions "
+                 "WHERE run_id = ? AND delivered_at IS NULL AND id > ? ORDER BY id LIMIT ?")
+        last_id = 0
+        while True:
+            rows = self.conn.execute(query, (run_id, last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [row[0] for row in rows], [
+                ReadingSessionRecord(
+                    row[1], datetime.fromisoformat(row[2]), *row[3:11], bool(row[11]),
+                    datetime.fromisoformat(row[12]) if row[12] else None, row[13]
+                )
+                for row in rows
+            ]
+
+    def mark_delivered(self, table: str, ids: List[int]):
+        """Mark outbox_books / outbox_sessions rows as delivered"""
+        with self.conn:
+            self.conn.executemany(
+                f"UPDATE outbox_{table} SET delivered_at = ? WHERE id = ?",
+                ((self._now(), row_id) for row_id in ids)
+            )
+
+    def mark_run_delivered(self, run_id: int):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE outbox_runs SET delivered_at = ? WHERE run_id = ?", (self._now(), run_id)
+            )
+
+    def prune(self, retention_days: int) -> int:
+        """Delete delivered runs (and their rows) older than the retention period"""
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).isoformat()
+        with self.conn:
+            run_ids = [row[0] for row in self.conn.execute(
+                "SELECT run_id FROM outbox_runs WHERE delivered_at IS NOT NULL AND delivered_at < ?",
+                (cutoff,)
+            )]
+            for table in ('books', 'sessions', 'runs'):
+                self.conn.executemany(
+                    f"DELETE FROM outbox_{table} WHERE run_id = ?", ((run_id,) for run_id in run_ids)
+                )
+        return len(run_ids)
+
+
+def flush_outbox(
+    outbox: Outbox,
+    loader: NeonLoader,
+    logger: logging.Logger,
+    resolver: BookIdResolver,
+    batch_size: int = 1000,
+    load_method: str = 'insert',
+    known_sessions: Optional[SessionKeySet] = None
+) -> Dict[str, int]:
+    """
+    Drain pending outbox runs into Neon.tech, oldest first.
+
+    For each run, books are loaded before sessions (batches of `batch_size`),
+    each session batch gets its book_id from `resolver` once the books are in,
+    every committed batch is marked delivered, and once the whole run is in
+    Neon.tech its sync_status row is updated with the run's cursor. Stops at
+    the first failed batch so later runs never overtake an earlier cursor.
+    With the transaction load method each run, sync_status row included, is
+    one transaction, and its batches are marked delivered once it commits.
+
+    With `known_sessions`, bound sessions already in Neon.tech unchanged are
+    marked delivered without being sent, and a delivered run's sessions are
+    committed to the set.
+    """
+    totals = {'runs': 0, 'books_inserted': 0, 'sessions_inserted': 0, 'sessions_known_skipped': 0,
+              'failed': 0}
+    transaction = load_method == 'transaction'
+
+    for run in outbox.pending_runs():
+        started = time.monotonic()
+        errors_before = loader.load_errors
+        books_inserted = 0
+        sessions_inserted = 0
+        uncommitted: List[Tuple[str, List[int]]] = []
+        device_id = run['device_id']
+        if known_sessions is not None:
+            # Before begin(), so a run transaction holds only the load's own statements
+            known_sessions.sync(loader, device_id)
+
+        def delivered(table: str, ids: List[int]):
+            if transaction:
+                uncommitted.append((table, ids))
+            else:
+                outbox.mark_delivered(table, ids)
+
+        if transaction:
+            loader.begin()
+        for ids, books in outbox.iter_pending_books(run['run_id'], batch_size):
+            if load_method == 'copy':
+                inserted = loader.copy_books(books)
+            elif transaction:
+                inserted = loader.load_books_prepared(books)
+            else:
+                inserted = loader.load_books(books)
+            if loader.load_errors > errors_before:
+                break
+            books_inserted += inserted
+            delivered('books', ids)
+
+        unresolved = 0
+        if loader.load_errors == errors_before:
+            batches = outbox.iter_pending_sessions(run['run_id'], batch_size)
+            for batch_number, (ids, sessions) in enumerate(batches):
+                resolver.resolve(loader, (session.file_hash for session in sessions
+                                          if session.book_id is None))
+                sessions = list(resolver.bind(sessions, device_id))
+                # The batch stays pending rather than delivered without them
+                unresolved = resolver.unresolved(device_id)
+                if unresolved:
+                    break
+                if known_sessions is not None:
+                    sessions = list(known_sessions.filter(device_id, sessions, resume=batch_number > 0))
+                    if not sessions:
+                        delivered('sessions', ids)
+                        continue
+                if load_method == 'copy':
+                    inserted = loader.copy_reading_sessions(sessions)
+                elif transaction:
+                    inserted = loader.load_reading_sessions_prepared(sessions, batch_size=batch_size)
+                else:
+                    inserted = loader.load_reading_sessions(sessions)
+                if loader.load_errors > errors_before:
+                    break
+                sessions_inserted += inserted
+                delivered('sessions', ids)
+
+        failed = loader.load_errors > errors_before or unresolved > 0
+        if not failed:
+            loader.update_sync_status(
+                sync_source_name(run['device_id']), run['sync_cursor'], run['records_synced'],
+                sessions_inserted, time.monotonic() - started, 'success', run['sync_mode']
+            )
+            # A failed sync_status row or commit rolls the run back; it stays pending
+            if transaction and not _finish_transaction(
+                    loader, resolver, commit=loader.load_errors == errors_before):
+                failed = True
+        elif transaction:
+            _finish_transaction(loader, resolver, commit=False)
+
+        # Batches committed on their own stay in Neon.tech even if the run fails
+        if not transaction or not failed:
+            totals['books_inserted'] += books_inserted
+        if failed:
+            if loader.stale_book_ids:
+                resolver.invalidate()
+            totals['failed'] += 1
+            logger.error(f"Outbox run {run['run_id']} ({run['device_id']}) not fully delivered - "
+                         "will retry on the next flush")
+            break
+
+        for table, ids in uncommitted:
+            outbox.mark_delivered(table, ids)
+        if known_sessions is not None:
+            known_sessions.commit(device_id)
+            known_sessions.log_counts(device_id)
+            totals['sessions_known_skipped'] += known_sessions.skipped(device_id)
+        totals['sessions_inserted'] += sessions_inserted
+        outbox.mark_run_delivered(run['run_id'])
+        totals['runs'] += 1
+        logger.info(f"Delivered outbox run {run['run_id']} ({run['device_id']}, "
+                    f"spooled {run['created_at']}): {sessions_inserted} sessions inserted")
+
+    pruned = outbox.prune(Config.OUTBOX_RETENTION_DAYS)
+    if pruned:
+        logger.debug(f"Pruned {pruned} delivered outbox runs")
+    return totals
+
+
+def run_flush_only() -> bool:
+    """Drain the local outbox into Neon.tech without extracting anything"""
+    try:
+        Config.validate()
+    except ValueError as e:
+        print(f"Configuration Error: {e}")
+        return False
+
+    logger = setup_logging(Config.ETL_LOG_PATH)
+    outbox = Outbox(Config.OUTBOX_PATH, logger)
+    if not outbox.open():
+        return False
+
+    pending = outbox.pending_counts()
+    logger.info(f"Outbox {Config.OUTBOX_PATH}: {pending['runs']} pending runs, "
+                f"{pending['books']} books, {pending['sessions']} sessions")
+    if not pending['runs']:
+        outbox.close()
+        return True
+
+    loader = NeonLoader(logger)
+    if not _connect_neon(loader, logger):
+        outbox.close()
+        return False
+
+    totals = flush_outbox(outbox, loader, logger, make_book_id_resolver(logger),
+                          batch_size=Config.BATCH_SIZE, load_method=Config.LOAD_METHOD,
+                          known_sessions=make_session_key_set(logger))
+    loader.disconnect()
+    outbox.close()
+    logger.info(f"Flushed {totals['runs']} runs: {totals['books_inserted']} books, "
+                f"{totals['sessions_inserted']} sessions inserted")
+    return totals['failed'] == 0
+
+
+# ============================================================================
+# Run Metrics
+# ============================================================================
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class RunMetrics:
+    """
+    Wall time, CPU time, rows and peak RSS per ETL stage of one run.
+
+    CPU time is that of the thread running the stage, so concurrent
+    --pipeline stages are measured separately. Peak RSS is the process
+    high-water mark when the stage ended; the stage where it jumps is the
+    one that allocated. Published to the log, ETL_METRICS_PATH (JSON),
+    ETL_PROMETHEUS_TEXTFILE and sync_status.run_metrics.
+    """
+
+    def __init__(self, device_id: str):
+        self.device_id = device_id
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.stages: Dict[str, Dict] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Dict]:
+        """Measure the enclosed block; set ['rows'] on the yielded dict to record throughput"""
+        counts = {'rows': 0}
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield counts
+        finally:
+            self.add(name, time.perf_counter() - wall, time.thread_time() - cpu, counts['rows'])
+
+    def add(self, name: str, wall_seconds: float, cpu_seconds: float, rows: int):
+        """Record (or add to) a stage's figures"""
+        stage = self.stages.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'rows': 0})
+        stage['wall_seconds'] += wall_seconds
+        stage['cpu_seconds'] += cpu_seconds
+        stage['rows'] += rows
+        stage['rows_per_second'] = stage['rows'] / stage['wall_seconds'] if stage['wall_seconds'] else 0.0
+        stage['peak_rss_bytes'] = peak_rss_bytes()
+
+    def as_dict(self, status: str, counts: Optional[Dict[str, int]] = None) -> Dict:
+        """The run's metrics as stored in the JSON file and sync_status.run_metrics"""
+        return {
+            'device_id': self.device_id,
+            'status': status,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': datetime.now(timezone.utc).isoformat(),
+            'duration_seconds': round(time.perf_counter() - self.started, 3),
+            'peak_rss_bytes': peak_rss_bytes(),
+            'counts': counts or {},
+            'stages': {
+                name: {key: round(value, 3) if isinstance(value, float) else value
+                       for key, value in stage.items()}
+                for name, stage in self.stages.items()
+            },
+        }
+
+    def log_summary(self, logger: logging.Logger):
+        logger.info(f"{'Stage':<16} {'wall s':>8} {'cpu s':>8} {'rows':>9} {'rows/s':>10} {'peak RSS MB':>12}")
+        for name, stage in self.stages.items():
+            logger.info(
+                f"{name:<16} {stage['wall_seconds']:>8.2f} {stage['cpu_seconds']:>8.2f} "
+                f"{stage['rows']:>9} {stage['rows_per_second']:>10.0f} "
+                f"{stage['peak_rss_bytes'] / 1048576:>12.1f}"
+            )
+
+    def prometheus_text(self, metrics: Dict) -> str:
+        """node_exporter textfile-collector exposition of as_dict() output"""
+        device = self.device_id.replace('\\', '\\\\').replace('"', '\\"')
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[Tuple[str, float]]):
+            lines.append(f"# HELP bookhelper_etl_{name} {help_text}")
+            lines.append(f"# TYPE bookhelper_etl_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f'bookhelper_etl_{name}{{device="{device}"{labels}}} {value}')
+
+        stages = metrics['stages'].items()
+        metric('stage_wall_seconds', 'gauge', 'Wall-clock seconds per ETL stage in the last run',
+               [(f',stage="{name}"', stage['wall_seconds']) for name, stage in stages])
+        metric('stage_cpu_seconds', 'gauge', 'CPU seconds per ETL stage in the last run',
+               [(f',stage="{name}"', stage['cpu_seconds']) for name, stage in stages])
+        metric('stage_rows', 'gauge', 'Rows handled per ETL stage in the last run',
+               [(f',stage="{name}"', stage['rows']) for name, stage in stages])
+        metric('stage_rows_per_second', 'gauge', 'Rows per second per ETL stage in the last run',
+               [(f',stage="{name}"', stage['rows_per_second']) for name, stage in stages])
+        metric('stage_peak_rss_bytes', 'gauge', 'Process peak RSS at the end of each ETL stage',
+               [(f',stage="{name}"', stage['peak_rss_bytes']) for name, stage in stages])
+        metric('run_duration_seconds', 'gauge', 'Wall-clock seconds of the last ETL run',
+               [('', metrics['duration_seconds'])])
+        metric('run_success', 'gauge', '1 if the last ETL run succeeded',
+               [('', 1 if metrics['status'] == 'success' else 0)])
+        metric('run_finished_timestamp_seconds', 'gauge', 'Unix time the last ETL run finished',
+               [('', round(datetime.fromisoformat(metrics['finished_at']).timestamp(), 3))])
+        return "\n".join(lines) + "\n"
+
+    def publish(self, metrics: Dict, logger: logging.Logger):
+        """Write the JSON file and, if configured, the Prometheus textfile (atomically)"""
+        outputs = [(Config.METRICS_PATH, json.dumps(metrics, indent=2))]
+        if Config.PROMETHEUS_TEXTFILE:
+            outputs.append((Config.PROMETHEUS_TEXTFILE, self.prometheus_text(metrics)))
+        for path, text in outputs:
+            try:
+                path = Path(path)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(f".{path.name}.tmp")
+                tmp_path.write_text(text)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Failed to write metrics to {path}: {e}")
+
+
+# ============================================================================
+# Main ETL Pipeline
+# ============================================================================
+
+def _connect_neon(loader: NeonLoader, logger: logging.Logger) -> bool:
+    """Connect to Neon.tech and validate the schema (STEP 4 + STEP 5)"""
+    logger.info("\n[STEP 4] Connecting to Neon.tech...")
+    if not loader.connect(
+        Config.NEON_HOST,
+        Config.NEON_USER,
+        Config.NEON_PASSWORD,
+        Config.NEON_DATABASE
+    ):
+        logger.error("Failed to connect to Neon.tech - aborting")
+        return False
+
+    logger.info("\n[STEP 5] Validating Neon.tech schema...")
+    if not loader.validate_schema():
+        logger.error("Schema validation failed - aborting")
+        loader.disconnect()
+        return False
+
+    return True
+
+
+def _warm_up_neon(loader: NeonLoader, logger: logging.Logger) -> Future:
+    """
+    Start STEP 4 + 5 on a background thread. Connecting wakes a suspended
+    Neon.tech compute, so the wake-up (and any retries) overlaps extraction;
+    the returned Future holds _connect_neon()'s result.
+    """
+    connected: Future = Future()
+
+    def connect():
+        try:
+            connected.set_result(_connect_neon(loader, logger))
+        except Exception as e:
+            connected.set_exception(e)
+
+    threading.Thread(target=connect, name='etl-neon-warm-up', daemon=True).start()
+    return connected
+
+
+def _local_cursor_current(
+    loader: NeonLoader,
+    fingerprints: FingerprintStore,
+    source_name: str,
+    local_cursor: int,
+    logger: logging.Logger
+) -> bool:
+    """
+    Check the local cursor an incremental run extracted from against
+    sync_status. Neon.tech being further along only means some rows are sent
+    again; being behind (rows deleted, or a spooled run not yet flushed)
+    means rows between the two were never extracted, so the run must not
+    load. The local copy is then dropped and the next run uses Neon.tech's.
+    """
+    stored = loader.get_sync_cursor(source_name)
+    if stored is not None and stored >= local_cursor:
+        return True
+    logger.error(f"Sync cursor in Neon.tech ({stored}) is behind the local copy ({local_cursor}) - "
+                 f"not loading; the next run extracts from Neon.tech's cursor")
+    fingerprints.forget_cursor(Config.DEVICE_ID)
+    return False
+
+
+def _finish_transaction(loader: NeonLoader, resolver: BookIdResolver, commit: bool) -> bool:
+    """
+    End a --load-method transaction run; True if it was committed. Book ids
+    fetched inside a rolled-back transaction may belong to rows that no
+    longer exist, so the resolver forgets them.
+    """
+    if loader.finish(commit):
+        return True
+    resolver.invalidate()
+    return False
+
+
+def _load_error_message(loader: NeonLoader, unresolved: int) -> str:
+    """sync_status error_message for a run whose load failed"""
+    if loader.load_errors:
+        return f"{loader.load_errors} load statement(s) failed"
+    return f"{unresolved} session(s) of books missing from Neon.tech not loaded"
+
+
+def run_etl(
+    dry_run: bool = False,
+    incremental: bool = False,
+    stream: bool = False,
+    engine: Optional[str] = None,
+    load_method: Optional[str] = None,
+    force: bool = False,
+    outbox: bool = False,
+    pipeline: bool = False,
+    loader: Optional['NeonLoader'] = None
+) -> bool:
+    """
+    Execute complete ETL pipeline. Returns False if the run failed, including
+    a failed load after extraction (recorded as a 'failed' sync_status row),
+    so the CLI exits 1 and systemd's Restart=on-failure applies.
+
+    A connected `loader` (see run_watch()) is used instead of opening a new
+    connection, and is left connected when the run ends.
+
+    With `pipeline`, the stages run concurrently (see _run_pipelined()):
+    Neon.tech is connected while the backup is snapshotted, and extraction,
+    transformation and loading hand batches to each other through bounded
+    queues.
+
+    With `outbox`, transformed rows are spooled to the local outbox before
+    Neon.tech is contacted and then flushed from there; if Neon.tech is
+    unreachable the run still succeeds and a later flush delivers it.
+
+    Neon.tech is connected on a background thread while the backup is
+    extracted (see _warm_up_neon()), so waking a suspended compute costs no
+    wall-clock time; connection attempts are retried with backoff, and a
+    batch interrupted by a dropped connection is re-sent after reconnecting.
+
+    Unless `force` is set, the run ends before connecting anywhere when the
+    backup still matches the fingerprint recorded after the last successful
+    load for this device; `force` also reloads the device's known session
+    keys (see SessionKeySet).
+
+    A dry run never connects to Neon.tech: it takes the cursor, book ids and
+    known session keys from their local copies, counts the sessions of books
+    not cached as new, and writes nothing.
+
+    In incremental mode only page_stat_data rows newer than the last
+    successful load's cursor are extracted, aggregated and sent to Neon.tech.
+    The cursor comes from the local copy kept with the fingerprints, so
+    extraction does not wait for Neon.tech; it is checked against
+    sync_status once connected (see _local_cursor_current()). Without a local
+    copy, or in streaming mode, sync_status is read before extraction.
+
+    In streaming mode the stages are chained generators: rows are fetched in
+    ETL_BATCH_SIZE chunks, sessions are emitted as soon as they close and the
+    loader commits fixed-size batches, so peak memory does not grow with the
+    size of statistics.sqlite3.
+
+    `engine` selects the session aggregator (SESSION_ENGINE by default); the
+    numpy engine reads page_stat_data as columns and needs the full batch, and
+    the sqlite engine aggregates inside statistics.sqlite3 so only one row per
+    session reaches Python. Streaming mode always uses the python engine.
+
+    `load_method` selects how rows reach Neon.tech (ETL_LOAD_METHOD by
+    default): batched INSERT ... VALUES, COPY FROM STDIN into a staging
+    table followed by one set-based merge, or `transaction`: prepared
+    statements in a single transaction with a savepoint per batch, committed
+    together with the sync_status row (see NeonLoader.begin()).
+    """
+
+    # Validate configuration
+    try:
+        Config.validate()
+    except ValueError as e:
+        print(f"Configuration Error: {e}")
+        return False
+
+    # Setup logging
+    logger = setup_logging(Config.ETL_LOG_PATH, dry_run)
+    started = time.monotonic()
+    source_name = sync_source_name(Config.DEVICE_ID)
+    sync_mode = 'incremental' if incremental else 'full_refresh'
+
+    logger.info("=" * 70)
+    logger.info("ETL Pipeline: KOReader Statistics → Neon.tech PostgreSQL")
+    logger.info("=" * 70)
+    logger.info(f"Started at {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}")
+    logger.info(f"Mode: {'DRY-RUN' if dry_run else 'NORMAL'} ({sync_mode}"
+                f"{', streaming' if stream else ''}{', pipelined' if pipeline else ''})")
+    logger.info(f"Source: {Config.KOREADER_BACKUP}")
+    logger.info(f"Target: {Config.NEON_HOST}/{Config.NEON_DATABASE}")
+    logger.info(f"Device: {Config.DEVICE_ID}")
+    logger.info(f"Session Gap Threshold: {Config.SESSION_GAP_MINUTES} minutes")
+
+    fingerprints = FingerprintStore(Config.FINGERPRINT_PATH, logger)
+    fingerprint = backup_fingerprint(Config.KOREADER_BACKUP)
+    if not force and fingerprints.is_unchanged(Config.DEVICE_ID, fingerprint):
+        logger.info("Backup unchanged since last successful load - nothing to do (use --force to override)")
+        if not dry_run:
+            fingerprints.record(Config.DEVICE_ID, fingerprint)
+        return True
+
+    engine = engine or Config.SESSION_ENGINE
+    if (stream or pipeline) and engine != 'python':
+        logger.warning(f"Session engine '{engine}' needs the full batch - using python engine for "
+                       f"{'--stream' if stream else '--pipeline'}")
+        engine = 'python'
+    try:
+        aggregator = make_session_aggregator(engine, Config.SESSION_GAP_MINUTES, logger)
+    except (ImportError, ValueError) as e:
+        logger.error(f"Cannot use session engine '{engine}': {e}")
+        return False
+    logger.info(f"Session Engine: {engine}")
+
+    load_method = load_method or Config.LOAD_METHOD
+    if load_method not in LOAD_METHODS:
+        logger.error(f"Unknown load method '{load_method}' (expected one of {', '.join(LOAD_METHODS)})")
+        return False
+    logger.info(f"Load Method: {load_method}")
+
+    spool = None
+    if outbox and (stream or pipeline or dry_run):
+        logger.warning(f"--outbox is ignored with "
+                       f"{'--stream' if stream else '--pipeline' if pipeline else '--dry-run'}")
+    elif outbox:
+        spool = Outbox(Config.OUTBOX_PATH, logger)
+        if not spool.open():
+            return False
+        logger.info(f"Outbox: {Config.OUTBOX_PATH}")
+
+    if Config.PARQUET_PATH and (stream or pipeline) and not dry_run:
+        logger.warning(f"Columnar cache needs the full batch - not updated with "
+                       f"{'--stream' if stream else '--pipeline'}")
+
+    if pipeline:
+        return _run_pipelined(
+            logger, started, source_name, sync_mode, incremental, dry_run, load_method,
+            aggregator, fingerprints, fingerprint, force
+        )
+
+    keep_connection = loader is not None
+    loader = loader or NeonLoader(logger)
+    loader.reset_counters()
+    since = None
+    metrics = RunMetrics(Config.DEVICE_ID)
+
+    # Incremental mode needs the stored cursor before extraction starts, and
+    # streaming mode needs the loader ready before the first row is read. The
+    # newest spooled run may be ahead of Neon.tech, so its cursor wins. Else
+    # the local copy of the last loaded cursor lets extraction start while
+    # Neon.tech wakes up; it is checked against sync_status before loading.
+    # A dry run never contacts Neon.tech, so it only has the local copy.
+    local_cursor = None
+    if incremental and spool is not None:
+        since = spool.latest_cursor(Config.DEVICE_ID)
+    if incremental and since is None and (dry_run or (not stream and loader.conn is None)):
+        since = local_cursor = fingerprints.sync_cursor(Config.DEVICE_ID)
+    if (stream or (incremental and since is None)) and loader.conn is None and not dry_run:
+        with metrics.stage('connect'):
+            connected = _connect_neon(loader, logger)
+        if not connected:
+            if spool is None:
+                return False
+            logger.warning("Neon.tech unreachable - continuing into the outbox")
+    if incremental and since is None and loader.conn is not None and not dry_run:
+        since = loader.get_sync_cursor(source_name)
+    if incremental:
+        if since is None:
+            logger.info(f"No sync cursor stored for {source_name} - extracting full history")
+        else:
+            logger.info(f"Sync cursor for {source_name}: start_time > {since}"
+                        f"{' (local copy)' if local_cursor is not None else ''}")
+
+    # Otherwise Neon.tech is first needed after STEP 3; wake it up meanwhile.
+    # --outbox runs spool first and must not wait on an unreachable Neon.tech.
+    connecting = None
+    if loader.conn is None and spool is None and not dry_run:
+        connecting = _warm_up_neon(loader, logger)
+
+    # Step 1: Extract from KOReader
+    logger.info("\n[STEP 1] Extracting from KOReader statistics.sqlite3...")
+    extractor = KOReaderExtractor(Config.KOREADER_BACKUP, logger)
+
+    with metrics.stage('extract') as stage:
+        if not extractor.connect():
+            logger.error("Failed to connect to KOReader database - aborting")
+            if connecting is not None:
+                connecting.result()
+            if not keep_connection:
+                loader.disconnect()
+            return False
+
+        # Stitch sessions that were still in progress when the cursor was stored
+        if since is not None:
+            extractor.find_open_sessions(since, Config.SESSION_GAP_MINUTES)
+
+        koreader_books = extractor.extract_books()
+        if stream:
+            # Rows are pulled lazily by the loader in STEP 6
+            koreader_sessions = extractor.iter_page_stat_data(since=since, batch_size=Config.BATCH_SIZE)
+            has_rows = True
+        elif engine == 'numpy':
+            koreader_sessions = extractor.extract_page_stat_columns(since=since)
+            stage['rows'] = len(koreader_sessions['start_time'])
+            has_rows = stage['rows'] > 0
+            extractor.disconnect()
+        elif engine == 'sqlite':
+            # Sessions are aggregated inside SQLite; STEP 2 only tallies them
+            koreader_sessions = extractor.extract_sessions(Config.SESSION_GAP_MINUTES, since=since)
+            stage['rows'] = len(koreader_sessions)
+            has_rows = bool(koreader_sessions)
+            extractor.disconnect()
+        else:
+            koreader_sessions = extractor.extract_page_stat_data(since=since)
+            stage['rows'] = len(koreader_sessions)
+            has_rows = bool(koreader_sessions)
+            extractor.disconnect()
+
+    # An incremental run with nothing new since the cursor is not an error
+    if not koreader_books or (not has_rows and since is None):
+        logger.error("No data extracted from KOReader - aborting")
+        extractor.disconnect()
+        if connecting is not None:
+            connecting.result()
+        if not keep_connection:
+            loader.disconnect()
+        return False
+
+    # Step 2: Aggregate sessions
+    logger.info("\n[STEP 2] Aggregating reading sessions...")
+    book_pages = book_page_counts(koreader_books)
+    with metrics.stage('aggregate') as stage:
+        if stream:
+            aggregated_sessions = aggregator.iter_sessions(koreader_sessions, book_pages)
+        elif engine == 'numpy':
+            aggregated_sessions = aggregator.aggregate_columns(koreader_sessions, book_pages)
+        else:
+            aggregated_sessions = aggregator.aggregate(koreader_sessions, book_pages)
+        stage['rows'] = aggregator.records_processed
+
+    # Step 3: Transform data
+    logger.info("\n[STEP 3] Transforming data to Neon.tech schema...")
+    with metrics.stage('transform') as stage:
+        transformer = DataTransformer(Config.DEVICE_ID, logger)
+        books = transformer.transform_books(koreader_books)
+        if stream:
+            sessions = transformer.iter_transform_sessions(aggregated_sessions, koreader_books)
+        else:
+            sessions = transformer.transform_sessions(aggregated_sessions, koreader_books)
+            stage['rows'] = len(sessions)
+
+    # Local disk only, so it overlaps Neon.tech waking up and runs even when
+    # the load later fails
+    if Config.PARQUET_PATH and not (dry_run or stream):
+        with metrics.stage('columnar_cache') as stage:
+            stage['rows'] = update_columnar_cache(
+                Config.DEVICE_ID, koreader_books, books, sessions,
+                None if engine == 'sqlite' else koreader_sessions, since, logger
+            )
+
+    if spool is not None:
+        return _spool_and_flush(
+            spool, loader, logger, books, sessions, aggregator, since, sync_mode,
+            load_method, fingerprints, fingerprint, metrics, keep_connection
+        )
+
+    # Step 4 + 5: Connect to Neon.tech and validate schema
+    if connecting is not None:
+        with metrics.stage('connect'):
+            connected = connecting.result()
+        if not connected:
+            return False
+    if local_cursor is not None and not dry_run and not _local_cursor_current(
+            loader, fingerprints, source_name, local_cursor, logger):
+        if not keep_connection:
+            loader.disconnect()
+        return False
+
+    # Unchanged sessions already in Neon.tech are dropped before loading; a
+    # dry run counts against the local key set and book id cache only.
+    # Synced first so a run transaction holds only the load's own statements.
+    known_sessions = make_session_key_set(logger, read_only=dry_run)
+    if not dry_run:
+        with metrics.stage('sync_session_keys'):
+            known_sessions.sync(loader, Config.DEVICE_ID, reload=force)
+
+    # Step 6: Load data; books first, so every session's book_id can be resolved
+    logger.info("\n[STEP 6] Loading data into Neon.tech...")
+    transaction = load_method == 'transaction' and not dry_run
+    if transaction:
+        loader.begin()
+    with metrics.stage('load_books') as stage:
+        if load_method == 'copy':
+            books_inserted = loader.copy_books(books, dry_run=dry_run)
+        elif load_method == 'transaction':
+            books_inserted = loader.load_books_prepared(books, dry_run=dry_run)
+        else:
+            books_inserted = loader.load_books(books, dry_run=dry_run)
+        stage['rows'] = len(books)
+
+    with metrics.stage('resolve_book_ids') as stage:
+        resolver = make_book_id_resolver(logger, read_only=dry_run)
+        if not dry_run:
+            resolver.resolve(loader, (book['file_hash'] for book in books))
+        stage['rows'] = resolver.fetched
+    logger.info(f"Book ids: {len(resolver.book_ids)} cached, {resolver.fetched} fetched from Neon.tech")
+
+    sessions = known_sessions.filter(Config.DEVICE_ID, resolver.bind(sessions, Config.DEVICE_ID, dry_run))
+
+    # In --stream mode this stage also pulls every row through STEPs 1-3
+    with metrics.stage('load_sessions') as stage:
+        if load_method == 'copy':
+            sessions_inserted = loader.copy_reading_sessions(sessions, dry_run=dry_run)
+        elif load_method == 'transaction':
+            sessions_inserted = loader.load_reading_sessions_prepared(
+                sessions, batch_size=Config.BATCH_SIZE, dry_run=dry_run
+            )
+        elif stream:
+            sessions_inserted = loader.load_reading_sessions_stream(
+                sessions, batch_size=Config.BATCH_SIZE, dry_run=dry_run
+            )
+        else:
+            sessions_inserted = loader.load_reading_sessions(list(sessions), dry_run=dry_run)
+        stage['rows'] = aggregator.sessions_emitted
+    if loader.stale_book_ids:
+        resolver.invalidate()
+    known_sessions.log_counts(Config.DEVICE_ID, dry_run)
+
+    if stream:
+        extractor.disconnect()
+        logger.info(f"Streamed {aggregator.records_processed} records into "
+                    f"{aggregator.sessions_emitted} sessions")
+
+    new_cursor = aggregator.high_water_mark if aggregator.high_water_mark is not None else since
+    # A dry run inserts no books; their sessions were counted as new instead
+    unresolved = 0 if dry_run else resolver.unresolved(Config.DEVICE_ID)
+    failed = bool(loader.load_errors or extractor.stream_error or unresolved)
+    if transaction and failed:
+        # Nothing of a failed run is kept, so retrying it starts from a clean slate
+        _finish_transaction(loader, resolver, commit=False)
+        books_inserted = sessions_inserted = 0
+    # Deltas come from the load statements' own counts, not table scans
+    logger.info(f"Load deltas: books +{books_inserted}, sessions +{sessions_inserted}, "
+                f"{loader.sessions_extended} extended")
+    run_metrics = metrics.as_dict('failed' if failed else 'success', {
+        'books_extracted': len(koreader_books),
+        'page_stat_records': aggregator.records_processed,
+        'sessions_aggregated': aggregator.sessions_emitted,
+        'books_inserted': books_inserted,
+        'sessions_inserted': sessions_inserted,
+        'sessions_extended': loader.sessions_extended,
+        'sessions_known_skipped': known_sessions.skipped(Config.DEVICE_ID),
+        'sessions_unresolved': resolver.unresolved(Config.DEVICE_ID),
+        'daily_rollup_rows': loader.rollup_rows,
+        'neon_reconnects': loader.reconnects,
+    })
+
+    # Record the run; the cursor only advances after a fully successful load
+    if not dry_run:
+        if failed:
+            loader.update_sync_status(
+                source_name, None, aggregator.sessions_emitted, sessions_inserted,
+                time.monotonic() - started, 'failed', sync_mode,
+                error_message=extractor.stream_error or _load_error_message(loader, unresolved),
+                records_updated=loader.sessions_extended, run_metrics=run_metrics
+            )
+        else:
+            # In a run transaction the cursor is committed with the rows it covers
+            loader.update_sync_status(
+                source_name, new_cursor, aggregator.sessions_emitted, sessions_inserted,
+                time.monotonic() - started, 'success', sync_mode,
+                records_updated=loader.sessions_extended, run_metrics=run_metrics
+            )
+            if transaction and not _finish_transaction(loader, resolver, commit=not loader.load_errors):
+                failed = True
+                books_inserted = sessions_inserted = 0
+                run_metrics['status'] = 'failed'
+                loader.update_sync_status(
+                    source_name, None, aggregator.sessions_emitted, 0,
+                    time.monotonic() - started, 'failed', sync_mode,
+                    error_message="load transaction rolled back", run_metrics=run_metrics
+                )
+        if not failed:
+            fingerprints.record(Config.DEVICE_ID, fingerprint, new_cursor)
+            known_sessions.commit(Config.DEVICE_ID)
+        metrics.publish(run_metrics, logger)
+
+    if not keep_connection:
+        loader.disconnect()
+
+    # Summary
+    logger.info("\n" + "=" * 70)
+    logger.info("ETL SUMMARY")
+    logger.info("=" * 70)
+    logger.info(f"KOReader books extracted: {len(koreader_books)}")
+    logger.info(f"Page stat data records: {aggregator.records_processed}")
+    logger.info(f"Aggregated sessions: {aggregator.sessions_emitted}")
+    logger.info(f"Books inserted into Neon.tech: {books_inserted}")
+    logger.info(f"Reading sessions inserted: {sessions_inserted}")
+    logger.info(f"Reading sessions extended: {loader.sessions_extended}")
+    logger.info(f"Reading sessions already in Neon.tech (not sent): {known_sessions.skipped(Config.DEVICE_ID)}")
+    logger.info(f"Reading sessions of books missing from Neon.tech (not sent): "
+                f"{resolver.unresolved(Config.DEVICE_ID)}")
+    logger.info(f"Daily rollup rows updated: {loader.rollup_rows}")
+    logger.info(f"Sync cursor: {new_cursor}")
+    metrics.log_summary(logger)
+    logger.info(f"Completed at {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}")
+    logger.info("=" * 70)
+
+    return not failed
+
+
+# Marks the end of a pipeline stage's output queue
+_STAGE_DONE = object()
+
+
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    """Group an iterable into lists of at most `size` items"""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _drain(stage_queue: 'queue.Queue') -> Iterator:
+    """Yield a stage's batches until it signals completion"""
+    while True:
+        batch = stage_queue.get()
+        if batch is _STAGE_DONE:
+            return
+        yield batch
+
+
+def _start_stage(
+    name: str,
+    produce,
+    output: 'queue.Queue',
+    stop: threading.Event,
+    errors: List[str],
+    metrics: RunMetrics
+) -> threading.Thread:
+    """
+    Run `produce()` on a thread, putting each batch it yields on `output`.
+
+    The bounded queue blocks a stage that runs ahead of its consumer. A
+    failure is recorded in `errors` and sets `stop`, which also makes every
+    other stage give up instead of blocking on a queue nobody reads.
+    """
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                output.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run():
+        stage_started = time.perf_counter()
+        cpu_started = time.thread_time()
+        rows = 0
+        batches = produce()
+        try:
+            for batch in batches:
+                rows += len(batch)
+                if not put(batch):
+                    return
+        except Exception as e:
+            errors.append(f"{name} stage failed: {e}")
+            stop.set()
+        finally:
+            batches.close()
+            metrics.add(name, time.perf_counter() - stage_started, time.thread_time() - cpu_started, rows)
+            # Always deliver the end marker; after a stop, make room for it
+            while True:
+                try:
+                    output.put(_STAGE_DONE, timeout=0.1)
+                    break
+                except queue.Full:
+                    if stop.is_set():
+                        try:
+                            output.get_nowait()
+                        except queue.Empty:
+                            pass
+
+    thread = threading.Thread(target=run, name=f"etl-{name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def _run_pipelined(
+    logger: logging.Logger,
+    started: float,
+    source_name: str,
+    sync_mode: str,
+    incremental: bool,
+    dry_run: bool,
+    load_method: str,
+    aggregator: SessionAggregator,
+    fingerprints: FingerprintStore,
+    fingerprint: Optional[Dict],
+    force: bool = False
+) -> bool:
+    """
+    --pipeline: run the ETL stages concurrently instead of back to back.
+
+    The extract thread snapshots the backup and reads the books while the
+    main thread connects to Neon.tech and validates the schema, so Neon.tech's
+    cold start overlaps extraction. With a local copy of the sync cursor
+    (see FingerprintStore) incremental page stats are read meanwhile too. Page stats are then aggregated on the
+    extract thread, transformed on a second thread and loaded on the main
+    thread, each stage handing ETL_BATCH_SIZE batches to the next through a
+    queue of at most ETL_QUEUE_SIZE batches. Wall-clock time approaches that
+    of the slowest stage rather than the sum of all stages.
+    """
+    stop = threading.Event()
+    errors: List[str] = []
+    metrics = RunMetrics(Config.DEVICE_ID)
+    books_ready: Future = Future()
+    since_ready: Future = Future()
+    session_batches: queue.Queue = queue.Queue(maxsize=Config.QUEUE_SIZE)
+    record_batches: queue.Queue = queue.Queue(maxsize=Config.QUEUE_SIZE)
+    extractor = KOReaderExtractor(Config.KOREADER_BACKUP, logger)
+    transformer = DataTransformer(Config.DEVICE_ID, logger)
+
+    def extract() -> Iterator[List[Session]]:
+        # The extract thread owns the SQLite connection from connect() on
+        if not extractor.connect():
+            books_ready.set_result([])
+            raise RuntimeError("failed to connect to KOReader database")
+        try:
+            koreader_books = extractor.extract_books()
+            books_ready.set_result(koreader_books)
+            since = since_ready.result()
+            if stop.is_set():
+                return
+            if since is not None:
+                extractor.find_open_sessions(since, Config.SESSION_GAP_MINUTES)
+            rows = extractor.iter_page_stat_data(since=since, batch_size=Config.BATCH_SIZE)
+            sessions = aggregator.iter_sessions(rows, book_page_counts(koreader_books))
+            yield from _batched(sessions, Config.BATCH_SIZE)
+        finally:
+            if not books_ready.done():
+                books_ready.set_result([])
+            extractor.disconnect()
+
+    def transform() -> Iterator[List[ReadingSessionRecord]]:
+        koreader_books = books_ready.result()
+        for batch in _drain(session_batches):
+            yield list(transformer.iter_transform_sessions(batch, koreader_books))
+
+    # The local copy of the last loaded cursor lets page stats start flowing
+    # before Neon.tech answers; it is checked against sync_status below
+    local_cursor = fingerprints.sync_cursor(Config.DEVICE_ID) if incremental else None
+    if local_cursor is not None:
+        since_ready.set_result(local_cursor)
+
+    logger.info("\n[STEP 1-3] Extracting, aggregating and transforming on pipeline threads...")
+    threads = [
+        _start_stage('extract', extract, session_batches, stop, errors, metrics),
+        _start_stage('transform', transform, record_batches, stop, errors, metrics),
+    ]
+
+    def abort() -> bool:
+        stop.set()
+        if not since_ready.done():
+            since_ready.set_result(None)
+        for thread in threads:
+            thread.join()
+        loader.disconnect()
+        return False
+
+    # Step 4 + 5 overlap the snapshot and book extraction; a dry run skips them
+    loader = NeonLoader(logger)
+    if dry_run:
+        connected = True
+    else:
+        with metrics.stage('connect'):
+            connected = _connect_neon(loader, logger)
+    if not connected:
+        return abort()
+    if dry_run:
+        since = local_cursor
+        if not since_ready.done():
+            since_ready.set_result(since)
+    elif local_cursor is not None:
+        since = local_cursor
+        if not _local_cursor_current(loader, fingerprints, source_name, local_cursor, logger):
+            return abort()
+    else:
+        since = loader.get_sync_cursor(source_name) if incremental else None
+        since_ready.set_result(since)
+    if incremental:
+        if since is None:
+            logger.info(f"No sync cursor stored for {source_name} - extracting full history")
+        else:
+            logger.info(f"Sync cursor for {source_name}: start_time > {since}"
+                        f"{' (local copy)' if local_cursor is not None else ''}")
+
+    koreader_books = books_ready.result()
+    if not koreader_books:
+        logger.error("No data extracted from KOReader - aborting")
+        return abort()
+
+    # Step 6: books first, then sessions as the transform stage produces them
+    logger.info("\n[STEP 6] Loading data into Neon.tech...")
+    transaction = load_method == 'transaction' and not dry_run
+    with metrics.stage('load') as stage:
+        known_sessions = make_session_key_set(logger, read_only=dry_run)
+        if not dry_run:
+            known_sessions.sync(loader, Config.DEVICE_ID, reload=force)
+        if transaction:
+            loader.begin()
+
+        books = transformer.transform_books(koreader_books)
+        if load_method == 'copy':
+            books_inserted = loader.copy_books(books, dry_run=dry_run)
+        elif load_method == 'transaction':
+            books_inserted = loader.load_books_prepared(books, dry_run=dry_run)
+        else:
+            books_inserted = loader.load_books(books, dry_run=dry_run)
+
+        resolver = make_book_id_resolver(logger, read_only=dry_run)
+        if not dry_run:
+            resolver.resolve(loader, (book['file_hash'] for book in books))
+        sessions = known_sessions.filter(Config.DEVICE_ID, resolver.bind(
+            (record for batch in _drain(record_batches) for record in batch), Config.DEVICE_ID, dry_run
+        ))
+        if load_method == 'copy':
+            sessions_inserted = loader.copy_reading_sessions(sessions, dry_run=dry_run)
+        elif load_method == 'transaction':
+            sessions_inserted = loader.load_reading_sessions_prepared(
+                sessions, batch_size=Config.BATCH_SIZE, dry_run=dry_run
+            )
+        else:
+            sessions_inserted = loader.load_reading_sessions_stream(
+                sessions, batch_size=Config.BATCH_SIZE, dry_run=dry_run
+            )
+        stage['rows'] = len(books) + aggregator.sessions_emitted
+    if loader.stale_book_ids:
+        resolver.invalidate()
+    known_sessions.log_counts(Config.DEVICE_ID, dry_run)
+
+    for thread in threads:
+        thread.join()
+    errors.extend(filter(None, [extractor.stream_error]))
+    for error in errors:
+        logger.error(error)
+    if not errors and not aggregator.records_processed and since is None:
+        logger.error("No data extracted from KOReader - aborting")
+        if transaction:
+            _finish_transaction(loader, resolver, commit=False)
+        loader.disconnect()
+        return False
+
+    new_cursor = aggregator.high_water_mark if aggregator.high_water_mark is not None else since
+    unresolved = 0 if dry_run else resolver.unresolved(Config.DEVICE_ID)
+    failed = bool(loader.load_errors or errors or unresolved)
+    if transaction and failed:
+        _finish_transaction(loader, resolver, commit=False)
+        books_inserted = sessions_inserted = 0
+    run_metrics = metrics.as_dict('failed' if failed else 'success', {
+        'books_extracted': len(koreader_books),
+        'page_stat_records': aggregator.records_processed,
+        'sessions_aggregated': aggregator.sessions_emitted,
+        'books_inserted': books_inserted,
+        'sessions_inserted': sessions_inserted,
+        'sessions_extended': loader.sessions_extended,
+        'sessions_known_skipped': known_sessions.skipped(Config.DEVICE_ID),
+        'sessions_unresolved': resolver.unresolved(Config.DEVICE_ID),
+        'daily_rollup_rows': loader.rollup_rows,
+        'neon_reconnects': loader.reconnects,
+    })
+    if not dry_run:
+        if failed:
+            loader.update_sync_status(
+                source_name, None, aggregator.sessions_emitted, sessions_inserted,
+                time.monotonic() - started, 'failed', sync_mode,
+                error_message=errors[0] if errors else _load_error_message(loader, unresolved),
+                records_updated=loader.sessions_extended, run_metrics=run_metrics
+            )
+        else:
+            loader.update_sync_status(
+                source_name, new_cursor, aggregator.sessions_emitted, sessions_inserted,
+                time.monotonic() - started, 'success', sync_mode,
+                records_updated=loader.sessions_extended, run_metrics=run_metrics
+            )
+            if transaction and not _finish_transaction(loader, resolver, commit=not loader.load_errors):
+                failed = True
+                books_inserted = sessions_inserted = 0
+                run_metrics['status'] = 'failed'
+                loader.update_sync_status(
+                    source_name, None, aggregator.sessions_emitted, 0,
+                    time.monotonic() - started, 'failed', sync_mode,
+                    error_message="load transaction rolled back", run_metrics=run_metrics
+                )
+        if not failed:
+            fingerprints.record(Config.DEVICE_ID, fingerprint, new_cursor)
+            known_sessions.commit(Config.DEVICE_ID)
+        metrics.publish(run_metrics, logger)
+
+    loader.disconnect()
+
+    logger.info("\n" + "=" * 70)
+    logger.info("ETL SUMMARY (pipelined)")
+    logger.info("=" * 70)
+    logger.info(f"KOReader books extracted: {len(koreader_books)}")
+    logger.info(f"Page stat data records: {aggregator.records_processed}")
+    logger.info(f"Aggregated sessions: {aggregator.sessions_emitted}")
+    logger.info(f"Books inserted into Neon.tech: {books_inserted}")
+    logger.info(f"Reading sessions inserted: {sessions_inserted}")
+    logger.info(f"Reading sessions extended: {loader.sessions_extended}")
+    logger.info(f"Reading sessions already in Neon.tech (not sent): {known_sessions.skipped(Config.DEVICE_ID)}")
+    logger.info(f"Reading sessions of books missing from Neon.tech (not sent): "
+                f"{resolver.unresolved(Config.DEVICE_ID)}")
+    logger.info(f"Daily rollup rows updated: {loader.rollup_rows}")
+    logger.info(f"Sync cursor: {new_cursor}")
+    metrics.log_summary(logger)
+    logger.info(f"Total: {time.monotonic() - started:.2f}s")
+    logger.info(f"Completed at {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}")
+    logger.info("=" * 70)
+
+    return not failed
+
+
+def _spool_and_flush(
+    spool: Outbox,
+    loader: NeonLoader,
+    logger: logging.Logger,
+    books: List[Dict],
+    sessions: List[ReadingSessionRecord],
+    aggregator,
+    since: Optional[int],
+    sync_mode: str,
+    load_method: str,
+    fingerprints: FingerprintStore,
+    fingerprint: Optional[Dict],
+    metrics: RunMetrics,
+    keep_connection: bool = False
+) -> bool:
+    """
+    STEP 6 of an --outbox run: spool the transformed run, then flush the
+    outbox. False if the run could not be spooled or a pending run failed to
+    load; an unreachable Neon.tech is not a failure, the run waits in the
+    outbox. With `keep_connection` the loader is left connected (run_watch()).
+    """
+    new_cursor = aggregator.high_water_mark if aggregator.high_water_mark is not None else since
+
+    logger.info("\n[STEP 6] Spooling to local outbox...")
+    with metrics.stage('spool') as stage:
+        run_id = spool.enqueue(
+            Config.DEVICE_ID, books, sessions, new_cursor, aggregator.sessions_emitted, sync_mode
+        )
+        stage['rows'] = len(books) + len(sessions)
+    if run_id is None:
+        if not keep_connection:
+            loader.disconnect()
+        spool.close()
+        return False
+    # Extraction is durable from here on; a Neon.tech outage no longer loses work
+    fingerprints.record(Config.DEVICE_ID, fingerprint, new_cursor)
+    logger.info(f"Spooled run {run_id}: {len(books)} books, {len(sessions)} sessions")
+
+    connected = loader.conn is not None
+    if not connected:
+        with metrics.stage('connect'):
+            connected = _connect_neon(loader, logger)
+    if not connected:
+        logger.warning("Neon.tech unreachable - run kept in the outbox for the next flush")
+        totals = {'runs': 0, 'books_inserted': 0, 'sessions_inserted': 0, 'sessions_known_skipped': 0,
+                  'failed': 0}
+    else:
+        with metrics.stage('flush') as stage:
+            totals = flush_outbox(spool, loader, logger, make_book_id_resolver(logger),
+                                  batch_size=Config.BATCH_SIZE, load_method=load_method,
+                                  known_sessions=make_session_key_set(logger))
+            stage['rows'] = totals['books_inserted'] + totals['sessions_inserted']
+        if not keep_connection:
+            loader.disconnect()
+
+    pending = spool.pending_counts()
+    spool.close()
+    # sync_status rows are written per delivered run by flush_outbox()
+    metrics.publish(metrics.as_dict('failed' if totals['failed'] else 'success', {
+        'page_stat_records': aggregator.records_processed,
+        'sessions_aggregated': aggregator.sessions_emitted,
+        'books_inserted': totals['books_inserted'],
+        'sessions_inserted': totals['sessions_inserted'],
+        'sessions_extended': loader.sessions_extended,
+        'sessions_known_skipped': totals['sessions_known_skipped'],
+        'daily_rollup_rows': loader.rollup_rows,
+        'outbox_pending_runs': pending['runs'],
+    }), logger)
+
+    logger.info("\n" + "=" * 70)
+    logger.info("ETL SUMMARY (outbox)")
+    logger.info("=" * 70)
+    logger.info(f"Page stat data records: {aggregator.records_processed}")
+    logger.info(f"Aggregated sessions: {aggregator.sessions_emitted}")
+    logger.info(f"Outbox runs delivered: {totals['runs']}")
+    logger.info(f"Books inserted into Neon.tech: {totals['books_inserted']}")
+    logger.info(f"Reading sessions inserted: {totals['sessions_inserted']}")
+    logger.info(f"Reading sessions extended: {loader.sessions_extended}")
+    logger.info(f"Reading sessions already in Neon.tech (not sent): {totals['sessions_known_skipped']}")
+    logger.info(f"Daily rollup rows updated: {loader.rollup_rows}")
+    logger.info(f"Outbox pending: {pending['runs']} runs, {pending['sessions']} sessions")
+    logger.info(f"Sync cursor: {new_cursor}")
+    metrics.log_summary(logger)
+    logger.info(f"Completed at {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}")
+    logger.info("=" * 70)
+
+    return totals['failed'] == 0
+
+
+# ============================================================================
+# Multi-Device ETL
+# ============================================================================
+
+def load_device_manifest(manifest_path: str) -> List[Tuple[str, str]]:
+    """
+    Read a device manifest: a JSON list of {"device_id": ..., "backup": ...}
+    objects, one per e-reader synced through Syncthing.
+    """
+    with open(manifest_path) as f:
+        entries = json.load(f)
+
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("manifest must be a non-empty JSON list")
+
+    devices = []
+    for entry in entries:
+        try:
+            devices.append((str(entry['device_id']), str(entry['backup'])))
+        except (KeyError, TypeError):
+            raise ValueError(f"manifest entry needs 'device_id' and 'backup': {entry!r}")
+
+    device_ids = [device_id for device_id, _ in devices]
+    if len(set(device_ids)) != len(device_ids):
+        raise ValueError("manifest contains duplicate device_id values")
+    return devices
+
+
+def _prepare_device(
+    device_id: str,
+    backup_path: str,
+    gap_minutes: int,
+    engine: str,
+    since: Optional[int],
+    cache: bool = False
+) -> Dict:
+    """
+    Extract, aggregate and transform one device's statistics.sqlite3, and
+    with `cache` write it into the columnar cache (see ColumnarCache).
+
+    Runs in a worker process, so it only takes and returns picklable values.
+    Errors are returned in 'error' rather than raised.
+    """
+    logger = logging.getLogger('etl_koreader')
+    result = {'device_id': device_id, 'error': None}
+
+    if not Path(backup_path).is_file():
+        result['error'] = f"backup not found: {backup_path}"
+        return result
+
+    extractor = KOReaderExtractor(backup_path, logger)
+    if not extractor.connect():
+        result['error'] = f"cannot open {backup_path}"
+        return result
+
+    try:
+        aggregator = make_session_aggregator(engine, gap_minutes, logger)
+        if since is not None:
+            extractor.find_open_sessions(since, gap_minutes)
+        koreader_books = extractor.extract_books()
+        book_pages = book_page_counts(koreader_books)
+        page_stats = None
+        if engine == 'numpy':
+            page_stats = extractor.extract_page_stat_columns(since=since)
+            aggregated = aggregator.aggregate_columns(page_stats, book_pages)
+        elif engine == 'sqlite':
+            aggregated = aggregator.aggregate(extractor.extract_sessions(gap_minutes, since=since))
+        else:
+            page_stats = extractor.extract_page_stat_data(since=since)
+            aggregated = aggregator.aggregate(page_stats, book_pages)
+    except (ImportError, ValueError) as e:
+        result['error'] = str(e)
+        return result
+    finally:
+        extractor.disconnect()
+
+    if not koreader_books or (not aggregator.records_processed and since is None):
+        result['error'] = "no data extracted"
+        return result
+
+    transformer = DataTransformer(device_id, logger)
+    books = transformer.transform_books(koreader_books)
+    sessions = transformer.transform_sessions(aggregated, koreader_books)
+    if cache:
+        update_columnar_cache(device_id, koreader_books, books, sessions, page_stats, since, logger)
+    result.update({
+        'books': books,
+        'sessions': sessions,
+        'books_extracted': len(koreader_books),
+        'records': aggregator.records_processed,
+        'aggregated': aggregator.sessions_emitted,
+        'high_water_mark': aggregator.high_water_mark,
+    })
+    return result
+
+
+def _load_device(
+    conn_pool: Optional['psycopg2.pool.ThreadedConnectionPool'],
+    resolver: BookIdResolver,
+    known_sessions: SessionKeySet,
+    daily_rollups: bool,
+    prepared: Dict,
+    since: Optional[int],
+    dry_run: bool,
+    load_method: str,
+    sync_mode: str,
+    started: float,
+    logger: logging.Logger,
+    force: bool = False
+) -> Dict:
+    """
+    Load one prepared device on a pooled connection and record its
+    sync_status. A dry run gets no pool (`conn_pool` is None) and counts
+    against the cached book ids and session keys only.
+    """
+    device_id = prepared['device_id']
+    loader = NeonLoader(logger)
+    loader.has_daily_rollups = daily_rollups
+    conn = None if dry_run else conn_pool.getconn()
+    try:
+        if not dry_run:
+            loader.attach(conn)
+            known_sessions.sync(loader, device_id, reload=force)
+        transaction = load_method == 'transaction' and not dry_run
+        if transaction:
+            loader.begin()
+
+        # Same order on every device so concurrent book inserts cannot deadlock
+        books = sorted(prepared['books'], key=lambda book: book['file_hash'] or '')
+        if load_method == 'copy':
+            books_inserted = loader.copy_books(books, dry_run=dry_run)
+        elif load_method == 'transaction':
+            books_inserted = loader.load_books_prepared(books, dry_run=dry_run)
+        else:
+            books_inserted = loader.load_books(books, dry_run=dry_run)
+
+        if not dry_run:
+            resolver.resolve(loader, (book['file_hash'] for book in books))
+        sessions = list(known_sessions.filter(device_id, resolver.bind(prepared['sessions'], device_id, dry_run)))
+        if load_method == 'copy':
+            sessions_inserted = loader.copy_reading_sessions(sessions, dry_run=dry_run)
+        elif load_method == 'transaction':
+            sessions_inserted = loader.load_reading_sessions_prepared(
+                sessions, batch_size=Config.BATCH_SIZE, dry_run=dry_run
+            )
+        else:
+            sessions_inserted = loader.load_reading_sessions(sessions, dry_run=dry_run)
+        if loader.stale_book_ids:
+            resolver.invalidate()
+        known_sessions.log_counts(device_id, dry_run)
+        unresolved = 0 if dry_run else resolver.unresolved(device_id)
+        failed = bool(loader.load_errors or unresolved)
+        if transaction and failed:
+            _finish_transaction(loader, resolver, commit=False)
+            books_inserted = sessions_inserted = 0
+
+        cursor = prepared['high_water_mark'] if prepared['high_water_mark'] is not None else since
+        if not dry_run:
+            loader.update_sync_status(
+                sync_source_name(device_id),
+                None if failed else cursor,
+                prepared['aggregated'], sessions_inserted,
+                time.monotonic() - started,
+                'failed' if failed else 'success',
+                sync_mode,
+                error_message=_load_error_message(loader, unresolved) if failed else None,
+                records_updated=loader.sessions_extended
+            )
+            # In a run transaction the sync_status row commits with the device's rows
+            if transaction and not failed and not _finish_transaction(
+                    loader, resolver, commit=not loader.load_errors):
+                books_inserted = sessions_inserted = 0
+                loader.update_sync_status(
+                    sync_source_name(device_id), None, prepared['aggregated'], 0,
+                    time.monotonic() - started, 'failed', sync_mode,
+                    error_message="load transaction rolled back"
+                )
+            if not failed and not loader.load_errors:
+                known_sessions.commit(device_id)
+        return {
+            'books_inserted': books_inserted,
+            'sessions_inserted': sessions_inserted,
+            'sessions_skipped': known_sessions.skipped(device_id),
+            'sessions_unresolved': unresolved,
+            'load_errors': loader.load_errors,
+        }
+    finally:
+        if conn is not None:
+            if loader.in_transaction:
+                loader.finish(commit=False)
+            loader.detach()
+            conn_pool.putconn(conn)
+
+
+def run_multi_device_etl(
+    manifest_path: str,
+    dry_run: bool = False,
+    incremental: bool = False,
+    engine: Optional[str] = None,
+    load_method: Optional[str] = None,
+    force: bool = False
+) -> bool:
+    """
+    Run the ETL for every (backup, device) pair in a manifest.
+
+    Extraction, aggregation and transformation run per device in a process
+    pool; each device is loaded as soon as it is ready, on a bounded
+    ThreadedConnectionPool of at most ETL_WORKERS connections. Wall-clock time
+    approaches that of the slowest device rather than the sum of all devices.
+    Devices whose backup matches its stored fingerprint are skipped unless
+    `force` is set, which also reloads every device's known session keys.
+    """
+    try:
+        Config.validate()
+    except ValueError as e:
+        print(f"Configuration Error: {e}")
+        return False
+
+    logger = setup_logging(Config.ETL_LOG_PATH, dry_run)
+    started = time.monotonic()
+    sync_mode = 'incremental' if incremental else 'full_refresh'
+    engine = engine or Config.SESSION_ENGINE
+    load_method = load_method or Config.LOAD_METHOD
+
+    logger.info("=" * 70)
+    logger.info("ETL Pipeline: KOReader Statistics → Neon.tech PostgreSQL (multi-device)")
+    logger.info("=" * 70)
+    logger.info(f"Started at {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}")
+    logger.info(f"Mode: {'DRY-RUN' if dry_run else 'NORMAL'} ({sync_mode})")
+    logger.info(f"Manifest: {manifest_path}")
+
+    try:
+        devices = load_device_manifest(manifest_path)
+    except (OSError, ValueError) as e:
+        logger.error(f"Invalid device manifest: {e}")
+        return False
+    if load_method not in LOAD_METHODS:
+        logger.error(f"Unknown load method '{load_method}' (expected one of {', '.join(LOAD_METHODS)})")
+        return False
+
+    fingerprints = FingerprintStore(Config.FINGERPRINT_PATH, logger)
+    device_fingerprints = {
+        device_id: backup_fingerprint(backup_path) for device_id, backup_path in devices
+    }
+    if not force:
+        unchanged = [
+            device_id for device_id, _ in devices
+            if fingerprints.is_unchanged(device_id, device_fingerprints[device_id])
+        ]
+        if unchanged:
+            logger.info(f"Backup unchanged since last successful load: {', '.join(unchanged)} - skipping")
+        devices = [(device_id, path) for device_id, path in devices if device_id not in unchanged]
+        if not devices:
+            logger.info("No device backups changed - nothing to do (use --force to override)")
+            return True
+
+    workers = max(1, min(Config.ETL_WORKERS, len(devices)))
+    logger.info(f"Devices: {', '.join(device_id for device_id, _ in devices)}")
+    logger.info(f"Workers: {workers} processes, {0 if dry_run else workers} Neon.tech connections")
+
+    # A dry run takes each device's cursor from its local copy and never
+    # contacts Neon.tech
+    conn_pool = None
+    daily_rollups = False
+    if dry_run:
+        cursors = {
+            device_id: fingerprints.sync_cursor(device_id) if incremental else None
+            for device_id, _ in devices
+        }
+    else:
+        # Validate the schema and read per-device cursors on one connection first
+        loader = NeonLoader(logger)
+        if not _connect_neon(loader, logger):
+            return False
+        cursors = {
+            device_id: loader.get_sync_cursor(sync_source_name(device_id)) if incremental else None
+            for device_id, _ in devices
+        }
+        daily_rollups = loader.has_daily_rollups
+        loader.disconnect()
+
+        from psycopg2 import pool
+        try:
+            conn_pool = pool.ThreadedConnectionPool(
+                1, workers,
+                host=Config.NEON_HOST,
+                user=Config.NEON_USER,
+                password=Config.NEON_PASSWORD,
+                database=Config.NEON_DATABASE,
+                **NeonLoader.CONNECT_OPTIONS
+            )
+        except psycopg2.Error as e:
+            logger.error(f"Failed to open Neon.tech connection pool: {e}")
+            return False
+
+    resolver = make_book_id_resolver(logger, read_only=dry_run)
+    known_sessions = make_session_key_set(logger, read_only=dry_run)
+    results: Dict[str, Dict] = {}
+    from concurrent.futures import ProcessPoolExecutor
+    from etl_logging import init_worker_logging, listen_for_workers
+    # Workers queue their records back to this process, which writes them
+    worker_logs = listen_for_workers(logger)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker_logging,
+                             initargs=('etl_koreader', worker_logs.queue, Config.LOG_DEBUG_PER_SECOND)) as processes, \
+            ThreadPoolExecutor(max_workers=workers) as loaders:
+        prepare_futures = {
+            processes.submit(
+                _prepare_device, device_id, backup_path,
+                Config.SESSION_GAP_MINUTES, engine, cursors[device_id],
+                bool(Config.PARQUET_PATH) and not dry_run
+            ): device_id
+            for device_id, backup_path in devices
+        }
+        load_futures = {}
+        for future in as_completed(prepare_futures):
+            device_id = prepare_futures[future]
+            try:
+                prepared = future.result()
+            except Exception as e:
+                prepared = {'device_id': device_id, 'error': f"worker failed: {e}"}
+            results[device_id] = prepared
+            if prepared['error']:
+                logger.error(f"[{device_id}] {prepared['error']} - skipping load")
+                continue
+            logger.info(f"[{device_id}] Prepared {prepared['records']} records into "
+                        f"{prepared['aggregated']} sessions - loading")
+            load_futures[loaders.submit(
+                _load_device, conn_pool, resolver, known_sessions, daily_rollups, prepared, cursors[device_id],
+                dry_run, load_method, sync_mode, started, logger, force
+            )] = device_id
+
+        for future in as_completed(load_futures):
+            device_id = load_futures[future]
+            try:
+                results[device_id].update(future.result())
+            except psycopg2.Error as e:
+                results[device_id]['error'] = f"load failed: {e}"
+                logger.error(f"[{device_id}] Load failed: {e}")
+
+    worker_logs.stop()
+    if conn_pool is not None:
+        conn_pool.closeall()
+
+    if not dry_run:
+        for device_id, result in results.items():
+            if not result.get('error') and not result.get('load_errors') and not result.get('sessions_unresolved'):
+                high_water_mark = result['high_water_mark']
+                fingerprints.record(device_id, device_fingerprints[device_id],
+                                    cursors[device_id] if high_water_mark is None else high_water_mark)
+
+    # Summary
+    logger.info("\n" + "=" * 70)
+    logger.info("ETL SUMMARY (multi-device)")
+    logger.info("=" * 70)
+    for device_id, _ in devices:
+        result = results.get(device_id, {})
+        if result.get('error'):
+            logger.info(f"{device_id}: FAILED ({result['error']})")
+            continue
+        logger.info(
+            f"{device_id}: records={result['records']}, sessions={result['aggregated']}, "
+            f"books inserted={result.get('books_inserted', 0)}, "
+            f"sessions inserted={result.get('sessions_inserted', 0)}, "
+            f"already in Neon.tech={result.get('sessions_skipped', 0)}, "
+            f"unresolved={result.get('sessions_unresolved', 0)}"
+        )
+    logger.info(f"Elapsed: {time.monotonic() - started:.1f}s")
+    logger.info(f"Completed at {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}")
+    logger.info("=" * 70)
+
+    return all(
+        not result.get('error') and not result.get('load_errors') and not result.get('sessions_unresolved')
+        for result in results.values()
+    )
+
+
+# ============================================================================
+# Watch Mode
+# ============================================================================
+
+class BackupWatcher:
+    """
+    Block until a new statistics.sqlite3 backup has landed.
+
+    Watches the backup's directory with Linux inotify, called through libc
+    so no extra package is needed: Syncthing writes a temporary file and
+    renames it over the backup, which replaces the watched inode, so the
+    directory is watched and events are matched by name. A rename onto the
+    backup or its -wal, or a write to the backup file itself, counts. Closes
+    of -wal/-shm alone do not: SQLite opens those read-write even for the
+    ETL's own read-only connections. Where inotify is unavailable the
+    backup's size and mtime are polled once a second.
+    """
+
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    # struct inotify_event: wd, mask, cookie, len, then `len` bytes of name
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self, backup_path: str, logger: logging.Logger, debounce_seconds: float):
+        self.backup = Path(backup_path)
+        self.logger = logger
+        self.debounce_seconds = debounce_seconds
+        self._fd: Optional[int] = None
+        self._signature = self._stat_signature()
+        import ctypes
+        import ctypes.util
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            fd = libc.inotify_init1(os.O_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+            mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO
+            if libc.inotify_add_watch(fd, os.fsencode(self.backup.parent), mask) < 0:
+                errno = ctypes.get_errno()
+                os.close(fd)
+                raise OSError(errno, f"cannot watch {self.backup.parent}")
+            self._fd = fd
+            self.logger.info(f"Watching {self.backup.parent} for {self.backup.name} with inotify")
+        except (OSError, AttributeError, TypeError) as e:
+            self.logger.warning(f"inotify unavailable ({e}) - polling {self.backup} every second")
+
+    def _stat_signature(self) -> Tuple:
+        signature = []
+        for path in (self.backup, self.backup.with_name(self.backup.name + '-wal')):
+            try:
+                stat = path.stat()
+                signature.append((stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _touched(self, timeout: float) -> bool:
+        """Whether a new version of the backup landed within `timeout` seconds"""
+        if self._fd is None:
+            time.sleep(timeout)
+            signature = self._stat_signature()
+            changed, self._signature = signature != self._signature, signature
+            return changed
+
+        readable, _, _ = select.select([self._fd], [], [], max(0.0, timeout))
+        if not readable:
+            return False
+        data = os.read(self._fd, 64 * 1024)
+        backup_name = os.fsencode(self.backup.name)
+        touched = False
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & self.IN_MOVED_TO:
+                touched |= name in (backup_name, backup_name + b'-wal')
+            else:
+                touched |= name == backup_name
+        return touched
+
+    def wait(self, stop: threading.Event, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for a write to the backup, then until writes have stopped for
+        debounce_seconds (at most ten debounce periods in all), so a backup
+        copied in several steps triggers one run. Returns True when a run is
+        due - also once `timeout` passes without any write - and False when
+        `stop` is set.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not stop.is_set():
+            if deadline is not None and time.monotonic() >= deadline:
+                return True
+            if self._touched(1.0):
+                break
+        else:
+            return False
+
+        quiet_since = time.monotonic()
+        settle_by = quiet_since + 10 * self.debounce_seconds
+        while not stop.is_set():
+            remaining = min(quiet_since + self.debounce_seconds, settle_by) - time.monotonic()
+            if remaining <= 0:
+                return True
+            if self._touched(min(remaining, 1.0)):
+                quiet_since = time.monotonic()
+        return False
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def run_watch(
+    dry_run: bool = False,
+    stream: bool = False,
+    engine: Optional[str] = None,
+    load_method: Optional[str] = None
+) -> bool:
+    """
+    --watch: stay running and load each new backup within seconds.
+
+    Runs an incremental ETL at startup and then whenever BackupWatcher sees
+    a new backup settle; a failed run is retried after
+    ETL_WATCH_RETRY_SECONDS even without a new backup. One Neon.tech
+    connection is kept open across runs and pinged before each one, and
+    replaced only when the ping fails. Stops cleanly on SIGTERM or SIGINT.
+    """
+    try:
+        Config.validate()
+    except ValueError as e:
+        print(f"Configuration Error: {e}")
+        return False
+
+    logger = setup_logging(Config.ETL_LOG_PATH, dry_run)
+    if not Path(Config.KOREADER_BACKUP).parent.is_dir():
+        logger.error(f"Backup directory {Path(Config.KOREADER_BACKUP).parent} does not exist")
+        return False
+
+    stop = threading.Event()
+    previous_handlers = {
+        signum: signal.signal(signum, lambda *_: stop.set())
+        for signum in (signal.SIGTERM, signal.SIGINT)
+    }
+
+    watcher = BackupWatcher(Config.KOREADER_BACKUP, logger, Config.WATCH_DEBOUNCE_SECONDS)
+    loader = NeonLoader(logger)
+    retry_after = None
+    try:
+        while not stop.is_set():
+            if loader.conn is not None and not loader.ping():
+                logger.warning("Kept Neon.tech connection is gone - reconnecting for this run")
+                loader.disconnect()
+            ok = run_etl(dry_run=dry_run, incremental=True, stream=stream, engine=engine,
+                         load_method=load_method, loader=loader)
+            ok = ok and not loader.load_errors
+            retry_after = None if ok else Config.WATCH_RETRY_SECONDS
+            if not ok:
+                logger.warning(f"Run failed - retrying in {retry_after:.0f}s unless a new backup lands first")
+            logger.info(f"Waiting for the next backup of {Config.KOREADER_BACKUP}...")
+            if not watcher.wait(stop, timeout=retry_after):
+                break
+    finally:
+        watcher.close()
+        loader.disconnect()
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        logger.info("Watch mode stopped")
+
+    return True
+
+
+# ============================================================================
+# CLI Entry Point
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Extract KOReader statistics and load into Neon.tech PostgreSQL'
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Preview what would be loaded without connecting to Neon.tech'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Only extract page_stat_data newer than the sync_status cursor for this device'
+    )
+
+    stream_group = parser.add_mutually_exclusive_group()
+    stream_group.add_argument(
+        '--stream',
+        action='store_true',
+        help='Stream rows from SQLite to Neon.tech in ETL_BATCH_SIZE batches (flat memory use)'
+    )
+    stream_group.add_argument(
+        '--pipeline',
+        action='store_true',
+        help='Like --stream, with extraction, transformation and loading on concurrent threads '
+             'and Neon.tech connected during extraction'
+    )
+
+    parser.add_argument(
+        '--engine',
+        choices=SESSION_ENGINES,
+        default=None,
+        help='Session aggregation engine (default: SESSION_ENGINE or python; sqlite is the slowest)'
+    )
+    parser.add_argument(
+        '--load-method',
+        choices=LOAD_METHODS,
+        default=None,
+        help='Load via batched INSERT, COPY into a staging table, or prepared statements in one '
+             'transaction (default: ETL_LOAD_METHOD or insert)'
+    )
+
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Run even if the backup matches the fingerprint of the last successful load, '
+             'and reload the known session keys from Neon.tech'
+    )
+
+    outbox_group = parser.add_mutually_exclusive_group()
+    outbox_group.add_argument(
+        '--outbox',
+        action='store_true',
+        help='Spool transformed rows to the local outbox (ETL_OUTBOX_PATH) before loading, '
+             'so a Neon.tech outage only delays delivery'
+    )
+    outbox_group.add_argument(
+        '--flush-only',
+        action='store_true',
+        help='Only drain the local outbox into Neon.tech, without extracting'
+    )
+
+    parser.add_argument(
+        '--manifest',
+        default=Config.KOREADER_MANIFEST,
+        help='JSON manifest of {"device_id", "backup"} pairs to process in parallel '
+             '(default: KOREADER_MANIFEST)'
+    )
+
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running and load each new backup incrementally within seconds of it landing'
+    )
+
+    args = parser.parse_args()
+
+    if args.flush_only:
+        sys.exit(0 if run_flush_only() else 1)
+
+    if args.watch:
+        for flag in ('pipeline', 'outbox', 'manifest'):
+            if getattr(args, flag):
+                parser.error(f"--{flag} is not supported with --watch")
+        sys.exit(0 if run_watch(
+            dry_run=args.dry_run,
+            stream=args.stream,
+            engine=args.engine,
+            load_method=args.load_method
+        ) else 1)
+
+    if args.manifest:
+        for flag in ('stream', 'pipeline', 'outbox'):
+            if getattr(args, flag):
+                parser.error(f"--{flag} is not supported with --manifest")
+        success = run_multi_device_etl(
+            args.manifest,
+            dry_run=args.dry_run,
+            incremental=args.incremental,
+            engine=args.engine,
+            load_method=args.load_method,
+            force=args.force
+        )
+        sys.exit(0 if success else 1)
+
+    success = run_etl(
+        dry_run=args.dry_run,
+        incremental=args.incremental,
+        stream=args.stream,
+        engine=args.engine,
+        load_method=args.load_method,
+        force=args.force,
+        outbox=args.outbox,
+        pipeline=args.pipeline
+    )
     sys.exit(0 if success else 1)
 
 
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Synthetic KOReader statistics.sqlite3 generator
+
+Story 3.2: Build ETL pipeline for statistics extraction
+
+This script:
+1. Creates a statistics.sqlite3 with KOReader's book / page_stat_data schema
+2. Simulates readers over years of reading: a main book plus an occasional
+   side book, sessions of a few to ~60 pages, short pauses inside sessions and
+   gaps of hours, days or weeks between them. Larger databases get more
+   readers rather than a longer history
+3. Includes rereads of finished books, pages read out of order and layout
+   changes that alter total_pages part-way through a book
+4. Fills book.pages, total_read_time, total_read_pages and last_open from the
+   generated rows, as KOReader does
+
+Output is deterministic for a given --rows/--books/--seed, so databases can be
+regenerated instead of stored.
+
+Usage:
+    python3 generate_koreader_stats.py OUTPUT [--rows N] [--books N] [--seed N] [--start YYYY-MM-DD]
+                                       [--years N] [--readers N]
+"""
+
+import argparse
+import heapq
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# ============================================================================
+# Schema
+# ============================================================================
+
+# As created by KOReader's statistics plugin (see resources/statistics.sqlite3)
+SCHEMA = """
+    CREATE TABLE book (
+        id integer PRIMARY KEY autoincrement,
+        title text,
+        authors text,
+        notes integer,
+        last_open integer,
+        highlights integer,
+        pages integer,
+        series text,
+        language text,
+        md5 text,
+        total_read_time integer,
+        total_read_pages integer
+    );
+    CREATE UNIQUE INDEX book_title_authors_md5 ON book(title, authors, md5);
+    CREATE TABLE page_stat_data (
+        id_book integer,
+        page integer NOT NULL DEFAULT 0,
+        start_time integer NOT NULL DEFAULT 0,
+        duration integer NOT NULL DEFAULT 0,
+        total_pages integer NOT NULL DEFAULT 0,
+        UNIQUE (id_book, page, start_time),
+        FOREIGN KEY(id_book) REFERENCES book(id)
+    );
+    CREATE INDEX page_stat_data_start_time ON page_stat_data(start_time);
+"""
+
+LANGUAGES = ('en', 'en', 'en', 'en', 'uk', 'de', 'fr')
+
+# Roughly what one avid reader produces per year with the model below
+ROWS_PER_READER_YEAR = 10_000
+
+# KOReader ignores page turns faster than this and caps slower ones
+MIN_PAGE_SECONDS = 5
+MAX_PAGE_SECONDS = 120
+
+INSERT_BATCH = 50_000
+
+
+# ============================================================================
+# Reader Simulation
+# ============================================================================
+
+class _BookRead:
+    """Progress through one reading (or rereading) of a book"""
+
+    def __init__(self, book: Dict, pages: int):
+        self.book = book
+        self.base_pages = pages
+        self.total_pages = pages
+        self.page = 1
+
+    def relayout(self, rng: random.Random):
+        """Font or margin change: total_pages changes and the position rescales"""
+        total_pages = max(10, round(self.base_pages * rng.uniform(0.8, 1.25)))
+        self.page = max(1, round(self.page * total_pages / self.total_pages))
+        self.total_pages = total_pages
+
+    @property
+    def finished(self) -> bool:
+        return self.page > self.total_pages
+
+
+class Library:
+    """The shared book catalogue; each unread book goes to one reader"""
+
+    def __init__(self, books: int, rng: random.Random):
+        self.rng = rng
+        self.catalog = [self._catalog_entry(book_id) for book_id in range(1, books + 1)]
+        self.next_unread = 0
+
+    def _catalog_entry(self, book_id: int) -> Dict:
+        rng = self.rng
+        series = None
+        if rng.random() < 0.3:
+            series = f"Series {rng.randint(1, 400)} #{rng.randint(1, 9)}"
+        return {
+            'id': book_id,
+            'title': f"Synthetic Book {book_id}",
+            'authors': f"Author {rng.randint(1, 500)}",
+            'pages': int(min(2500, max(30, rng.lognormvariate(5.8, 0.5)))),
+            'series': series,
+            'language': rng.choice(LANGUAGES),
+            'md5': f"{rng.getrandbits(128):032x}",
+            'notes': rng.choice((0, 0, 0, 1, 3)),
+            'highlights': rng.choice((0, 0, 2, 5, 12)),
+        }
+
+    def take_unread(self) -> Optional[Dict]:
+        if self.next_unread >= len(self.catalog):
+            return None
+        self.next_unread += 1
+        return self.catalog[self.next_unread - 1]
+
+
+class Reader:
+    """
+    One reader's page_stat_data history in start_time order. Readers only
+    reread books they finished themselves, so two readers are never on the
+    same book and (id_book, page, start_time) stays unique.
+    """
+
+    def __init__(self, library: Library, rng: random.Random, clock: int, stats: Dict[str, int]):
+        self.library = library
+        self.rng = rng
+        self.clock = clock
+        self.stats = stats
+        self.finished: List[Dict] = []
+        self.reads: List[_BookRead] = []
+
+    def _open_next_book(self) -> _BookRead:
+        """Start the next unread book, or reread a finished one"""
+        book = None
+        if not self.finished or self.rng.random() >= 0.08:
+            book = self.library.take_unread()
+        if book is None:
+            book = self.rng.choice(self.finished)
+            self.stats['rereads'] += 1
+        return _BookRead(book, book['pages'])
+
+    def _pick_read(self) -> _BookRead:
+        """Mostly the main book; now and then a side book read in parallel"""
+        rng = self.rng
+        if not self.reads:
+            self.reads.append(self._open_next_book())
+        if len(self.reads) < 2 and rng.random() < 0.05:
+            self.reads.append(self._open_next_book())
+        return self.reads[0] if len(self.reads) == 1 or rng.random() < 0.8 else self.reads[1]
+
+    def _advance_gap(self):
+        """Time between sessions: mostly hours, sometimes days, rarely weeks"""
+        rng = self.rng
+        roll = rng.random()
+        if roll < 0.65:
+            gap = rng.randint(3600, 8 * 3600)
+        elif roll < 0.92:
+            gap = rng.randint(8 * 3600, 36 * 3600)
+        elif roll < 0.98:
+            gap = rng.randint(2 * 86400, 7 * 86400)
+        else:
+            gap = rng.randint(14 * 86400, 42 * 86400)
+            self.stats['long_gaps'] += 1
+        self.clock += gap
+
+    def sessions(self) -> Iterator[List[Tuple[int, int, int, int, int]]]:
+        """Yield one list of (id_book, page, start_time, duration, total_pages) rows per session"""
+        rng = self.rng
+        while True:
+            read = self._pick_read()
+            if rng.random() < 0.02:
+                read.relayout(rng)
+                self.stats['layout_changes'] += 1
+
+            rows = []
+            for _ in range(rng.randint(5, 60)):
+                if read.finished:
+                    break
+                duration = int(min(MAX_PAGE_SECONDS, max(MIN_PAGE_SECONDS, rng.lognormvariate(3.4, 0.5))))
+                rows.append((read.book['id'], read.page, self.clock, duration, read.total_pages))
+                self.clock += duration
+                # Short breaks stay inside the session gap threshold
+                if rng.random() < 0.03:
+                    self.clock += rng.randint(60, 25 * 60)
+
+                roll = rng.random()
+                if roll < 0.03 and read.page > 1:
+                    read.page -= 1
+                elif roll < 0.04:
+                    read.page += rng.randint(2, 6)
+                else:
+                    read.page += 1
+
+            if read.finished:
+                self.reads.remove(read)
+                if read.book not in self.finished:
+                    self.finished.append(read.book)
+            if rows:
+                self.stats['sessions'] += 1
+                yield rows
+            self._advance_gap()
+
+
+# ============================================================================
+# Database Writer
+# ============================================================================
+
+def generate_statistics_db(
+    db_path: str,
+    rows: int,
+    books: Optional[int] = None,
+    seed: int = 42,
+    start: Optional[datetime] = None,
+    years: int = 5,
+    readers: Optional[int] = None
+) -> Dict:
+    """
+    Write a synthetic statistics.sqlite3 with exactly `rows` page_stat_data
+    rows, merged from `readers` simulated readers in time order.
+
+    `readers` defaults to enough readers for the history to span about
+    `years` years (one reader fills ~10,000 rows a year), and `books` to one
+    catalogue book per 350 rows (at least 10); rereads make up the
+    difference once the catalogue is exhausted. Returns a summary.
+    """
+    readers = readers or max(1, round(rows / (ROWS_PER_READER_YEAR * years)))
+    books = books or max(10, rows // 350)
+    start = start or datetime(2020, 1, 1, tzinfo=timezone.utc)
+    rng = random.Random(seed)
+    library = Library(books, rng)
+    stats = {'readers': readers, 'rereads': 0, 'layout_changes': 0, 'sessions': 0, 'long_gaps': 0}
+    # Readers start within the first week so their histories overlap
+    clock = int(start.timestamp())
+    reading = [
+        Reader(library, random.Random(rng.getrandbits(64)), clock + rng.randint(0, 7 * 86400), stats)
+        for _ in range(readers)
+    ]
+
+    path = Path(db_path)
+    if path.exists():
+        path.unlink()
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    conn = sqlite3.connect(str(path))
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.executescript(SCHEMA)
+    conn.executemany(
+        "INSERT INTO book (id, title, authors, notes, highlights, pages, series, language, md5) "
+        "VALUES (:id, :title, :authors, :notes, :highlights, :pages, :series, :language, :md5)",
+        library.catalog
+    )
+
+    written = 0
+    batch = []
+    sessions = heapq.merge(*(reader.sessions() for reader in reading), key=lambda rows: rows[0][2])
+    for session in sessions:
+        batch.extend(session[:rows - written - len(batch)])
+        if len(batch) >= INSERT_BATCH or written + len(batch) >= rows:
+            conn.executemany("INSERT INTO page_stat_data VALUES (?, ?, ?, ?, ?)", batch)
+            written += len(batch)
+            batch = []
+        if written >= rows:
+            break
+
+    # KOReader keeps only opened books, with their current layout and totals
+    conn.executescript("""
+        DELETE FROM book WHERE id NOT IN (SELECT DISTINCT id_book FROM page_stat_data);
+        UPDATE book SET
+            pages = (SELECT total_pages FROM page_stat_data p WHERE p.id_book = book.id
+                     ORDER BY start_time DESC LIMIT 1),
+            last_open = (SELECT MAX(start_time) FROM page_stat_data p WHERE p.id_book = book.id),
+            total_read_time = (SELECT SUM(duration) FROM page_stat_data p WHERE p.id_book = book.id),
+            total_read_pages = (SELECT COUNT(DISTINCT page) FROM page_stat_data p WHERE p.id_book = book.id);
+    """)
+    conn.commit()
+    opened = conn.execute("SELECT COUNT(*) FROM book").fetchone()[0]
+    first, last = conn.execute("SELECT MIN(start_time), MAX(start_time) FROM page_stat_data").fetchone()
+    conn.close()
+
+    return {
+        'path': str(path),
+        'rows': written,
+        'books': opened,
+        'seed': seed,
+        'days': round((last - first) / 86400) if written else 0,
+        **stats,
+    }
+
+
+# ============================================================================
+# Main
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic KOReader statistics.sqlite3')
+    parser.add_argument('output', help='Path of the statistics.sqlite3 to write (overwritten)')
+    parser.add_argument('--rows', type=int, default=100_000, help='page_stat_data rows (default: 100000)')
+    parser.add_argument('--books', type=int, default=None,
+                        help='catalogue size (default: one book per 350 rows, at least 10)')
+    parser.add_argument('--years', type=int, default=5,
+                        help='approximate span of the history when --readers is not given (default: 5)')
+    parser.add_argument('--readers', type=int, default=None,
+                        help='simulated readers (default: enough to span --years)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed (default: 42)')
+    parser.add_argument('--start', default='2020-01-01', help='first reading day (default: 2020-01-01)')
+    args = parser.parse_args()
+
+    try:
+        start = datetime.strptime(args.start, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+    except ValueError:
+        parser.error(f"--start must be YYYY-MM-DD, got {args.start!r}")
+
+    started = time.perf_counter()
+    summary = generate_statistics_db(args.output, args.rows, args.books, args.seed, start,
+                                     years=args.years, readers=args.readers)
+    print(f"Wrote {summary['rows']} page_stat_data rows for {summary['books']} books to {summary['path']} "
+          f"in {time.perf_counter() - started:.1f}s")
+    print(f"Readers: {summary['readers']}, sessions: {summary['sessions']}, rereads: {summary['rereads']}, "
+          f"layout changes: {summary['layout_changes']}, long gaps: {summary['long_gaps']}, "
+          f"span: {summary['days']} days")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Session Gap Sweep: what-if sessionization at several gap thresholds
+
+Story 3.2: Build ETL pipeline for statistics extraction
+
+This script:
+1. Reads book and page_stat_data rows from a KOReader statistics.sqlite3
+   (the Syncthing backup by default) - Neon.tech is never contacted
+2. Sessionizes them at every requested gap threshold in one sorted pass,
+   with the same book-change / gap rule and pages_read normalization as the ETL
+3. Reports, per threshold, the session count, the duration distribution and
+   pages per minute, as a table or as JSON (--json)
+
+Usage:
+    python3 sweep_session_gaps.py [--backup PATH] [--gaps 5,10,15,30,60] [--json]
+
+The threshold the ETL uses comes from SESSION_GAP_MINUTES; its row is
+marked with * in the table.
+"""
+
+import argparse
+import json
+import logging
+import math
+import sys
+import time
+from bisect import bisect_left
+from pathlib import Path
+from statistics import mean, median
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from extract_koreader_stats import (  # noqa: E402
+    Config,
+    KOReaderExtractor,
+    book_page_counts,
+    page_span,
+)
+
+DEFAULT_GAPS = (5, 10, 15, 30, 60)
+
+# Upper bounds (minutes) of the duration histogram buckets; the last is open
+DURATION_BUCKETS = (5, 15, 30, 60, 120)
+
+
+# ============================================================================
+# Sweep
+# ============================================================================
+
+def _merge(spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Union of inclusive (first, last) intervals as sorted, disjoint runs"""
+    merged: List[Tuple[int, int]] = []
+    for first, last in sorted(spans):
+        if merged and first <= merged[-1][1] + 1:
+            if last > merged[-1][1]:
+                merged[-1] = (merged[-1][0], last)
+        else:
+            merged.append((first, last))
+    return merged
+
+
+class GapSweep:
+    """
+    Sessionize page_stat_data at several gap thresholds in one pass.
+
+    Sessions nest: raising the gap only ever joins neighbouring sessions, so
+    each threshold is fed the closed sessions of the next smaller one rather
+    than the rows. A row costs one bisect plus one append to the smallest
+    threshold's open session; larger thresholds only see session boundaries.
+    Each closed session is recorded as (duration seconds, pages_read), with
+    the same values SessionAggregator would produce at that gap.
+    """
+
+    def __init__(self, gap_minutes: Iterable[int]):
+        self.gap_minutes = sorted(set(gap_minutes))
+        if not self.gap_minutes or self.gap_minutes[0] < 0:
+            raise ValueError("gap thresholds must be non-negative minutes")
+        self.records_processed = 0
+        self.sessions: Dict[int, List[Tuple[int, int]]] = {}
+
+    def run(
+        self,
+        rows: Iterable[Tuple[int, int, int, int, int]],
+        book_pages: Optional[Mapping[int, int]] = None
+    ) -> Dict[int, List[Tuple[int, int]]]:
+        """
+        Sweep (id_book, start_time, duration, page, total_pages) tuples
+        ordered by (id_book, start_time), e.g. PageStatColumns.session_fields().
+        Returns {gap minutes: [(duration seconds, pages_read), ...]}.
+        """
+        book_pages = book_pages or {}
+        gap_seconds = [gap * 60 for gap in self.gap_minutes]
+        levels = len(gap_seconds)
+        durations = [0] * levels
+        spans: List[List[Tuple[int, int]]] = [[] for _ in range(levels)]
+        closed: List[List[Tuple[int, int]]] = [[] for _ in range(levels)]
+        self.records_processed = 0
+        current_book = None
+        previous_start = 0
+        pages = None
+
+        def close(count: int):
+            # Close the open session of the `count` smallest thresholds,
+            # handing each one's time and merged pages up to the next
+            for level in range(count):
+                merged = _merge(spans[level])
+                closed[level].append((durations[level], sum(last - first + 1 for first, last in merged)))
+                if level + 1 < levels:
+                    durations[level + 1] += durations[level]
+                    spans[level + 1].extend(merged)
+                durations[level] = 0
+                spans[level] = []
+
+        for book_id, start_time, duration, page, total_pages in rows:
+            self.records_processed += 1
+            if book_id != current_book:
+                if self.records_processed > 1:
+                    close(levels)
+                current_book = book_id
+                pages = book_pages.get(book_id)
+            else:
+                # Thresholds below this gap split here
+                close(bisect_left(gap_seconds, start_time - previous_start))
+            previous_start = start_time
+            durations[0] += duration
+            spans[0].append(page_span(page, total_pages, pages))
+
+        if self.records_processed:
+            close(levels)
+        self.sessions = dict(zip(self.gap_minutes, closed))
+        return self.sessions
+
+
+# ============================================================================
+# Report
+# ============================================================================
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, min(len(ordered), math.ceil(fraction * len(ordered))) - 1)]
+
+
+def summarize(sessions: List[Tuple[int, int]]) -> Dict:
+    """Session count, duration distribution (minutes) and pages per minute"""
+    minutes = sorted(duration / 60 for duration, _ in sessions)
+    rates = sorted(pages_read / (duration / 60) for duration, pages_read in sessions if duration > 0)
+    total_minutes = sum(minutes)
+    total_pages = sum(pages_read for _, pages_read in sessions)
+
+    buckets = {}
+    lower = 0
+    for upper in DURATION_BUCKETS:
+        buckets[f"{lower}-{upper}"] = bisect_left(minutes, upper) - bisect_left(minutes, lower)
+        lower = upper
+    buckets[f"{lower}+"] = len(minutes) - bisect_left(minutes, lower)
+
+    return {
+        'sessions': len(sessions),
+        'minutes_total': round(total_minutes, 1),
+        'minutes_mean': round(mean(minutes), 2) if minutes else 0.0,
+        'minutes_median': round(median(minutes), 2) if minutes else 0.0,
+        'minutes_p90': round(_percentile(minutes, 0.9), 2),
+        'minutes_max': round(minutes[-1], 2) if minutes else 0.0,
+        'minutes_buckets': buckets,
+        'pages_read': total_pages,
+        'pages_per_minute': round(total_pages / total_minutes, 3) if total_minutes else 0.0,
+        'pages_per_minute_median': round(median(rates), 3) if rates else 0.0,
+    }
+
+
+def print_report(report: Dict):
+    print(f"{report['records']:,} page_stat_data rows from {report['backup']} "
+          f"in {report['seconds']:.2f}s (current gap: {report['current_gap']} min)")
+    print(f"\n  {'gap min':>7} {'sessions':>9} {'mean min':>9} {'median':>8} {'p90':>8} {'max':>8} "
+          f"{'pages/min':>10} {'median p/m':>11}")
+    for gap, summary in report['thresholds'].items():
+        marker = '*' if int(gap) == report['current_gap'] else ' '
+        print(f"{marker} {gap:>7} {summary['sessions']:>9,} {summary['minutes_mean']:>9.1f} "
+              f"{summary['minutes_median']:>8.1f} {summary['minutes_p90']:>8.1f} {summary['minutes_max']:>8.1f} "
+              f"{summary['pages_per_minute']:>10.2f} {summary['pages_per_minute_median']:>11.2f}")
+
+    labels = list(next(iter(report['thresholds'].values()))['minutes_buckets'])
+    print("\n  Sessions by duration (minutes)")
+    print(f"  {'gap min':>7} " + ' '.join(f"{label:>8}" for label in labels))
+    for gap, summary in report['thresholds'].items():
+        print(f"  {gap:>7} " + ' '.join(f"{count:>8,}" for count in summary['minutes_buckets'].values()))
+
+
+# ============================================================================
+# Main
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare session counts and durations across gap thresholds')
+    parser.add_argument('--backup', default=Config.KOREADER_BACKUP,
+                        help=f"KOReader statistics.sqlite3 to read (default: {Config.KOREADER_BACKUP})")
+    parser.add_argument('--gaps', default=','.join(str(gap) for gap in DEFAULT_GAPS),
+                        help=f"comma-separated gap thresholds in minutes "
+                             f"(default: {','.join(str(gap) for gap in DEFAULT_GAPS)})")
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args()
+
+    try:
+        sweep = GapSweep(int(gap) for gap in args.gaps.split(','))
+    except ValueError:
+        parser.error(f"--gaps must be comma-separated non-negative minutes, got {args.gaps!r}")
+
+    logger = logging.getLogger('sweep_session_gaps')
+    logger.addHandler(logging.StreamHandler(sys.stderr))
+    logger.setLevel(logging.WARNING)
+
+    started = time.perf_counter()
+    extractor = KOReaderExtractor(args.backup, logger)
+    if not extractor.connect():
+        print(f"Cannot open {args.backup}", file=sys.stderr)
+        return 1
+    try:
+        book_pages = book_page_counts(extractor.extract_books())
+        page_stats = extractor.extract_page_stat_data()
+    finally:
+        extractor.disconnect()
+    sessions = sweep.run(page_stats.session_fields(), book_pages)
+
+    report = {
+        'backup': args.backup,
+        'records': sweep.records_processed,
+        'seconds': round(time.perf_counter() - started, 3),
+        'current_gap': Config.SESSION_GAP_MINUTES,
+        'thresholds': {gap: summarize(closed) for gap, closed in sessions.items()},
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -15,8 +15,14 @@ Tests cover:
 
 import unittest
 import sqlite3
+import queue
+import threading
+import time
 import tempfile
 import json
+import logging
+import logging.handlers
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime, timezone
 from unittest.mock import patch, MagicMock, call
@@ -26,6 +32,64 @@ import os
 # Add resources/scripts to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent / 'resources' / 'scripts'))
 
+from extract_koreader_stats import (
+    BackupWatcher,
+    BookIdResolver,
+    ColumnarCache,
+    DataTransformer,
+    FingerprintStore,
+    KOReaderExtractor,
+    SessionAggregator,
+    SessionKeySet,
+    VectorizedSessionAggregator,
+    NeonLoader,
+    Outbox,
+    PageStat,
+    PageStatColumns,
+    ReadingSessionRecord,
+    SNAPSHOT_MODES,
+    RunMetrics,
+    Session,
+    SQLiteSessionAggregator,
+    Config,
+    _CopyStream,
+    _copy_text,
+    _STAGE_DONE,
+    _drain,
+    _prepare_device,
+    _run_pipelined,
+    _spool_and_flush,
+    _start_stage,
+    backoff_delay,
+    backup_fingerprint,
+    book_page_counts,
+    flush_outbox,
+    load_device_manifest,
+    main,
+    make_session_aggregator,
+    read_columnar_cache,
+    run_etl,
+    run_watch,
+    setup_logging,
+    sync_source_name,
+)
+from etl_logging import DebugRateLimiter, RecordQueueHandler, init_worker_logging, listen_for_workers, start_queue_logging
+from generate_koreader_stats import generate_statistics_db
+from sweep_session_gaps import GapSweep, summarize
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+BUNDLED_STATISTICS_DB = Path(__file__).parent.parent / 'resources' / 'statistics.sqlite3'
+
+
 # Note: Tests are structured for local SQLite testing.
 # Full integration tests with Neon.tech require actual credentials.
 
@@ -384,6 +448,92 @@ class TestLogging(unittest.TestCase):
         # In actual ETL run, these log messages should appear
         # This test documents expected log output
 
+    def test_listener_writes_json_lines(self):
+        """Test: setup_logging queues records; the listener writes JSON lines to the file"""
+        etl_logger = logging.getLogger('etl_koreader')
+        handlers = list(etl_logger.handlers)
+        etl_logger.handlers = []
+        self.addCleanup(setattr, etl_logger, 'handlers', handlers)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = os.path.join(tmpdir, 'logs', 'etl.log')
+            with patch('etl_logging.atexit.register') as register, \
+                    patch('sys.stdout'):
+                logger = setup_logging(log_path)
+                self.assertIs(setup_logging(log_path), logger)
+                self.assertEqual(len(logger.handlers), 1)
+                self.assertIsInstance(logger.handlers[0], RecordQueueHandler)
+
+                logger.info("Inserted %d books", 3)
+                try:
+                    raise ValueError("boom")
+                except ValueError:
+                    logger.exception("Load failed")
+                register.call_args[0][0]()  # listener.stop() drains the queue
+
+            for target in logger.handlers[0].listener.handlers:
+                target.close()
+            with open(log_path) as f:
+                entries = [json.loads(line) for line in f]
+
+        self.assertEqual([entry['message'] for entry in entries], ['Inserted 3 books', 'Load failed'])
+        self.assertEqual(entries[0]['level'], 'INFO')
+        self.assertEqual(entries[0]['logger'], 'etl_koreader')
+        self.assertTrue(entries[0]['time'].endswith('+00:00'))
+        self.assertIn('ValueError: boom', entries[1]['exception'])
+
+    def test_debug_rate_limited_per_call_site(self):
+        """Test: DEBUG beyond the per-second limit is dropped and counted on the next record"""
+        limiter = DebugRateLimiter(2)
+
+        def record(level, created, lineno=10):
+            entry = logging.LogRecord('etl_koreader', level, 'etl.py', lineno, 'row', None, None)
+            entry.created = created
+            return entry
+
+        passed = [limiter.filter(record(logging.DEBUG, 100.0 + i / 10)) for i in range(5)]
+        self.assertEqual(passed, [True, True, False, False, False])
+        self.assertTrue(limiter.filter(record(logging.DEBUG, 100.2, lineno=11)))
+        self.assertTrue(limiter.filter(record(logging.INFO, 100.5)))
+
+        later = record(logging.DEBUG, 101.0)
+        self.assertTrue(limiter.filter(later))
+        self.assertEqual(later.suppressed, 3)
+        self.assertTrue(DebugRateLimiter(0).filter(record(logging.DEBUG, 100.0)))
+
+    def test_worker_processes_log_through_parent(self):
+        """Test: Pool workers queue their records back to the parent's handlers"""
+        name = 'etl_koreader_worker_test'
+        parent = logging.getLogger(name)
+        parent.setLevel(logging.DEBUG)
+        self.addCleanup(setattr, parent, 'handlers', [])
+        collected = logging.handlers.BufferingHandler(100)
+
+        with patch('etl_logging.atexit.register') as register:
+            start_queue_logging(parent, (collected,), 0)
+            worker_logs = listen_for_workers(parent)
+            with ProcessPoolExecutor(max_workers=1, initializer=init_worker_logging,
+                                     initargs=(name, worker_logs.queue, 0)) as pool:
+                worker_pid = pool.submit(_log_from_worker, name).result()
+            worker_logs.stop()
+            register.call_args[0][0]()
+
+        self.assertNotEqual(worker_pid, os.getpid())
+        self.assertEqual([record.getMessage() for record in collected.buffer],
+                         ['Prepared 3 records', 'Worker failed'])
+        self.assertEqual({record.process for record in collected.buffer}, {worker_pid})
+        self.assertIn('ValueError: boom', collected.buffer[1].exc_text)
+
+
+def _log_from_worker(name: str) -> int:
+    logger = logging.getLogger(name)
+    logger.info("Prepared %d records", 3)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Worker failed")
+    return os.getpid()
+
 
 class TestIntegration(unittest.TestCase):
     """AC6: Integration test with realistic data"""
@@ -513,6 +663,2072 @@ class TestFileHandling(unittest.TestCase):
             self.assertTrue(log_path.parent.exists())
 
 
+def create_koreader_db(db_path, books, page_stats):
+    """Create a minimal KOReader statistics.sqlite3 with the given rows"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE book (
+            id INTEGER PRIMARY KEY, title TEXT, authors TEXT, notes INTEGER,
+            last_open INTEGER, highlights INTEGER, pages INTEGER, series TEXT,
+            language TEXT, md5 TEXT, total_read_time INTEGER, total_read_pages INTEGER
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE page_stat_data (
+            id_book INTEGER, page INTEGER NOT NULL DEFAULT 0,
+            start_time INTEGER NOT NULL DEFAULT 0, duration INTEGER NOT NULL DEFAULT 0,
+            total_pages INTEGER NOT NULL DEFAULT 0,
+            UNIQUE (id_book, page, start_time)
+        )
+    ''')
+    conn.execute("CREATE INDEX page_stat_data_start_time ON page_stat_data(start_time)")
+    conn.executemany(
+        "INSERT INTO book (id, title, pages, language, md5) VALUES (?, ?, ?, ?, ?)",
+        books
+    )
+    conn.executemany(
+        "INSERT INTO page_stat_data (id_book, page, start_time, duration, total_pages) "
+        "VALUES (?, ?, ?, ?, ?)",
+        page_stats
+    )
+    conn.commit()
+    conn.close()
+
+
+def run_main(tmpdir, backup, argv, execute_values, book_ids, sync_cursor=None):
+    """Run the CLI on `backup` against a mocked Neon.tech; returns (exit code, connection)"""
+    conn = MagicMock()
+    conn.closed = 0
+    cursor = conn.cursor.return_value
+    cursor.fetchone.side_effect = lambda: (
+        (sync_cursor,) if 'FROM sync_status' in cursor.execute.call_args.args[0] else (True,)
+    )
+    conn.cursor.return_value.fetchall.return_value = list(book_ids.items())
+    conn.cursor.return_value.rowcount = 0
+    with patch.multiple(
+                Config, NEON_HOST='neon', NEON_USER='u', NEON_PASSWORD='p', NEON_DATABASE='db',
+                KOREADER_BACKUP=backup, PARQUET_PATH=None, PROMETHEUS_TEXTFILE=None,
+                FINGERPRINT_PATH=os.path.join(tmpdir, 'fingerprints.json'),
+                BOOK_ID_CACHE_PATH=os.path.join(tmpdir, 'book_ids.json'),
+                SESSION_KEYS_PATH=os.path.join(tmpdir, 'session_keys.bin'),
+                METRICS_PATH=os.path.join(tmpdir, 'metrics.json')), \
+            patch('extract_koreader_stats.setup_logging', return_value=MagicMock()), \
+            patch('extract_koreader_stats.psycopg2.connect', return_value=conn), \
+            patch('extract_koreader_stats.execute_values', side_effect=execute_values), \
+            patch('sys.argv', ['extract_koreader_stats.py', *argv]):
+        try:
+            main()
+        except SystemExit as e:
+            return e.code, conn
+    raise AssertionError("main() returned without exiting")
+
+
+class TestIncrementalSync(unittest.TestCase):
+    """Incremental extraction driven by sync_status cursors"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'statistics.sqlite3')
+        create_koreader_db(
+            self.db_path,
+            [(1, 'Book One', 300, 'en', 'md5-one')],
+            [
+                (1, 1, 1730000000, 60, 300),
+                (1, 2, 1730000060, 60, 300),
+                (1, 3, 1730000120, 60, 300),
+            ]
+        )
+        self.logger = MagicMock()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_extract_since_cursor_returns_only_newer_rows(self):
+        """Test: extract_page_stat_data(since=...) skips rows at or before the cursor"""
+        extractor = KOReaderExtractor(self.db_path, self.logger)
+        self.assertTrue(extractor.connect())
+        rows = extractor.extract_page_stat_data(since=1730000060)
+        extractor.disconnect()
+
+        self.assertEqual([row['start_time'] for row in rows], [1730000120])
+
+    def test_extract_without_cursor_returns_full_history(self):
+        """Test: Full extraction is unchanged when no cursor is stored"""
+        extractor = KOReaderExtractor(self.db_path, self.logger)
+        extractor.connect()
+        rows = extractor.extract_page_stat_data()
+        extractor.disconnect()
+
+        self.assertEqual(len(rows), 3)
+
+    def test_sync_source_name_is_per_device(self):
+        """Test: Each device keeps its own sync_status row"""
+        self.assertEqual(sync_source_name('boox-palma-2'), 'koreader:boox-palma-2')
+        self.assertNotEqual(sync_source_name('a'), sync_source_name('b'))
+
+    def test_get_sync_cursor_parses_stored_value(self):
+        """Test: Stored VARCHAR cursor is returned as an integer timestamp"""
+        loader = NeonLoader(self.logger)
+        loader.conn = MagicMock()
+        loader.cursor = MagicMock()
+        loader.cursor.fetchone.return_value = ('1730000060',)
+
+        self.assertEqual(loader.get_sync_cursor('koreader:test'), 1730000060)
+
+        loader.cursor.fetchone.return_value = None
+        self.assertIsNone(loader.get_sync_cursor('koreader:test'))
+
+    def test_failed_run_keeps_previous_cursor(self):
+        """Test: A None cursor is written so COALESCE keeps the stored cursor"""
+        loader = NeonLoader(self.logger)
+        loader.conn = MagicMock()
+        loader.cursor = MagicMock()
+
+        loader.update_sync_status('koreader:test', None, 10, 0, 1.4, 'failed', 'incremental')
+
+        sql, params = loader.cursor.execute.call_args[0]
+        self.assertIn('COALESCE(EXCLUDED.last_sync_cursor', sql)
+        self.assertIsNone(params[1])
+        self.assertEqual(params[5], 'failed')
+
+    def test_failed_session_load_exits_nonzero(self):
+        """Test: A run whose session batch fails exits 1, so systemd sees the failure"""
+        import psycopg2
+
+        def execute_values(cursor, sql, values, **kwargs):
+            if 'reading_sessions' in sql and fail_sessions:
+                raise psycopg2.IntegrityError('bad batch')
+            return [(True,)] * len(values)
+
+        for argv in ([], ['--pipeline'], ['--incremental', '--stream']):
+            for fail_sessions, expected in ((True, 1), (False, 0)):
+                with self.subTest(argv=argv, fail_sessions=fail_sessions), \
+                        tempfile.TemporaryDirectory() as tmpdir:
+                    code, _ = run_main(tmpdir, self.db_path, ['--force', *argv], execute_values,
+                                       {'md5-one': 1})
+                    self.assertEqual(code, expected)
+                    self.assertEqual(os.path.exists(os.path.join(tmpdir, 'fingerprints.json')),
+                                     not fail_sessions)
+
+    def test_unresolved_book_fails_run(self):
+        """Test: Sessions dropped for a book missing from Neon.tech fail the run and hold the cursor"""
+        def execute_values(cursor, sql, values, **kwargs):
+            return [(True,)] * len(values)
+
+        for argv in ([], ['--pipeline'], ['--incremental', '--stream']):
+            with self.subTest(argv=argv), tempfile.TemporaryDirectory() as tmpdir:
+                code, conn = run_main(tmpdir, self.db_path, ['--force', *argv], execute_values, {})
+                self.assertEqual(code, 1)
+                self.assertFalse(os.path.exists(os.path.join(tmpdir, 'fingerprints.json')))
+
+                status = [c.args[1] for c in conn.cursor.return_value.execute.call_args_list
+                          if 'INSERT INTO sync_status' in c.args[0]]
+                self.assertEqual(len(status), 1)
+                self.assertIsNone(status[0][1])
+                self.assertEqual(status[0][5], 'failed')
+                self.assertIn('1 session(s) of books missing', status[0][6])
+
+                # A dry run inserts no books, so it counts their sessions as new instead
+                code, conn = run_main(tmpdir, self.db_path, ['--force', '--dry-run', *argv], execute_values, {})
+                self.assertEqual(code, 0)
+
+    def test_dry_run_never_connects(self):
+        """Test: A dry run takes the cursor from its local copy and makes no Neon.tech connection"""
+        def execute_values(cursor, sql, values, **kwargs):
+            raise AssertionError("dry run sent rows")
+
+        for argv in ([], ['--pipeline'], ['--stream'], ['--incremental'], ['--incremental', '--pipeline']):
+            with self.subTest(argv=argv), tempfile.TemporaryDirectory() as tmpdir, \
+                    patch.object(KOReaderExtractor, 'extract_page_stat_data', autospec=True,
+                                 side_effect=KOReaderExtractor.extract_page_stat_data) as extract, \
+                    patch.object(KOReaderExtractor, 'iter_page_stat_data', autospec=True,
+                                 side_effect=KOReaderExtractor.iter_page_stat_data) as iterate:
+                self._store_local_cursor(tmpdir, 1730000060)
+                code, conn = run_main(tmpdir, self.db_path, ['--force', '--dry-run', *argv], execute_values, {})
+
+                self.assertEqual(code, 0)
+                self.assertFalse(conn.cursor.called)
+                if '--incremental' in argv:
+                    calls = extract.call_args_list + iterate.call_args_list
+                    self.assertEqual([c.kwargs['since'] for c in calls], [1730000060])
+
+
+    def _store_local_cursor(self, tmpdir, sync_cursor):
+        store = FingerprintStore(os.path.join(tmpdir, 'fingerprints.json'), self.logger)
+        store.record(Config.DEVICE_ID, {'size': 0, 'mtime_ns': 0, 'digest': 'old'}, sync_cursor)
+
+    def test_local_cursor_lets_extraction_start_first(self):
+        """Test: With a local cursor, page stats are extracted without waiting for sync_status"""
+        extracted = threading.Event()
+        calls = []
+
+        def track_extract(method):
+            def tracked(extractor, *args, **kwargs):
+                calls.append(('extract', kwargs.get('since')))
+                extracted.set()
+                return method(extractor, *args, **kwargs)
+            return tracked
+
+        def read_cursor(loader, source_name):
+            # Extraction must not be waiting on this read
+            calls.append(('sync_status', extracted.wait(2)))
+            return get_sync_cursor(loader, source_name)
+
+        get_sync_cursor = NeonLoader.get_sync_cursor
+        for argv in ([], ['--pipeline']):
+            with self.subTest(argv=argv), tempfile.TemporaryDirectory() as tmpdir, \
+                    patch.object(KOReaderExtractor, 'extract_page_stat_data',
+                                 track_extract(KOReaderExtractor.extract_page_stat_data)), \
+                    patch.object(KOReaderExtractor, 'iter_page_stat_data',
+                                 track_extract(KOReaderExtractor.iter_page_stat_data)), \
+                    patch.object(NeonLoader, 'get_sync_cursor', read_cursor):
+                calls.clear()
+                extracted.clear()
+                self._store_local_cursor(tmpdir, 1730000060)
+                code, _ = run_main(tmpdir, self.db_path, ['--incremental', *argv],
+                                   lambda cursor, sql, values, **kwargs: [(True,)] * len(values),
+                                   {'md5-one': 7}, sync_cursor=1730000060)
+
+                self.assertEqual(code, 0)
+                self.assertEqual(sorted(calls), [('extract', 1730000060), ('sync_status', True)])
+
+    def test_local_cursor_ahead_of_neon_fails_run(self):
+        """Test: A local cursor Neon.tech never stored loads nothing and is dropped"""
+        for argv in ([], ['--pipeline']):
+            with self.subTest(argv=argv), tempfile.TemporaryDirectory() as tmpdir:
+                self._store_local_cursor(tmpdir, 1730000120)
+                loaded = []
+                code, conn = run_main(tmpdir, self.db_path, ['--incremental', *argv],
+                                      lambda cursor, sql, values, **kwargs: loaded.append(sql) or [],
+                                      {'md5-one': 7}, sync_cursor=1730000000)
+
+                self.assertEqual(code, 1)
+                self.assertEqual(loaded, [])
+                store = FingerprintStore(os.path.join(tmpdir, 'fingerprints.json'), self.logger)
+                self.assertIsNone(store.sync_cursor(Config.DEVICE_ID))
+
+
+class TestSessionStitching(unittest.TestCase):
+    """Sessions in progress at the cursor are re-read and extended, not duplicated"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'statistics.sqlite3')
+        # Book 1: an old session, then a session running across the cursor (1730010120)
+        # Book 2: last read long before the cursor
+        create_koreader_db(
+            self.db_path,
+            [(1, 'Book One', 300, 'en', 'md5-one'), (2, 'Book Two', 200, 'en', 'md5-two')],
+            [
+                (1, 1, 1730000000, 60, 300),
+                (1, 2, 1730010000, 60, 300),
+                (1, 3, 1730010060, 60, 300),
+                (1, 4, 1730010120, 60, 300),
+                (1, 5, 1730010180, 60, 300),
+                (1, 6, 1730010240, 60, 300),
+                (2, 1, 1729990000, 60, 200),
+            ]
+        )
+        self.logger = MagicMock()
+        self.extractor = KOReaderExtractor(self.db_path, self.logger)
+        self.extractor.connect()
+
+    def tearDown(self):
+        self.extractor.disconnect()
+        self.tmpdir.cleanup()
+
+    def test_open_session_found_at_its_start(self):
+        """Test: Only books read within the gap of the cursor are re-read, from session start"""
+        self.assertEqual(self.extractor.find_open_sessions(1730010120, 30), {1: 1730010000})
+
+    def test_reread_session_keeps_start_time(self):
+        """Test: The continuing session is re-aggregated whole, with its original start_time"""
+        self.extractor.find_open_sessions(1730010120, 30)
+        sessions = SessionAggregator(30, self.logger).aggregate(
+            self.extractor.extract_page_stat_data(since=1730010120)
+        )
+
+        # Pages 2-6 of the session: five distinct pages
+        self.assertEqual(sessions, [Session(1, 1730010000, 1730010240, 300, 5)])
+
+    def test_all_engines_apply_the_window(self):
+        """Test: python, sqlite and streaming reads widen the cursor identically"""
+        self.extractor.find_open_sessions(1730010120, 30)
+        expected = SessionAggregator(30, self.logger).aggregate(
+            self.extractor.extract_page_stat_data(since=1730010120)
+        )
+        sqlite_sessions = SQLiteSessionAggregator(30, self.logger).aggregate(
+            self.extractor.extract_sessions(30, since=1730010120)
+        )
+        streamed = list(SessionAggregator(30, self.logger).iter_sessions(
+            self.extractor.iter_page_stat_data(since=1730010120)
+        ))
+
+        self.assertEqual(sqlite_sessions, expected)
+        self.assertEqual(streamed, expected)
+
+    def test_upsert_extends_existing_session(self):
+        """Test: Session loads use ON CONFLICT DO UPDATE and count extended rows"""
+        loader = NeonLoader(self.logger)
+        loader.conn = MagicMock()
+        loader.cursor = MagicMock()
+        session = ReadingSessionRecord(
+            1, datetime(2024, 10, 27, tzinfo=timezone.utc), 5, 6, 'boox', 'ebook', 'koreader',
+            'statistics.sqlite3', 'uuid', 1, False, datetime(2024, 10, 27, 0, 4, tzinfo=timezone.utc)
+        )
+
+        with patch('extract_koreader_stats.execute_values',
+                   return_value=[(False,), (True,)]) as ev:
+            inserted = loader.load_reading_sessions([session, session._replace(pages_read=7)])
+
+        sql = ev.call_args[0][1]
+        self.assertIn('DO UPDATE SET', sql)
+        self.assertIn('end_time = EXCLUDED.end_time', sql)
+        self.assertEqual(inserted, 1)
+        self.assertEqual(loader.sessions_extended, 1)
+        self.assertEqual(ev.call_args[0][2][0][-1], session.end_time)
+
+
+class TestRunMetrics(unittest.TestCase):
+    """Per-stage wall time, CPU time, row rate and peak RSS"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.logger = MagicMock()
+        self.metrics = RunMetrics('boox')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_stage_records_time_rows_and_rss(self):
+        """Test: A stage records wall/CPU seconds, rows, rows/s and peak RSS"""
+        with self.metrics.stage('aggregate') as stage:
+            sum(range(200000))
+            stage['rows'] = 1000
+
+        recorded = self.metrics.stages['aggregate']
+        self.assertGreater(recorded['wall_seconds'], 0)
+        self.assertGreaterEqual(recorded['cpu_seconds'], 0)
+        self.assertEqual(recorded['rows'], 1000)
+        self.assertAlmostEqual(recorded['rows_per_second'], 1000 / recorded['wall_seconds'])
+        self.assertGreater(recorded['peak_rss_bytes'], 1024 * 1024)
+
+    def test_json_and_prometheus_outputs(self):
+        """Test: The JSON file and textfile-collector file describe the same run"""
+        self.metrics.add('extract', 2.0, 1.5, 4000)
+        run = self.metrics.as_dict('success', {'sessions_inserted': 12})
+        json_path = os.path.join(self.tmpdir.name, 'metrics.json')
+        prom_path = os.path.join(self.tmpdir.name, 'collector', 'bookhelper_etl.prom')
+
+        with patch.object(Config, 'METRICS_PATH', json_path), \
+                patch.object(Config, 'PROMETHEUS_TEXTFILE', prom_path):
+            self.metrics.publish(run, self.logger)
+
+        stored = json.loads(Path(json_path).read_text())
+        self.assertEqual(stored['stages']['extract']['rows_per_second'], 2000.0)
+        self.assertEqual(stored['counts'], {'sessions_inserted': 12})
+        prom = Path(prom_path).read_text()
+        self.assertIn('# TYPE bookhelper_etl_stage_wall_seconds gauge', prom)
+        self.assertIn('bookhelper_etl_stage_rows{device="boox",stage="extract"} 4000', prom)
+        self.assertIn('bookhelper_etl_run_success{device="boox"} 1', prom)
+        self.assertEqual(os.listdir(os.path.dirname(prom_path)), ['bookhelper_etl.prom'])
+
+    def test_sync_status_stores_metrics_when_column_exists(self):
+        """Test: run_metrics and records_updated are written to sync_status"""
+        loader = NeonLoader(self.logger)
+        loader.conn = MagicMock()
+        loader.cursor = MagicMock()
+        run = self.metrics.as_dict('success')
+
+        loader.update_sync_status('koreader:boox', 1730000000, 5, 4, 1.0, 'success', 'incremental',
+                                  records_updated=1, run_metrics=run)
+        sql, params = loader.cursor.execute.call_args[0]
+        self.assertNotIn('run_metrics', sql)
+        self.assertIn('records_updated = EXCLUDED.records_updated', sql)
+        self.assertIn(1, params)
+
+        loader.has_run_metrics = True
+        loader.update_sync_status('koreader:boox', 1730000000, 5, 4, 1.0, 'success', 'incremental',
+                                  records_updated=1, run_metrics=run)
+        sql, params = loader.cursor.execute.call_args[0]
+        self.assertIn('run_metrics = EXCLUDED.run_metrics', sql)
+        self.assertEqual(json.loads(params[-1])['status'], 'success')
+        self.assertEqual(sql.count('%s'), len(params))
+
+
+class TestPipelinedStages(unittest.TestCase):
+    """--pipeline: stages on threads joined by bounded queues"""
+
+    def setUp(self):
+        self.stop = threading.Event()
+        self.errors = []
+        self.metrics = RunMetrics('boox')
+
+    def _stage(self, produce, output):
+        return _start_stage('test', produce, output, self.stop, self.errors, self.metrics)
+
+    def test_batches_flow_in_order(self):
+        """Test: A consumer drains every batch in order through a bounded queue"""
+        output = queue.Queue(maxsize=2)
+        thread = self._stage(lambda: ([n] for n in range(50)), output)
+
+        self.assertEqual([batch for batch in _drain(output)], [[n] for n in range(50)])
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(self.errors, [])
+        self.assertEqual(self.metrics.stages['test']['rows'], 50)
+
+    def test_failure_stops_pipeline(self):
+        """Test: A failing stage records its error, sets stop and still ends its queue"""
+        def produce():
+            yield [1]
+            raise ValueError('corrupt page')
+
+        output = queue.Queue(maxsize=2)
+        thread = self._stage(produce, output)
+
+        self.assertEqual(list(_drain(output)), [[1]])
+        thread.join(5)
+        self.assertTrue(self.stop.is_set())
+        self.assertEqual(self.errors, ['test stage failed: corrupt page'])
+
+    def test_stop_unblocks_full_queue(self):
+        """Test: A producer blocked on an unread queue exits once stop is set"""
+        closed = threading.Event()
+
+        def produce():
+            try:
+                while True:
+                    yield [0]
+            finally:
+                closed.set()
+
+        output = queue.Queue(maxsize=1)
+        thread = self._stage(produce, output)
+        self.stop.set()
+        thread.join(5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(closed.is_set())
+        self.assertIs(output.get_nowait(), _STAGE_DONE)
+
+    def test_neon_connects_during_extraction(self):
+        """Test: Neon.tech is connected while the backup is still being read"""
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        books_read = threading.Event()
+        extract_books = KOReaderExtractor.extract_books
+
+        def extract_books_and_signal(extractor):
+            books = extract_books(extractor)
+            books_read.set()
+            return books
+
+        def connect_when_books_read(**kwargs):
+            # Only succeeds if extraction runs concurrently with the connect
+            self.assertTrue(books_read.wait(5))
+            conn = MagicMock()
+            conn.cursor.return_value.fetchone.return_value = (True,)
+            conn.cursor.return_value.fetchall.return_value = []
+            return conn
+
+        logger = MagicMock()
+        with patch.object(Config, 'KOREADER_BACKUP', str(BUNDLED_STATISTICS_DB)), \
+                patch.object(Config, 'BOOK_ID_CACHE_PATH', os.path.join(tmpdir.name, 'book_ids.json')), \
+                patch.object(KOReaderExtractor, 'extract_books', extract_books_and_signal), \
+                patch('extract_koreader_stats.psycopg2.connect', side_effect=connect_when_books_read):
+            aggregator = SessionAggregator(30, logger)
+            ok = _run_pipelined(
+                logger, 0.0, 'koreader:test', 'full_refresh', False, True, 'insert',
+                aggregator, MagicMock(), None
+            )
+
+        self.assertTrue(ok)
+        self.assertGreater(aggregator.records_processed, 0)
+        self.assertGreater(aggregator.sessions_emitted, 0)
+
+
+class TestStreamingPipeline(unittest.TestCase):
+    """Streaming generator pipeline from SQLite cursor to Neon loader"""
+
+    def setUp(self):
+        self.logger = MagicMock()
+
+    def test_streamed_rows_match_batch_extraction(self):
+        """Test: iter_page_stat_data yields the same rows as extract_page_stat_data"""
+        extractor = KOReaderExtractor(str(BUNDLED_STATISTICS_DB), self.logger)
+        extractor.connect()
+        batch_rows = list(extractor.extract_page_stat_data())
+        streamed_rows = [PageStat(*row) for row in extractor.iter_page_stat_data(batch_size=97)]
+        extractor.disconnect()
+
+        self.assertEqual(streamed_rows, batch_rows)
+
+    def test_iter_sessions_matches_aggregate(self):
+        """Test: Streaming aggregation emits the same sessions and tracks counts"""
+        extractor = KOReaderExtractor(str(BUNDLED_STATISTICS_DB), self.logger)
+        extractor.connect()
+        rows = extractor.extract_page_stat_data()
+
+        batch = SessionAggregator(30, self.logger).aggregate(rows)
+        streaming = SessionAggregator(30, self.logger)
+        streamed = list(streaming.iter_sessions(extractor.iter_page_stat_data(batch_size=50)))
+        extractor.disconnect()
+
+        self.assertEqual(streamed, batch)
+        self.assertEqual(streaming.records_processed, len(rows))
+        self.assertEqual(streaming.sessions_emitted, len(batch))
+        self.assertEqual(streaming.high_water_mark, max(row['start_time'] for row in rows))
+
+    def test_sessions_closed_before_input_is_exhausted(self):
+        """Test: A session is yielded as soon as a book change closes it"""
+        consumed = []
+
+        def rows():
+            for row in [
+                {'id_book': 1, 'page': 1, 'start_time': 1000, 'duration': 60, 'total_pages': 100},
+                {'id_book': 2, 'page': 1, 'start_time': 2000, 'duration': 60, 'total_pages': 100},
+                {'id_book': 2, 'page': 2, 'start_time': 2060, 'duration': 60, 'total_pages': 100},
+            ]:
+                consumed.append(row)
+                yield row
+
+        sessions = SessionAggregator(30, self.logger).iter_sessions(rows())
+        first = next(sessions)
+
+        self.assertEqual(first['id_book'], 1)
+        self.assertEqual(len(consumed), 2)
+
+    def test_stream_loader_flushes_fixed_size_batches(self):
+        """Test: load_reading_sessions_stream commits one batch per batch_size rows"""
+        loader = NeonLoader(self.logger)
+        loader.conn = MagicMock()
+        loader.cursor = MagicMock()
+        session = {
+            'book_id': 1, 'start_time': datetime(2025, 10, 1, tzinfo=timezone.utc),
+            'duration_minutes': 5, 'pages_read': 3, 'device': 'test', 'media_type': 'ebook',
+            'data_source': 'koreader', 'device_stats_source': 'statistics.sqlite3',
+            'read_instance_id': 'uuid', 'read_number': 1, 'is_parallel_read': False,
+        }
+
+        with patch('extract_koreader_stats.execute_values',
+                   side_effect=lambda cur, sql, values, **kw: [(1,)] * len(values)) as ev:
+            inserted = loader.load_reading_sessions_stream(
+                (session for _ in range(25)), batch_size=10
+            )
+
+        self.assertEqual(inserted, 25)
+        self.assertEqual([len(c.args[2]) for c in ev.call_args_list], [10, 10, 5])
+        self.assertEqual(loader.conn.commit.call_count, 3)
+
+
+@unittest.skipUnless(numpy, "numpy not installed")
+class TestVectorizedAggregation(unittest.TestCase):
+    """NumPy-vectorized session aggregation engine"""
+
+    def setUp(self):
+        self.logger = MagicMock()
+
+    def test_matches_python_engine_on_bundled_statistics(self):
+        """Test: numpy engine yields identical sessions on resources/statistics.sqlite3"""
+        extractor = KOReaderExtractor(str(BUNDLED_STATISTICS_DB), self.logger)
+        extractor.connect()
+        rows = extractor.extract_page_stat_data()
+        columns = extractor.extract_page_stat_columns()
+        book_pages = book_page_counts(extractor.extract_books())
+        extractor.disconnect()
+
+        for gap in (0, 5, 30, 120):
+            expected = SessionAggregator(gap, self.logger).aggregate(rows, book_pages)
+            actual = VectorizedSessionAggregator(gap, self.logger).aggregate_columns(columns, book_pages)
+            self.assertEqual(actual, expected, f"gap={gap}")
+
+    def test_matches_python_engine_on_random_rows(self):
+        """Test: Parity holds for gaps exactly at the threshold and interleaved books"""
+        import random
+        rng = random.Random(42)
+        rows = []
+        for book in range(1, 6):
+            start = 1_700_000_000
+            for page in range(400):
+                start += rng.choice([30, 60, 1800, 1801, 7200])
+                rows.append({'id_book': book, 'page': rng.randint(0, 300),
+                             'start_time': start, 'duration': rng.randint(1, 120),
+                             'total_pages': rng.choice([0, 250, 300, 310])})
+        book_pages = {1: 300, 2: 280, 4: 600}
+
+        expected = SessionAggregator(30, self.logger).aggregate(rows, book_pages)
+        vectorized = VectorizedSessionAggregator(30, self.logger)
+        actual = vectorized.aggregate(rows, book_pages)
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(vectorized.records_processed, len(rows))
+        self.assertEqual(vectorized.high_water_mark, max(r['start_time'] for r in rows))
+        # Iterators have no len()
+        self.assertEqual(VectorizedSessionAggregator(30, self.logger).aggregate(iter(rows), book_pages), expected)
+
+    def test_columns_read_in_rowid_chunks(self):
+        """Test: Chunked group_concat reads return every row, sorted like extract_page_stat_data()"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = os.path.join(tmpdir, 'statistics.sqlite3')
+            generate_statistics_db(db_path, 5000, seed=5)
+            extractor = KOReaderExtractor(db_path, self.logger)
+            extractor.connect()
+            rows = extractor.extract_page_stat_data()
+            with patch.object(KOReaderExtractor, 'COLUMN_CHUNK_ROWS', 700):
+                columns = extractor.extract_page_stat_columns()
+            since = rows[len(rows) // 2]['start_time']
+            recent = extractor.extract_page_stat_columns(since=since)
+            extractor.disconnect()
+
+        self.assertEqual(sorted(zip(*(columns[name].tolist() for name in PageStat._fields))),
+                         sorted(map(tuple, rows)))
+        keys = list(zip(columns['id_book'].tolist(), columns['start_time'].tolist()))
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(keys, [(row['id_book'], row['start_time']) for row in rows])
+        self.assertTrue((recent['start_time'] > since).all())
+        self.assertEqual(len(recent['start_time']), sum(1 for row in rows if row['start_time'] > since))
+
+    def test_empty_input(self):
+        """Test: No rows produce no sessions"""
+        self.assertEqual(VectorizedSessionAggregator(30, self.logger).aggregate([]), [])
+
+    def test_engine_switch(self):
+        """Test: make_session_aggregator selects the engine by name"""
+        self.assertIsInstance(make_session_aggregator('python', 30, self.logger), SessionAggregator)
+        self.assertIsInstance(make_session_aggregator('numpy', 30, self.logger),
+                              VectorizedSessionAggregator)
+        with self.assertRaises(ValueError):
+            make_session_aggregator('fortran', 30, self.logger)
+
+
+class TestSQLiteAggregation(unittest.TestCase):
+    """Session aggregation pushed down into SQLite window functions"""
+
+    def setUp(self):
+        self.logger = MagicMock()
+
+    def test_matches_python_engine_on_bundled_statistics(self):
+        """Test: sqlite engine yields identical sessions and counters on resources/statistics.sqlite3"""
+        extractor = KOReaderExtractor(str(BUNDLED_STATISTICS_DB), self.logger)
+        extractor.connect()
+        book_pages = book_page_counts(extractor.extract_books())
+
+        for gap in (0, 5, 30, 120):
+            for since in (None, 1761000000):
+                python_engine = SessionAggregator(gap, self.logger)
+                sqlite_engine = SQLiteSessionAggregator(gap, self.logger)
+                expected = python_engine.aggregate(extractor.extract_page_stat_data(since=since), book_pages)
+                actual = sqlite_engine.aggregate(extractor.extract_sessions(gap, since=since))
+
+                self.assertEqual(actual, expected, f"gap={gap}, since={since}")
+                self.assertEqual(sqlite_engine.records_processed, python_engine.records_processed)
+                self.assertEqual(sqlite_engine.high_water_mark, python_engine.high_water_mark)
+        extractor.disconnect()
+
+    def test_gap_exactly_at_threshold_continues_session(self):
+        """Test: Gap comparison is in seconds, not truncated integer minutes"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = os.path.join(tmpdir, 'statistics.sqlite3')
+            create_koreader_db(
+                db_path,
+                [(1, 'Book One', 300, 'en', 'md5-one')],
+                [(1, 1, 1730000000, 60, 300), (1, 2, 1730001800, 60, 300),
+                 (1, 3, 1730003630, 60, 300)]
+            )
+            extractor = KOReaderExtractor(db_path, self.logger)
+            extractor.connect()
+            sessions = extractor.extract_sessions(30)
+            extractor.disconnect()
+
+        self.assertEqual([s['records'] for s in sessions], [2, 1])
+
+    def test_engine_switch(self):
+        """Test: make_session_aggregator('sqlite') selects the SQLite engine"""
+        self.assertIsInstance(make_session_aggregator('sqlite', 30, self.logger), SQLiteSessionAggregator)
+
+
+class TestPageRescaling(unittest.TestCase):
+    """pages_read as distinct pages rescaled to book.pages, like KOReader's page_stat view"""
+
+    def setUp(self):
+        self.logger = MagicMock()
+
+    def test_matches_koreader_page_stat_view(self):
+        """Test: pages_read equals COUNT(DISTINCT page) from the page_stat view of each session"""
+        extractor = KOReaderExtractor(str(BUNDLED_STATISTICS_DB), self.logger)
+        extractor.connect()
+        book_pages = book_page_counts(extractor.extract_books())
+        sessions = SessionAggregator(30, self.logger).aggregate(extractor.extract_page_stat_data(), book_pages)
+
+        for session in sessions:
+            if session.id_book not in book_pages:
+                continue
+            (expected,) = extractor.conn.execute(
+                "SELECT COUNT(DISTINCT page) FROM page_stat "
+                "WHERE id_book = ? AND start_time BETWEEN ? AND ?",
+                (session.id_book, session.session_start_time, session.session_end_time)
+            ).fetchone()
+            self.assertEqual(session.pages_read, expected, session)
+        extractor.disconnect()
+
+    def test_reflow_does_not_inflate_pages(self):
+        """Test: Re-reading the same text after a font change counts its pages once"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = os.path.join(tmpdir, 'statistics.sqlite3')
+            # Pages 10-12 of 300, then the same passage as pages 20-24 of 600
+            create_koreader_db(
+                db_path,
+                [(1, 'Book One', 300, 'en', 'md5-one')],
+                [(1, 10, 1730000000, 60, 300), (1, 11, 1730000060, 60, 300), (1, 12, 1730000120, 60, 300),
+                 (1, 20, 1730000180, 60, 600), (1, 21, 1730000240, 60, 600), (1, 22, 1730000300, 60, 600),
+                 (1, 23, 1730000360, 60, 600), (1, 24, 1730000420, 60, 600)]
+            )
+            extractor = KOReaderExtractor(db_path, self.logger)
+            extractor.connect()
+            book_pages = book_page_counts(extractor.extract_books())
+            rows = extractor.extract_page_stat_data()
+            extracted = extractor.extract_sessions(30)
+            extractor.disconnect()
+
+        engines = [
+            SessionAggregator(30, self.logger).aggregate(rows, book_pages),
+            SQLiteSessionAggregator(30, self.logger).aggregate(extracted),
+        ]
+        if numpy is not None:
+            engines.append(VectorizedSessionAggregator(30, self.logger).aggregate(rows, book_pages))
+
+        for sessions in engines:
+            self.assertEqual([session.pages_read for session in sessions], [3])
+
+    def test_smaller_layout_page_covers_several_pages(self):
+        """Test: One page of a coarser layout spans the pages it holds in book.pages"""
+        rows = [PageStat(1, 5, 1730000000, 60, 150)]
+
+        sessions = SessionAggregator(30, self.logger).aggregate(rows, {1: 300})
+        # Page 5 of 150 holds pages 9-10 of 300
+        self.assertEqual(sessions[0].pages_read, 2)
+        # Without book.pages, the row's own layout is used
+        self.assertEqual(SessionAggregator(30, self.logger).aggregate(rows)[0].pages_read, 1)
+
+    @unittest.skipUnless(numpy, "numpy not installed")
+    def test_engines_agree_on_generated_layout_changes(self):
+        """Test: python, numpy and sqlite engines agree on data with many layout changes"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = os.path.join(tmpdir, 'statistics.sqlite3')
+            generate_statistics_db(db_path, 30000, seed=11)
+            extractor = KOReaderExtractor(db_path, self.logger)
+            extractor.connect()
+            book_pages = book_page_counts(extractor.extract_books())
+            expected = SessionAggregator(30, self.logger).aggregate(extractor.extract_page_stat_data(), book_pages)
+            vectorized = VectorizedSessionAggregator(30, self.logger).aggregate_columns(
+                extractor.extract_page_stat_columns(), book_pages
+            )
+            pushed_down = SQLiteSessionAggregator(30, self.logger).aggregate(extractor.extract_sessions(30))
+            extractor.disconnect()
+
+        self.assertEqual(vectorized, expected)
+        self.assertEqual(pushed_down, expected)
+
+    @unittest.skipUnless(numpy, "numpy not installed")
+    def test_numpy_sorts_only_sessions_that_turn_back(self):
+        """Test: A session read front to back skips the page sort; one that turns back is sorted"""
+        forward = [PageStat(1, page, 1730000000 + 60 * page, 60, 300) for page in range(1, 6)]
+        backward = [PageStat(2, page, 1730000000 + 60 * i, 60, 300) for i, page in enumerate([8, 9, 3, 4, 9])]
+        aggregator = VectorizedSessionAggregator(30, self.logger)
+
+        with patch.object(numpy, 'argsort', wraps=numpy.argsort) as argsort:
+            sessions = aggregator.aggregate(forward, {1: 300})
+        self.assertEqual(sessions[0].pages_read, 5)
+        argsort.assert_not_called()
+
+        with patch.object(numpy, 'argsort', wraps=numpy.argsort) as argsort:
+            sessions = aggregator.aggregate(forward + backward, {1: 300, 2: 300})
+        self.assertEqual([session.pages_read for session in sessions], [5, 4])
+        self.assertEqual(len(argsort.call_args.args[0]), len(backward))
+
+
+class TestSyntheticStatistics(unittest.TestCase):
+    """generate_koreader_stats.py databases for scaling benchmarks"""
+
+    def setUp(self):
+        self.logger = MagicMock()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'statistics.sqlite3')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_exact_row_count_and_deterministic(self):
+        """Test: The generator writes exactly --rows page stats, identically for one seed"""
+        summary = generate_statistics_db(self.db_path, 20000, seed=7)
+        conn = sqlite3.connect(self.db_path)
+        first = conn.execute("SELECT * FROM page_stat_data ORDER BY id_book, start_time, page").fetchall()
+        conn.close()
+
+        other_path = os.path.join(self.tmpdir.name, 'again.sqlite3')
+        generate_statistics_db(other_path, 20000, seed=7)
+        conn = sqlite3.connect(other_path)
+        second = conn.execute("SELECT * FROM page_stat_data ORDER BY id_book, start_time, page").fetchall()
+        conn.close()
+
+        self.assertEqual(summary['rows'], 20000)
+        self.assertEqual(len(first), 20000)
+        self.assertEqual(first, second)
+
+    def test_realistic_history(self):
+        """Test: Rereads, layout changes (varying total_pages) and long gaps are present"""
+        summary = generate_statistics_db(self.db_path, 50000, books=20, seed=3)
+        conn = sqlite3.connect(self.db_path)
+        layouts = conn.execute(
+            "SELECT COUNT(*) FROM (SELECT id_book FROM page_stat_data "
+            "GROUP BY id_book HAVING COUNT(DISTINCT total_pages) > 1)"
+        ).fetchone()[0]
+        unopened = conn.execute(
+            "SELECT COUNT(*) FROM book WHERE id NOT IN (SELECT id_book FROM page_stat_data)"
+        ).fetchone()[0]
+        conn.close()
+
+        self.assertGreater(summary['rereads'], 0)
+        self.assertGreater(summary['long_gaps'], 0)
+        self.assertGreater(layouts, 0)
+        self.assertEqual(unopened, 0)
+        # Readers are added so the history stays years, not decades, long
+        self.assertLess(summary['days'], 10 * 366)
+
+    def test_extracts_and_aggregates(self):
+        """Test: Generated databases run through extraction, aggregation and transformation"""
+        generate_statistics_db(self.db_path, 10000, seed=1)
+        extractor = KOReaderExtractor(self.db_path, self.logger)
+        extractor.connect()
+        books = extractor.extract_books()
+        page_stats = extractor.extract_page_stat_data()
+        extracted = extractor.extract_sessions(30)
+        extractor.disconnect()
+
+        sessions = SessionAggregator(30, self.logger).aggregate(page_stats, book_page_counts(books))
+        records = DataTransformer('test-device', self.logger).transform_sessions(sessions, books)
+
+        self.assertEqual(len(page_stats), 10000)
+        self.assertEqual(SQLiteSessionAggregator(30, self.logger).aggregate(extracted), sessions)
+        self.assertEqual(len(records), len(sessions))
+        self.assertTrue(all(record.file_hash for record in records))
+
+
+class TestGapSweep(unittest.TestCase):
+    """sweep_session_gaps.py: every gap threshold in one pass"""
+
+    def test_matches_aggregator_at_each_gap(self):
+        """Test: Each threshold gets the sessions SessionAggregator builds at that gap"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = os.path.join(tmpdir, 'statistics.sqlite3')
+            generate_statistics_db(db_path, 30000, seed=5)
+            extractor = KOReaderExtractor(db_path, MagicMock())
+            extractor.connect()
+            book_pages = book_page_counts(extractor.extract_books())
+            page_stats = extractor.extract_page_stat_data()
+            extractor.disconnect()
+
+        gaps = [60, 1, 15, 30, 5]
+        sweep = GapSweep(gaps)
+        swept = sweep.run(page_stats.session_fields(), book_pages)
+
+        self.assertEqual(list(swept), sorted(gaps))
+        self.assertEqual(sweep.records_processed, 30000)
+        for gap in gaps:
+            sessions = SessionAggregator(gap, MagicMock()).aggregate(page_stats, book_pages)
+            self.assertEqual(swept[gap], [(s.duration_minutes, s.pages_read) for s in sessions], gap)
+        # Larger gaps only ever merge sessions
+        counts = [len(swept[gap]) for gap in sorted(gaps)]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+
+    def test_summary(self):
+        """Test: Counts, duration distribution and pages per minute per threshold"""
+        rows = [
+            (1, 0, 60, 1, 100),
+            (1, 60, 60, 2, 100),
+            (1, 600, 120, 3, 100),     # 9 minutes after the previous page
+            (2, 700, 600, 10, 50),     # different book
+        ]
+        swept = GapSweep([5, 10]).run(rows)
+
+        self.assertEqual(swept[5], [(120, 2), (120, 1), (600, 1)])
+        self.assertEqual(swept[10], [(240, 3), (600, 1)])
+        summary = summarize(swept[10])
+        self.assertEqual(summary['sessions'], 2)
+        self.assertEqual(summary['minutes_max'], 10.0)
+        self.assertEqual(summary['minutes_buckets']['0-5'], 1)
+        self.assertEqual(summary['minutes_buckets']['5-15'], 1)
+        self.assertEqual(summary['pages_per_minute'], round(4 / 14, 3))
+        self.assertEqual(GapSweep([5]).run([])[5], [])
+        with self.assertRaises(ValueError):
+            GapSweep([])
+
+
+class TestCompactRecords(unittest.TestCase):
+    """Slotted and array-backed record types for the ETL hot path"""
+
+    def test_page_stat_columns_round_trip(self):
+        """Test: Rows stored in array columns come back as PageStat records"""
+        columns = PageStatColumns()
+        columns.extend([(1, 10, 1000, 60, 300), (1, 11, 1060, 45, 300)])
+        columns.extend([(2, 1, 5000, 30, 120)])
+
+        self.assertEqual(len(columns), 3)
+        self.assertEqual(columns[2], PageStat(2, 1, 5000, 30, 120))
+        self.assertEqual(list(columns)[1]['start_time'], 1060)
+        self.assertEqual(columns.nbytes, 3 * 5 * 8)
+
+    def test_records_support_key_access(self):
+        """Test: Records accept record['field'] like the dicts they replace"""
+        session = Session(1, 1000, 1600, 1200, 20)
+
+        self.assertEqual(session['duration_minutes'], 1200)
+        self.assertEqual(session[0], 1)
+        with self.assertRaises(KeyError):
+            session['title']
+
+    def test_aggregation_same_for_columns_and_dicts(self):
+        """Test: SessionAggregator yields the same sessions from columns and dict rows"""
+        extractor = KOReaderExtractor(str(BUNDLED_STATISTICS_DB), MagicMock())
+        extractor.connect()
+        columns = extractor.extract_page_stat_data()
+        extractor.disconnect()
+        dict_rows = [row._asdict() for row in columns]
+
+        self.assertEqual(SessionAggregator(30, MagicMock()).aggregate(columns),
+                         SessionAggregator(30, MagicMock()).aggregate(dict_rows))
+
+    def test_session_record_values_in_column_order(self):
+        """Test: ReadingSessionRecord fields line up with NeonLoader.SESSION_COLUMNS"""
+        self.assertEqual(ReadingSessionRecord._fields, NeonLoader.SESSION_COLUMNS + ('file_hash',))
+        record = ReadingSessionRecord(
+            7, datetime(2025, 10, 1, tzinfo=timezone.utc), 5, 3, 'boox', 'ebook',
+            'koreader', 'statistics.sqlite3', 'uuid', 1, False
+        )
+        self.assertEqual(NeonLoader._session_values(record),
+                         NeonLoader._session_values(record._asdict()))
+
+
+class TestCopyLoader(unittest.TestCase):
+    """COPY-based bulk load path for books and reading_sessions"""
+
+    def setUp(self):
+        self.logger = MagicMock()
+        self.loader = NeonLoader(self.logger)
+        self.loader.conn = MagicMock()
+        self.loader.cursor = MagicMock()
+        self.copied = []
+        self.loader.cursor.copy_expert.side_effect = (
+            lambda sql, stream: self.copied.append(stream.read())
+        )
+
+    def _session(self, minute):
+        return {
+            'book_id': 7, 'start_time': datetime(2025, 10, 1, 12, minute, tzinfo=timezone.utc),
+            'duration_minutes': 5, 'pages_read': 3, 'device': 'boox', 'media_type': 'ebook',
+            'data_source': 'koreader', 'device_stats_source': 'statistics.sqlite3',
+            'read_instance_id': 'uuid', 'read_number': 1, 'is_parallel_read': False,
+        }
+
+    def test_copy_text_escaping(self):
+        """Test: NULLs, booleans and COPY special characters are encoded"""
+        self.assertEqual(_copy_text(None), '\\N')
+        self.assertEqual(_copy_text(True), 't')
+        self.assertEqual(_copy_text(False), 'f')
+        self.assertEqual(_copy_text('a\tb\nc\\d'), 'a\\tb\\nc\\\\d')
+        self.assertEqual(_copy_text(2.5), '2.5')
+
+    def test_copy_stream_serves_partial_reads(self):
+        """Test: Chunked reads reassemble into exactly one line per row"""
+        stream = _CopyStream((i, 'x') for i in range(100))
+        chunks = []
+        while True:
+            chunk = stream.read(7)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+        lines = ''.join(chunks).splitlines()
+        self.assertEqual(len(lines), 100)
+        self.assertEqual(lines[42], '42\tx')
+        self.assertEqual(stream.rows, 100)
+
+    def test_copy_sessions_reports_inserted_and_skipped(self):
+        """Test: Inserted and extended counts come from the merge, duplicates are the remainder"""
+        self.loader.cursor.fetchone.return_value = (2, 1)
+
+        inserted = self.loader.copy_reading_sessions(iter([self._session(m) for m in range(4)]))
+
+        self.assertEqual(inserted, 2)
+        self.assertEqual(self.loader.sessions_extended, 1)
+        self.assertEqual(len(self.copied[0].splitlines()), 4)
+        merge_sql = self.loader.cursor.execute.call_args_list[-1][0][0]
+        self.assertIn('FROM staging_reading_sessions', merge_sql)
+        self.assertIn('ON CONFLICT (book_id, start_time, device) DO UPDATE', merge_sql)
+        self.assertIn('(1 unchanged duplicates skipped)', self.logger.info.call_args[0][0])
+        self.loader.conn.commit.assert_called_once()
+
+    def test_copy_failure_rolls_back(self):
+        """Test: A failed COPY is rolled back and counted as a load error"""
+        import psycopg2
+        self.loader.cursor.copy_expert.side_effect = psycopg2.DataError('bad row')
+
+        self.assertEqual(self.loader.copy_reading_sessions([self._session(0)]), 0)
+        self.loader.conn.rollback.assert_called_once()
+        self.assertEqual(self.loader.load_errors, 1)
+
+    def test_copy_twice_in_one_transaction(self):
+        """Test: A second COPY in a run transaction reuses and empties the staging table"""
+        self.loader.cursor.fetchone.return_value = (1, 0)
+        self.loader.begin()
+
+        self.assertEqual(self.loader.copy_reading_sessions([self._session(0)]), 1)
+        self.assertEqual(self.loader.copy_reading_sessions([self._session(1)]), 1)
+
+        statements = [c[0][0] for c in self.loader.cursor.execute.call_args_list]
+        creates = [sql for sql in statements if sql.startswith('CREATE TEMP TABLE')]
+        self.assertEqual(len(creates), 2)
+        self.assertTrue(all('IF NOT EXISTS staging_reading_sessions ON COMMIT DROP' in sql for sql in creates))
+        self.assertEqual(statements.count('TRUNCATE staging_reading_sessions'), 2)
+        self.assertEqual(statements.count('SAVEPOINT etl_batch'), 2)
+        self.assertEqual(self.copied[1].split('\t')[1], '2025-10-01T12:01:00+00:00')
+        self.loader.conn.commit.assert_not_called()
+
+
+class TestLoadTransaction(unittest.TestCase):
+    """--load-method transaction: one transaction, savepoints per batch, prepared statements"""
+
+    def setUp(self):
+        self.logger = MagicMock()
+        self.loader = NeonLoader(self.logger)
+        self.loader.conn = MagicMock()
+        self.loader.conn.closed = 0
+        self.loader.cursor = MagicMock()
+        self.loader.cursor.fetchall.return_value = []
+        self.loader.cursor.fetchone.return_value = (2, 0)
+        self.statements = []
+        self.loader.cursor.execute.side_effect = lambda sql, *args: self.statements.append(sql.split(' ')[0])
+
+    def _sessions(self, count):
+        return [
+            ReadingSessionRecord(1, datetime(2025, 10, 1, hour, tzinfo=timezone.utc), 5, 3, 'boox', 'ebook',
+                                 'koreader', 'statistics.sqlite3', 'uuid', 1, False, None)
+            for hour in range(count)
+        ]
+
+    def test_run_commits_once_with_savepoint_per_batch(self):
+        """Test: Books and session batches share one commit; statements are prepared once"""
+        self.loader.begin()
+        self.loader.load_books_prepared([{column: None for column in NeonLoader.BOOK_COLUMNS}])
+        inserted = self.loader.load_reading_sessions_prepared(iter(self._sessions(4)), batch_size=2)
+        self.assertTrue(self.loader.finish())
+
+        self.assertEqual(inserted, 4)
+        self.assertEqual(self.statements.count('PREPARE'), 2)
+        self.assertEqual(self.statements.count('SAVEPOINT'), 3)
+        self.assertEqual(self.statements.count('RELEASE'), 3)
+        self.loader.conn.commit.assert_called_once()
+        # One array per column, whatever the batch size
+        execute_args = [c.args[1] for c in self.loader.cursor.execute.call_args_list
+                        if c.args[0].startswith('EXECUTE etl_upsert_sessions')]
+        self.assertEqual(len(execute_args[0]), len(NeonLoader.SESSION_COLUMNS))
+        self.assertEqual(execute_args[0][2], [5, 5])
+
+    def test_failed_batch_rolls_back_to_savepoint_then_whole_run(self):
+        """Test: A failed batch undoes only itself; finish(commit=False) discards the run"""
+        import psycopg2
+        self.loader.cursor.fetchone.side_effect = [(2, 1), psycopg2.IntegrityError('bad batch'), (2, 0)]
+
+        self.loader.begin()
+        self.assertEqual(self.loader.load_reading_sessions_prepared(self._sessions(6), batch_size=2), 4)
+        self.assertEqual(self.loader.load_errors, 1)
+        self.assertEqual(self.loader.sessions_extended, 1)
+        self.assertIn('ROLLBACK', self.statements)
+        self.loader.conn.rollback.assert_not_called()
+
+        self.assertFalse(self.loader.finish(commit=False))
+        self.loader.conn.rollback.assert_called_once()
+        self.loader.conn.commit.assert_not_called()
+        self.assertEqual(self.loader.sessions_extended, 0)
+
+    def test_dropped_connection_is_not_reconnected_mid_transaction(self):
+        """Test: Resending one batch cannot restore a lost transaction, so the load fails instead"""
+        import psycopg2
+        self.loader._connect_options = {'host': 'neon', 'user': 'u', 'password': 'p', 'database': 'db'}
+        self.loader.cursor.fetchone.side_effect = psycopg2.OperationalError('server closed the connection')
+
+        self.loader.begin()
+        with patch('extract_koreader_stats.psycopg2.connect') as connect:
+            self.assertEqual(self.loader.load_reading_sessions_prepared(self._sessions(2)), 0)
+
+        connect.assert_not_called()
+        self.assertEqual(self.loader.load_errors, 1)
+        self.assertEqual(self.loader.reconnects, 0)
+
+
+class TestDailyRollups(unittest.TestCase):
+    """reading_daily_rollups maintained for the days each session batch touches"""
+
+    def setUp(self):
+        self.logger = MagicMock()
+        self.loader = NeonLoader(self.logger)
+        self.loader.conn = MagicMock()
+        self.loader.cursor = MagicMock()
+        self.loader.cursor.rowcount = 2
+        self.loader.has_daily_rollups = True
+        # Record whether the rollup ran before the transaction committed
+        self.events = []
+        self.loader.cursor.execute.side_effect = lambda sql, *args: self.events.append(
+            ('rollup', args[0][0]) if sql == NeonLoader.DAILY_ROLLUPS_SQL else ('execute', None)
+        )
+        self.loader.conn.commit.side_effect = lambda: self.events.append(('commit', None))
+
+    def _session(self, day, hour):
+        return ReadingSessionRecord(
+            1, datetime(2025, 10, day, hour, tzinfo=timezone.utc), 5, 6, 'boox', 'ebook', 'koreader',
+            'statistics.sqlite3', 'uuid', 1, False, None
+        )
+
+    def test_touched_days_rolled_up_before_commit(self):
+        """Test: One rollup statement with the batch's distinct start_times, in the load transaction"""
+        sessions = [self._session(1, 9), self._session(1, 9), self._session(2, 21)]
+        with patch('extract_koreader_stats.execute_values', return_value=[(True,)] * 3):
+            self.loader.load_reading_sessions(sessions)
+
+        self.assertEqual([event for event, _ in self.events], ['rollup', 'commit'])
+        self.assertEqual(sorted(self.events[0][1]), [sessions[0].start_time, sessions[2].start_time])
+        self.assertEqual(self.loader.rollup_rows, 2)
+
+    def test_rollup_sql_recomputes_whole_days(self):
+        """Test: Rollups are recomputed from reading_sessions and upserted per day"""
+        sql = NeonLoader.DAILY_ROLLUPS_SQL
+        self.assertIn('FROM unnest(%s::timestamptz[])', sql)
+        self.assertIn('JOIN reading_sessions rs', sql)
+        self.assertIn('ON CONFLICT (day, book_id, device, media_type) DO UPDATE', sql)
+
+    def test_streamed_batches_each_roll_up(self):
+        """Test: Every streamed batch re-rolls its own days before its commit"""
+        sessions = [self._session(day, 12) for day in range(1, 6)]
+        with patch('extract_koreader_stats.execute_values',
+                   side_effect=lambda cur, sql, values, **kw: [(True,)] * len(values)):
+            self.loader.load_reading_sessions_stream(iter(sessions), batch_size=2)
+
+        self.assertEqual([event for event, _ in self.events],
+                         ['rollup', 'commit', 'rollup', 'commit', 'rollup', 'commit'])
+
+    def test_copy_path_rolls_up_after_merge(self):
+        """Test: COPY loads roll up the streamed rows' days before committing"""
+        self.loader.cursor.copy_expert.side_effect = lambda sql, stream: stream.read()
+        self.loader.cursor.fetchone.return_value = (2, 0)
+
+        self.loader.copy_reading_sessions(iter([self._session(3, 8), self._session(4, 8)]))
+
+        self.assertEqual([event for event, _ in self.events][-2:], ['rollup', 'commit'])
+        self.assertEqual(len(self.events[-2][1]), 2)
+
+    def test_skipped_without_table(self):
+        """Test: Databases without reading_daily_rollups load sessions as before"""
+        self.loader.has_daily_rollups = False
+        with patch('extract_koreader_stats.execute_values', return_value=[(True,)]):
+            self.loader.load_reading_sessions([self._session(1, 9)])
+
+        self.assertEqual([event for event, _ in self.events], ['commit'])
+
+    def test_schema_declares_rollup_table(self):
+        """Test: create_schema.sql creates and backfills reading_daily_rollups"""
+        schema = (Path(__file__).parent.parent / 'resources' / 'scripts' / 'create_schema.sql').read_text()
+        self.assertIn('CREATE TABLE IF NOT EXISTS reading_daily_rollups', schema)
+        self.assertIn('PRIMARY KEY (day, book_id, device, media_type)', schema)
+        self.assertIn('INSERT INTO reading_daily_rollups', schema)
+        # The backfill upserts exactly like the loader, so re-running it repairs stale days
+        upsert = NeonLoader.DAILY_ROLLUPS_SQL[NeonLoader.DAILY_ROLLUPS_SQL.index('ON CONFLICT'):]
+        self.assertIn(' '.join(upsert.split()), ' '.join(schema.split()))
+
+
+class TestNeonConnection(unittest.TestCase):
+    """Connection retries with backoff, keepalives and reconnecting mid-load"""
+
+    def setUp(self):
+        self.logger = MagicMock()
+        self.loader = NeonLoader(self.logger)
+
+    def _conn(self):
+        conn = MagicMock()
+        conn.closed = 0
+        return conn
+
+    def test_connect_retries_with_backoff(self):
+        """Test: Failed attempts while the compute wakes are retried after jittered sleeps"""
+        import psycopg2
+        conn = self._conn()
+        with patch('extract_koreader_stats.psycopg2.connect',
+                   side_effect=[psycopg2.OperationalError('waking'), psycopg2.OperationalError('waking'), conn]) \
+                as connect, patch('extract_koreader_stats.time.sleep') as sleep:
+            self.assertTrue(self.loader.connect('neon', 'u', 'p', 'db'))
+
+        self.assertIs(self.loader.conn, conn)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(connect.call_args.kwargs['keepalives'], 1)
+        self.assertEqual(connect.call_args.kwargs['host'], 'neon')
+
+    def test_connect_gives_up_after_retries(self):
+        """Test: ETL_CONNECT_RETRIES failures after the first attempt fail the connect"""
+        import psycopg2
+        with patch.object(Config, 'CONNECT_RETRIES', 2), \
+                patch('extract_koreader_stats.psycopg2.connect', side_effect=psycopg2.OperationalError('down')) \
+                as connect, patch('extract_koreader_stats.time.sleep'):
+            self.assertFalse(self.loader.connect('neon', 'u', 'p', 'db'))
+
+        self.assertEqual(connect.call_count, 3)
+        self.logger.error.assert_called_once()
+
+    def test_backoff_is_jittered_and_capped(self):
+        """Test: Delays stay within [0, base * 2**attempt] and never exceed the cap"""
+        for attempt in range(12):
+            delay = backoff_delay(attempt, base=1.0)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(30.0, 2 ** attempt))
+
+    def test_stream_load_resumes_after_dropped_connection(self):
+        """Test: Only the interrupted batch is re-sent, on a new connection"""
+        import psycopg2
+        first, second = self._conn(), self._conn()
+        sent = []
+
+        def execute_values(cursor, sql, values, **kwargs):
+            if len(sent) == 1 and cursor is first.cursor.return_value:
+                first.closed = 2
+                raise psycopg2.OperationalError('server closed the connection unexpectedly')
+            sent.append(values)
+            return [(True,)] * len(values)
+
+        sessions = [
+            ReadingSessionRecord(1, datetime(2025, 10, 1, hour, tzinfo=timezone.utc), 5, 3, 'boox', 'ebook',
+                                 'koreader', 'statistics.sqlite3', 'uuid', 1, False, None)
+            for hour in range(6)
+        ]
+        with patch('extract_koreader_stats.psycopg2.connect', side_effect=[first, second]), \
+                patch('extract_koreader_stats.execute_values', side_effect=execute_values):
+            self.loader.connect('neon', 'u', 'p', 'db')
+            inserted = self.loader.load_reading_sessions_stream(iter(sessions), batch_size=2)
+
+        self.assertEqual(inserted, 6)
+        self.assertEqual([len(batch) for batch in sent], [2, 2, 2])
+        self.assertEqual(self.loader.reconnects, 1)
+        self.assertEqual(self.loader.load_errors, 0)
+        self.assertEqual(first.commit.call_count, 1)
+        self.assertEqual(second.commit.call_count, 2)
+
+    def test_attached_connection_is_not_reopened(self):
+        """Test: A pooled connection that drops fails the batch instead of reconnecting"""
+        import psycopg2
+        conn = self._conn()
+        self.loader.attach(conn)
+
+        def execute_values(*args, **kwargs):
+            conn.closed = 2
+            raise psycopg2.OperationalError('gone')
+
+        with patch('extract_koreader_stats.execute_values', side_effect=execute_values), \
+                patch('extract_koreader_stats.psycopg2.connect') as connect:
+            self.assertEqual(self.loader.load_reading_sessions([{
+                'book_id': 1, 'start_time': datetime(2025, 10, 1, tzinfo=timezone.utc),
+                'duration_minutes': 5, 'pages_read': 3, 'device': 'boox', 'media_type': 'ebook',
+                'data_source': 'koreader', 'device_stats_source': 'statistics.sqlite3',
+                'read_instance_id': 'uuid', 'read_number': 1, 'is_parallel_read': False,
+            }]), 0)
+
+        connect.assert_not_called()
+        self.assertEqual(self.loader.load_errors, 1)
+
+
+class TestWatchMode(unittest.TestCase):
+    """--watch: debounced backup watching and a connection kept across runs"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.backup = os.path.join(self.tmpdir.name, 'statistics.sqlite3')
+        Path(self.backup).write_bytes(b'v1')
+        self.logger = MagicMock()
+        self.stop = threading.Event()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write_later(self, name, delay=0.1, repeat=1):
+        def write():
+            for _ in range(repeat):
+                time.sleep(delay)
+                tmp_path = os.path.join(self.tmpdir.name, f".syncthing.{name}.tmp")
+                Path(tmp_path).write_bytes(os.urandom(16))
+                os.replace(tmp_path, os.path.join(self.tmpdir.name, name))
+        thread = threading.Thread(target=write)
+        thread.start()
+        self.addCleanup(thread.join)
+
+    def _assert_debounced(self, watcher):
+        self._write_later('statistics.sqlite3', repeat=3)
+        started = time.monotonic()
+        self.assertTrue(watcher.wait(self.stop, timeout=10))
+        # Three writes 0.1s apart, then a quiet debounce period
+        self.assertGreaterEqual(time.monotonic() - started, 0.3 + watcher.debounce_seconds)
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_backup_write_triggers_one_debounced_run(self):
+        """Test: A burst of writes (via Syncthing-style renames) settles into one wake-up"""
+        watcher = BackupWatcher(self.backup, self.logger, debounce_seconds=0.3)
+        self.addCleanup(watcher.close)
+        self._assert_debounced(watcher)
+
+    def test_polling_fallback(self):
+        """Test: Without inotify the backup's size and mtime are polled instead"""
+        watcher = BackupWatcher(self.backup, self.logger, debounce_seconds=0.3)
+        watcher.close()
+        self._assert_debounced(watcher)
+
+    def test_unrelated_files_and_stop(self):
+        """Test: Other files in the directory are ignored; stop ends the wait"""
+        watcher = BackupWatcher(self.backup, self.logger, debounce_seconds=0.2)
+        self.addCleanup(watcher.close)
+        self._write_later('other.sqlite3')
+        started = time.monotonic()
+        self.assertTrue(watcher.wait(self.stop, timeout=1.5))
+        self.assertGreaterEqual(time.monotonic() - started, 1.5)
+
+        threading.Timer(0.2, self.stop.set).start()
+        self.assertFalse(watcher.wait(self.stop))
+
+    def test_connection_kept_across_runs(self):
+        """Test: Every run reuses one loader; a failed ping replaces the connection"""
+        loaders = []
+        stop_after = 3
+
+        def fake_run_etl(**kwargs):
+            self.assertTrue(kwargs['incremental'])
+            loaders.append(kwargs['loader'])
+            kwargs['loader'].conn = MagicMock()
+            kwargs['loader'].cursor = MagicMock()
+            return True
+
+        def fake_wait(watcher, stop, timeout=None):
+            return len(loaders) < stop_after
+
+        etl_logger = logging.getLogger('etl_koreader')
+        handlers = list(etl_logger.handlers)
+        self.addCleanup(lambda: [etl_logger.removeHandler(handler) for handler in etl_logger.handlers
+                                 if handler not in handlers])
+
+        with patch.object(Config, 'KOREADER_BACKUP', self.backup), \
+                patch.object(Config, 'ETL_LOG_PATH', os.path.join(self.tmpdir.name, 'etl.log')), \
+                patch.object(Config, 'NEON_HOST', 'h'), patch.object(Config, 'NEON_USER', 'u'), \
+                patch.object(Config, 'NEON_PASSWORD', 'p'), patch.object(Config, 'NEON_DATABASE', 'd'), \
+                patch('extract_koreader_stats.run_etl', side_effect=fake_run_etl), \
+                patch.object(BackupWatcher, 'wait', fake_wait), \
+                patch.object(NeonLoader, 'ping', side_effect=[True, False]) as ping:
+            self.assertTrue(run_watch())
+
+        self.assertEqual(len(loaders), stop_after)
+        self.assertEqual(len(set(map(id, loaders))), 1)
+        self.assertEqual(ping.call_count, 2)
+
+    def test_aborted_run_keeps_connection(self):
+        """Test: A run that aborts before loading leaves the kept connection open"""
+        loader = NeonLoader(MagicMock())
+        loader.conn = conn = MagicMock()
+        loader.cursor = MagicMock()
+        empty = os.path.join(self.tmpdir.name, 'empty.sqlite3')
+        create_koreader_db(empty, books=[], page_stats=[])
+        for backup in (os.path.join(self.tmpdir.name, 'missing.sqlite3'), empty):
+            with self.subTest(backup=os.path.basename(backup)), \
+                    patch.multiple(Config, KOREADER_BACKUP=backup, NEON_HOST='h', NEON_USER='u',
+                                   NEON_PASSWORD='p', NEON_DATABASE='d',
+                                   FINGERPRINT_PATH=os.path.join(self.tmpdir.name, 'fingerprints.json')), \
+                    patch('extract_koreader_stats.setup_logging', return_value=MagicMock()) as logger:
+                self.assertFalse(run_etl(force=True, loader=loader))
+                self.assertTrue(logger.return_value.error.called)
+                self.assertIs(loader.conn, conn)
+                conn.close.assert_not_called()
+
+
+class TestSnapshotExtraction(unittest.TestCase):
+    """Read-only snapshot of statistics.sqlite3 before extraction"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'statistics.sqlite3')
+        create_koreader_db(
+            self.db_path,
+            [(1, 'Book One', 300, 'en', 'md5-one')],
+            [(1, 1, 1730000000, 60, 300), (1, 2, 1730000060, 60, 300)]
+        )
+        self.logger = MagicMock()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _append_page_turn(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            "INSERT INTO page_stat_data VALUES (1, 3, (SELECT MAX(start_time) + 60 FROM page_stat_data), 60, 300)"
+        )
+        conn.commit()
+        conn.close()
+
+    def test_snapshot_ignores_writes_after_connect(self):
+        """Test: A sync landing mid-run does not change what is extracted"""
+        for mode in ('memory', 'file'):
+            with self.subTest(mode=mode):
+                extractor = KOReaderExtractor(self.db_path, self.logger, snapshot=mode)
+                self.assertTrue(extractor.connect())
+                before = len(extractor.extract_page_stat_data())
+                self._append_page_turn()
+                after = len(extractor.extract_page_stat_data())
+                extractor.disconnect()
+
+                self.assertEqual(before, after)
+
+    def test_file_snapshot_removed_on_disconnect(self):
+        """Test: The scratch snapshot file is deleted after extraction"""
+        extractor = KOReaderExtractor(self.db_path, self.logger, snapshot='file')
+        extractor.connect()
+        snapshot_path = extractor.snapshot_path
+        self.assertTrue(Path(snapshot_path).exists())
+
+        extractor.disconnect()
+        self.assertFalse(Path(snapshot_path).exists())
+
+    def test_live_read_only_connection(self):
+        """Test: snapshot='none' reads the file in place and refuses writes"""
+        extractor = KOReaderExtractor(self.db_path, self.logger, snapshot='none')
+        self.assertTrue(extractor.connect())
+        with self.assertRaises(sqlite3.OperationalError):
+            extractor.conn.execute("DELETE FROM page_stat_data")
+        extractor.disconnect()
+
+    def test_missing_backup_is_not_created(self):
+        """Test: Connecting to a missing backup fails without creating an empty file"""
+        missing = os.path.join(self.tmpdir.name, 'missing.sqlite3')
+        extractor = KOReaderExtractor(missing, self.logger)
+
+        self.assertFalse(extractor.connect())
+        self.assertFalse(Path(missing).exists())
+
+    def test_nothing_written_beside_wal_backup(self):
+        """Test: Reading a WAL-mode backup leaves no -wal or -shm files in the synced folder"""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.close()
+        before = sorted(os.listdir(self.tmpdir.name))
+
+        for mode in SNAPSHOT_MODES:
+            with self.subTest(mode=mode):
+                extractor = KOReaderExtractor(self.db_path, self.logger, snapshot=mode)
+                self.assertTrue(extractor.connect())
+                self.assertEqual(len(extractor.extract_page_stat_data()), 2)
+                self.assertEqual(sorted(os.listdir(self.tmpdir.name)), before)
+                extractor.disconnect()
+        self.assertIsNotNone(backup_fingerprint(self.db_path))
+        self.assertEqual(sorted(os.listdir(self.tmpdir.name)), before)
+
+    def test_default_snapshot_is_file(self):
+        """Test: Without ETL_SNAPSHOT the backup is copied to a scratch file, not into RAM"""
+        self.assertEqual(KOReaderExtractor(self.db_path, self.logger).snapshot, 'file')
+
+    def test_unknown_snapshot_mode_rejected(self):
+        """Test: An invalid ETL_SNAPSHOT value fails the connect"""
+        self.assertFalse(KOReaderExtractor(self.db_path, self.logger, snapshot='disk').connect())
+
+
+class TestBackupFingerprint(unittest.TestCase):
+    """Skip-if-unchanged fingerprint cache for the KOReader backup"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'statistics.sqlite3')
+        self.store_path = os.path.join(self.tmpdir.name, 'state', 'fingerprints.json')
+        create_koreader_db(
+            self.db_path,
+            [(1, 'Book One', 300, 'en', 'md5-one')],
+            [(1, 1, 1730000000, 60, 300)]
+        )
+        self.logger = MagicMock()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_recorded_fingerprint_round_trips(self):
+        """Test: A recorded fingerprint is persisted and matches the same backup"""
+        FingerprintStore(self.store_path, self.logger).record('boox', backup_fingerprint(self.db_path))
+
+        store = FingerprintStore(self.store_path, self.logger)
+        self.assertTrue(store.is_unchanged('boox', backup_fingerprint(self.db_path)))
+        self.assertFalse(store.is_unchanged('kobo', backup_fingerprint(self.db_path)))
+
+    def test_new_page_turn_changes_fingerprint(self):
+        """Test: New page_stat_data rows are detected"""
+        store = FingerprintStore(self.store_path, self.logger)
+        store.record('boox', backup_fingerprint(self.db_path))
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO page_stat_data VALUES (1, 2, 1730000060, 60, 300)")
+        conn.commit()
+        conn.close()
+
+        self.assertFalse(store.is_unchanged('boox', backup_fingerprint(self.db_path)))
+
+    def test_book_table_change_changes_fingerprint(self):
+        """Test: An edit to the book table alone (new highlights) triggers a run despite the same page turns"""
+        store = FingerprintStore(self.store_path, self.logger)
+        store.record('boox', backup_fingerprint(self.db_path))
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE book SET highlights = 3 WHERE id = 1")
+        conn.commit()
+        conn.close()
+
+        self.assertFalse(store.is_unchanged('boox', backup_fingerprint(self.db_path)))
+
+    def test_duration_edited_in_place_changes_fingerprint(self):
+        """Test: A page turn whose duration is rewritten in place is detected despite the same high-water mark"""
+        store = FingerprintStore(self.store_path, self.logger)
+        store.record('boox', backup_fingerprint(self.db_path))
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE page_stat_data SET duration = 90 WHERE id_book = 1 AND page = 1")
+        conn.commit()
+        conn.close()
+
+        self.assertFalse(store.is_unchanged('boox', backup_fingerprint(self.db_path)))
+
+    def test_touched_file_with_same_content_is_unchanged(self):
+        """Test: A new mtime alone (Syncthing re-write) does not trigger a run"""
+        store = FingerprintStore(self.store_path, self.logger)
+        store.record('boox', backup_fingerprint(self.db_path))
+        os.utime(self.db_path, (1, 1))
+
+        self.assertTrue(store.is_unchanged('boox', backup_fingerprint(self.db_path)))
+
+    def test_unreadable_backup_never_unchanged(self):
+        """Test: Missing backups and corrupt stores fall back to a full run"""
+        self.assertIsNone(backup_fingerprint(os.path.join(self.tmpdir.name, 'missing.sqlite3')))
+
+        Path(self.store_path).parent.mkdir(parents=True)
+        Path(self.store_path).write_text('not json')
+        store = FingerprintStore(self.store_path, self.logger)
+        self.assertFalse(store.is_unchanged('boox', backup_fingerprint(self.db_path)))
+        self.logger.warning.assert_called_once()
+
+
+class TestBookIdResolver(unittest.TestCase):
+    """file_hash -> Neon.tech book_id resolution with a persistent local cache"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmpdir.name, 'etl', 'book_ids.json')
+        self.logger = MagicMock()
+        self.loader = MagicMock()
+        self.loader.fetch_book_ids.side_effect = lambda hashes: {
+            file_hash: index + 100 for index, file_hash in enumerate(hashes)
+        }
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _session(self, file_hash):
+        return ReadingSessionRecord(
+            None, datetime(2025, 10, 1, tzinfo=timezone.utc), 5, 3, 'boox', 'ebook', 'koreader',
+            'statistics.sqlite3', 'uuid', 1, False, None, file_hash
+        )
+
+    def test_only_unseen_hashes_are_fetched(self):
+        """Test: One query for uncached hashes; cached hashes never hit Neon.tech"""
+        resolver = BookIdResolver(self.cache_path, 'neon/bookhelper', self.logger)
+        resolver.resolve(self.loader, ['md5-a', 'md5-b'])
+        resolver.resolve(self.loader, ['md5-a', 'md5-b', 'md5-c'])
+
+        self.assertEqual([c.args[0] for c in self.loader.fetch_book_ids.call_args_list],
+                         [['md5-a', 'md5-b'], ['md5-c']])
+
+    def test_cache_persists_across_runs(self):
+        """Test: A later run against the same database resolves from the file"""
+        BookIdResolver(self.cache_path, 'neon/bookhelper', self.logger).resolve(self.loader, ['md5-a'])
+
+        resolver = BookIdResolver(self.cache_path, 'neon/bookhelper', self.logger)
+        resolver.resolve(self.loader, ['md5-a'])
+
+        self.assertEqual(resolver.book_ids, {'md5-a': 100})
+        self.loader.fetch_book_ids.assert_called_once()
+
+    def test_cache_invalidation(self):
+        """Test: Another database or a foreign key violation drops cached ids"""
+        BookIdResolver(self.cache_path, 'neon/bookhelper', self.logger).resolve(self.loader, ['md5-a'])
+        self.assertEqual(BookIdResolver(self.cache_path, 'neon/other', self.logger).book_ids, {})
+
+        resolver = BookIdResolver(self.cache_path, 'neon/bookhelper', self.logger)
+        resolver.invalidate()
+        self.assertEqual(BookIdResolver(self.cache_path, 'neon/bookhelper', self.logger).book_ids, {})
+
+    def test_bind_skips_unresolved_books(self):
+        """Test: Sessions get book_id from the cache; unknown books are skipped once-warned"""
+        resolver = BookIdResolver(self.cache_path, 'neon/bookhelper', self.logger)
+        resolver.book_ids = {'md5-a': 7}
+        sessions = [self._session('md5-a'), self._session('md5-x'), self._session('md5-x')]
+
+        bound = list(resolver.bind(sessions, 'boox'))
+
+        self.assertEqual([session.book_id for session in bound], [7])
+        self.logger.warning.assert_called_once()
+        self.assertEqual(resolver.unresolved('boox'), 2)
+        self.assertEqual(resolver.unresolved('kindle'), 0)
+
+    def test_dry_run_bind_keeps_unresolved_books(self):
+        """Test: A dry run keeps sessions of books not yet in Neon.tech, so they count as new"""
+        resolver = BookIdResolver(self.cache_path, 'neon/bookhelper', self.logger, read_only=True)
+        resolver.book_ids = {'md5-a': 7}
+        sessions = [self._session('md5-a'), self._session('md5-x')]
+        keys = SessionKeySet(os.path.join(self.tmpdir.name, 'keys.bin'), 'neon/bookhelper', self.logger,
+                             read_only=True)
+
+        bound = list(keys.filter('boox', resolver.bind(sessions, 'boox', keep_unresolved=True)))
+
+        self.assertEqual([session.book_id for session in bound], [7, None])
+        self.assertEqual(keys.counts['boox']['new'], 2)
+        self.logger.warning.assert_not_called()
+
+    def test_transform_carries_file_hash(self):
+        """Test: Transformed sessions reference the KOReader MD5, not the local book id"""
+        transformer = DataTransformer('boox', self.logger)
+        sessions = transformer.transform_sessions(
+            [Session(3, 1730000000, 1730000600, 10, 4)], [{'id': 3, 'md5': 'md5-a'}]
+        )
+
+        self.assertEqual(len(sessions), 1)
+        self.assertIsNone(sessions[0].book_id)
+        self.assertEqual(sessions[0].file_hash, 'md5-a')
+        self.assertEqual(NeonLoader._session_values(sessions[0])[-1], sessions[0].end_time)
+
+
+class TestSessionKeySet(unittest.TestCase):
+    """Local set of sessions already in Neon.tech, used to skip unchanged rows"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'etl', 'session_keys.bin')
+        self.logger = MagicMock()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _session(self, book_id, minute, duration=5, pages=3):
+        start = datetime(2025, 10, 1, 8, minute, tzinfo=timezone.utc)
+        return ReadingSessionRecord(
+            book_id, start, duration, pages, 'boox', 'ebook', 'koreader', 'statistics.sqlite3',
+            'uuid', 1, False, start.replace(minute=minute + duration), 'md5'
+        )
+
+    def _loader(self, rows):
+        """Mock loader whose Neon.tech reading_sessions for the device are `rows`"""
+        loader = MagicMock()
+        loader._with_reconnect.side_effect = lambda operation, *args: operation(*args)
+        named = loader.conn.cursor.return_value.__enter__.return_value
+        named.__iter__.side_effect = lambda: iter([
+            (s.book_id, int(s.start_time.timestamp()), s.duration_minutes,
+             int(s.end_time.timestamp()), s.pages_read)
+            for s in rows
+        ])
+        return loader
+
+    def test_only_unchanged_sessions_are_dropped(self):
+        """Test: Known identical rows are dropped; new and extended sessions are still sent"""
+        loaded = [self._session(1, 0), self._session(1, 20), self._session(2, 0)]
+        keys = SessionKeySet(self.path, 'neon/bookhelper', self.logger)
+        keys.sync(self._loader(loaded), 'boox')
+
+        extended = self._session(1, 20, duration=9, pages=6)
+        new = self._session(2, 40)
+        sent = list(keys.filter('boox', [loaded[0], extended, loaded[2], new]))
+
+        self.assertEqual(sent, [extended, new])
+        self.assertEqual(keys.counts['boox'], {'new': 1, 'changed': 1, 'unchanged': 2})
+        # Another device's rows are never matched against this device's keys
+        self.assertEqual(len(list(keys.filter('kindle', loaded))), 3)
+
+    def test_commit_persists_sent_sessions(self):
+        """Test: After a successful load the next run knows every sent row, from the file"""
+        keys = SessionKeySet(self.path, 'neon/bookhelper', self.logger)
+        first = [self._session(1, 0), self._session(1, 20)]
+        list(keys.filter('boox', first))
+        keys.commit('boox')
+
+        keys = SessionKeySet(self.path, 'neon/bookhelper', self.logger)
+        extended = self._session(1, 20, duration=9)
+        sent = list(keys.filter('boox', first[:1] + [extended, self._session(3, 0)]))
+        self.assertEqual(len(sent), 2)
+        self.assertEqual(keys.counts['boox'], {'new': 1, 'changed': 1, 'unchanged': 1})
+
+        keys.commit('boox')
+        keys = SessionKeySet(self.path, 'neon/bookhelper', self.logger)
+        self.assertEqual(list(keys.filter('boox', [extended])), [])
+        self.assertEqual(SessionKeySet(self.path, 'neon/other', self.logger).keys, {})
+
+    def test_sync_reloads_only_when_unknown_or_forced(self):
+        """Test: Stored keys cost no query; an unknown device or `reload` loads them through the loader"""
+        loaded = [self._session(1, 0), self._session(2, 0)]
+        keys = SessionKeySet(self.path, 'neon/bookhelper', self.logger)
+        list(keys.filter('boox', loaded))
+        keys.commit('boox')
+
+        loader = self._loader(loaded)
+        self.assertTrue(keys.sync(loader, 'boox'))
+        loader._with_reconnect.assert_not_called()
+        loader.cursor.execute.assert_not_called()
+
+        # One row was deleted in Neon.tech by hand: --force reloads, so it is sent again
+        loader = self._loader(loaded[:1])
+        self.assertTrue(keys.sync(loader, 'boox', reload=True))
+        self.assertEqual(list(keys.filter('boox', loaded)), loaded[1:])
+        loader._commit.assert_called_once()
+        loader.conn.commit.assert_not_called()
+
+        self.assertTrue(keys.sync(self._loader(loaded), 'kindle'))
+        self.assertTrue(keys.known('kindle'))
+
+    def test_dry_run_counts_without_writing(self):
+        """Test: A read-only set reports new rows exactly and never writes the file"""
+        keys = SessionKeySet(self.path, 'neon/bookhelper', self.logger)
+        list(keys.filter('boox', [self._session(1, 0)]))
+        keys.commit('boox')
+
+        dry = SessionKeySet(self.path, 'neon/bookhelper', self.logger, read_only=True)
+        list(dry.filter('boox', [self._session(1, 0), self._session(1, 30)]))
+        dry.commit('boox')
+
+        self.assertTrue(dry.known('boox'))
+        self.assertEqual(dry.counts['boox']['new'], 1)
+        self.assertEqual(len(SessionKeySet(self.path, 'neon/bookhelper', self.logger).keys['boox'][0]), 1)
+
+
+@unittest.skipUnless(pyarrow, "pyarrow not installed")
+class TestColumnarCache(unittest.TestCase):
+    """Local Parquet cache of page stats and sessions, partitioned by device and month"""
+
+    def setUp(self):
+        self.logger = MagicMock()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = self.temp_dir.name
+        extractor = KOReaderExtractor(str(BUNDLED_STATISTICS_DB), self.logger, snapshot='none')
+        extractor.connect()
+        self.koreader_books = extractor.extract_books()
+        self.page_stats = extractor.extract_page_stat_data()
+        extractor.disconnect()
+        transformer = DataTransformer('boox', self.logger)
+        self.books = transformer.transform_books(self.koreader_books)
+        aggregated = SessionAggregator(30, self.logger).aggregate(
+            self.page_stats, book_page_counts(self.koreader_books)
+        )
+        self.sessions = transformer.transform_sessions(aggregated, self.koreader_books)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_partitions_and_reads_back(self):
+        """Test: Tables are written per device and month and read back with partition columns"""
+        cache = ColumnarCache(self.path, self.logger)
+        self.assertTrue(cache.update('boox', self.koreader_books, self.books, self.sessions, self.page_stats))
+
+        page_stats = read_columnar_cache(self.path, 'page_stats')
+        sessions = read_columnar_cache(self.path, 'sessions')
+        self.assertEqual(page_stats.num_rows, len(self.page_stats))
+        self.assertEqual(sessions.num_rows, len(self.sessions))
+        self.assertEqual(read_columnar_cache(self.path, 'books').num_rows, len(self.books))
+        self.assertEqual(set(page_stats['device'].to_pylist()), {'boox'})
+        self.assertEqual(sorted(int(start.timestamp()) for start in page_stats['start_time'].to_pylist()),
+                         sorted(self.page_stats.start_time))
+        months = {start.strftime('%Y-%m') for start in (s.start_time for s in self.sessions)}
+        self.assertEqual(set(sessions['month'].to_pylist()), months)
+        self.assertEqual(cache.cursor('boox'), max(self.page_stats.start_time))
+        md5 = {book['id']: book['md5'] for book in self.koreader_books}
+        row = page_stats.filter(pyarrow.compute.equal(page_stats['page'], self.page_stats[0].page)).slice(0, 1)
+        self.assertIn(row['file_hash'][0].as_py(), md5.values())
+
+    def test_incremental_append_and_session_replacement(self):
+        """Test: Only rows past the cache cursor are appended; re-sent sessions replace cached ones"""
+        cutoff = sorted(self.page_stats.start_time)[len(self.page_stats) // 2]
+        older = PageStatColumns()
+        older.extend([tuple(row) for row in self.page_stats if row.start_time <= cutoff])
+        cache = ColumnarCache(self.path, self.logger)
+        cache.update('boox', self.koreader_books, self.books, self.sessions[:-1], older)
+        self.assertEqual(cache.page_stats_written, len(older))
+
+        # The next run re-reads everything: only the newer half is appended
+        longer = self.sessions[-1]._replace(duration_minutes=self.sessions[-1].duration_minutes + 60)
+        cache.update('boox', self.koreader_books, self.books, self.sessions[-2:-1] + [longer], self.page_stats)
+        self.assertEqual(cache.page_stats_written, len(self.page_stats) - len(older))
+        cache.update('boox', self.koreader_books, self.books, [self.sessions[-1]], self.page_stats)
+        self.assertEqual(cache.page_stats_written, 0)
+
+        page_stats = read_columnar_cache(self.path, 'page_stats')
+        sessions = read_columnar_cache(self.path, 'sessions')
+        self.assertEqual(page_stats.num_rows, len(self.page_stats))
+        self.assertEqual(sessions.num_rows, len(self.sessions))
+        self.assertEqual(sum(sessions['duration_minutes'].to_pylist()),
+                         sum(session.duration_minutes for session in self.sessions))
+
+
+class TestOutbox(unittest.TestCase):
+    """Local durable outbox drained into Neon.tech by a flusher"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.logger = MagicMock()
+        self.outbox = Outbox(os.path.join(self.tmpdir.name, 'etl', 'outbox.sqlite3'), self.logger)
+        self.assertTrue(self.outbox.open())
+        self.resolver = BookIdResolver(
+            os.path.join(self.tmpdir.name, 'etl', 'book_ids.json'), 'neon/bookhelper', self.logger
+        )
+        self.book = {
+            'title': 'Book One', 'file_hash': 'md5-one', 'page_count': 300, 'language': 'en',
+            'notes': 0, 'highlights': 2, 'source': 'koreader',
+            'device_stats_source': 'statistics.sqlite3', 'series_name': None, 'series_number': None,
+        }
+        self.sessions = [
+            ReadingSessionRecord(
+                7, datetime(2025, 10, 1, 12, minute, tzinfo=timezone.utc), 5, 3, 'boox', 'ebook',
+                'koreader', 'statistics.sqlite3', f'uuid-{minute}', 1, False
+            )
+            for minute in range(5)
+        ]
+
+    def tearDown(self):
+        self.outbox.close()
+        self.tmpdir.cleanup()
+
+    def _loader(self):
+        loader = NeonLoader(self.logger)
+        loader.load_books = MagicMock(side_effect=lambda books: len(books))
+        loader.load_reading_sessions = MagicMock(side_effect=lambda sessions: len(sessions))
+        loader.update_sync_status = MagicMock(return_value=True)
+        return loader
+
+    def test_spooled_rows_round_trip(self):
+        """Test: Books and sessions read back from the outbox equal what was spooled"""
+        run_id = self.outbox.enqueue('boox', [self.book], self.sessions, 1730000000, 5, 'incremental')
+
+        self.assertEqual(self.outbox.pending_counts(), {'runs': 1, 'books': 1, 'sessions': 5})
+        (_, books), = self.outbox.iter_pending_books(run_id, 100)
+        self.assertEqual(books, [self.book])
+        batches = list(self.outbox.iter_pending_sessions(run_id, 2))
+        self.assertEqual([len(ids) for ids, _ in batches], [2, 2, 1])
+        self.assertEqual([s for _, sessions in batches for s in sessions], self.sessions)
+        self.assertEqual(self.outbox.latest_cursor('boox'), 1730000000)
+        self.assertIsNone(self.outbox.latest_cursor('kobo'))
+
+    def test_flush_delivers_runs_and_advances_cursor(self):
+        """Test: A flush loads every pending run, marks it delivered and updates sync_status"""
+        self.outbox.enqueue('boox', [self.book], self.sessions, 1730000000, 5, 'incremental')
+        self.outbox.enqueue('boox', [self.book], self.sessions[:2], 1730000600, 2, 'incremental')
+        loader = self._loader()
+
+        totals = flush_outbox(self.outbox, loader, self.logger, self.resolver, batch_size=3)
+
+        self.assertEqual(totals['runs'], 2)
+        self.assertEqual(totals['sessions_inserted'], 7)
+        self.assertEqual([c.args[1] for c in loader.update_sync_status.call_args_list],
+                         [1730000000, 1730000600])
+        self.assertEqual(self.outbox.pending_counts(), {'runs': 0, 'books': 0, 'sessions': 0})
+
+    def test_flush_skips_known_sessions(self):
+        """Test: A flush sends only sessions not already in Neon.tech and commits their keys once delivered"""
+        path = os.path.join(self.tmpdir.name, 'etl', 'session_keys.bin')
+        keys = SessionKeySet(path, 'neon/bookhelper', self.logger)
+        list(keys.filter('boox', self.sessions[:3]))
+        keys.commit('boox')
+        self.outbox.enqueue('boox', [self.book], self.sessions, 1730000000, 5, 'incremental')
+        loader = self._loader()
+
+        totals = flush_outbox(self.outbox, loader, self.logger, self.resolver, batch_size=2,
+                              known_sessions=keys)
+
+        sent = [s for c in loader.load_reading_sessions.call_args_list for s in c.args[0]]
+        self.assertEqual(sent, self.sessions[3:])
+        self.assertEqual(totals['sessions_known_skipped'], 3)
+        self.assertEqual(self.outbox.pending_counts(), {'runs': 0, 'books': 0, 'sessions': 0})
+        reloaded = SessionKeySet(path, 'neon/bookhelper', self.logger)
+        self.assertEqual(list(reloaded.filter('boox', self.sessions)), [])
+
+    def test_failed_batch_stays_pending(self):
+        """Test: A failed load stops the flush and keeps undelivered rows for the next one"""
+        self.outbox.enqueue('boox', [self.book], self.sessions, 1730000000, 5, 'incremental')
+        loader = self._loader()
+
+        def fail_second_batch(sessions):
+            if loader.load_reading_sessions.call_count == 2:
+                loader.load_errors += 1
+                return 0
+            return len(sessions)
+        loader.load_reading_sessions.side_effect = fail_second_batch
+
+        totals = flush_outbox(self.outbox, loader, self.logger, self.resolver, batch_size=2)
+
+        self.assertEqual(totals['failed'], 1)
+        loader.update_sync_status.assert_not_called()
+        self.assertEqual(self.outbox.pending_counts(), {'runs': 1, 'books': 0, 'sessions': 3})
+
+        retry = flush_outbox(self.outbox, self._loader(), self.logger, self.resolver, batch_size=2)
+        self.assertEqual(retry['sessions_inserted'], 3)
+        self.assertEqual(self.outbox.pending_counts()['runs'], 0)
+
+    def test_failed_sync_status_rolls_back_transaction(self):
+        """Test: In a run transaction a failed sync_status row is an error; the run rolls back and stays pending"""
+        import psycopg2
+        self.outbox.enqueue('boox', [self.book], self.sessions, 1730000000, 5, 'incremental')
+        loader = NeonLoader(self.logger)
+        loader.conn = MagicMock()
+        loader.conn.closed = 0
+        loader.cursor = MagicMock()
+        loader.load_books_prepared = MagicMock(side_effect=lambda books: len(books))
+        loader.load_reading_sessions_prepared = MagicMock(side_effect=lambda sessions, batch_size: len(sessions))
+
+        def execute(sql, *args):
+            if 'sync_status' in sql:
+                raise psycopg2.OperationalError('canceling statement due to statement timeout')
+        loader.cursor.execute.side_effect = execute
+
+        totals = flush_outbox(self.outbox, loader, self.logger, self.resolver, batch_size=10,
+                              load_method='transaction')
+
+        self.assertEqual(totals['failed'], 1)
+        self.assertEqual(loader.load_errors, 1)
+        loader.conn.commit.assert_not_called()
+        loader.conn.rollback.assert_called_once()
+        self.assertEqual(self.outbox.pending_counts(), {'runs': 1, 'books': 1, 'sessions': 5})
+
+    def test_spool_and_flush_keeps_connection_and_reports_failure(self):
+        """Test: An --outbox run leaves a kept connection open and fails when a pending run fails to load"""
+        loader = self._loader()
+        loader.conn = MagicMock()
+        loader.disconnect = MagicMock()
+        aggregator = SessionAggregator(30, self.logger)
+        fingerprints = FingerprintStore(os.path.join(self.tmpdir.name, 'fingerprints.json'), self.logger)
+
+        for failed, keep_connection in ((0, True), (1, True), (1, False)):
+            totals = {'runs': 1 - failed, 'books_inserted': 0, 'sessions_inserted': 0,
+                      'sessions_known_skipped': 0, 'failed': failed}
+            with self.subTest(failed=failed, keep_connection=keep_connection), \
+                    patch('extract_koreader_stats.flush_outbox', return_value=totals), \
+                    patch.object(Config, 'METRICS_PATH', os.path.join(self.tmpdir.name, 'metrics.json')):
+                loader.disconnect.reset_mock()
+                self.assertTrue(self.outbox.open())
+                succeeded = _spool_and_flush(
+                    self.outbox, loader, self.logger, [self.book], self.sessions, aggregator, None,
+                    'incremental', 'insert', fingerprints, None, RunMetrics('boox'), keep_connection
+                )
+                self.assertEqual(succeeded, not failed)
+                self.assertEqual(loader.disconnect.called, not keep_connection)
+
+    def test_book_ids_bound_at_flush(self):
+        """Test: Sessions spooled by file_hash get Neon.tech book_ids after their books load"""
+        deferred = [session._replace(book_id=None, file_hash='md5-one') for session in self.sessions]
+        self.outbox.enqueue('boox', [self.book], deferred, 1730000000, 5, 'incremental')
+        loader = self._loader()
+        loader.fetch_book_ids = MagicMock(return_value={'md5-one': 42})
+
+        flush_outbox(self.outbox, loader, self.logger, self.resolver, batch_size=10)
+
+        loader.fetch_book_ids.assert_called_once_with(['md5-one'])
+        (loaded,), _ = loader.load_reading_sessions.call_args
+        self.assertEqual({session.book_id for session in loaded}, {42})
+
+
+class TestMultiDeviceETL(unittest.TestCase):
+    """Parallel ETL over a manifest of per-device backups"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.manifest = Path(self.temp_dir.name) / 'devices.json'
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write_manifest(self, entries):
+        self.manifest.write_text(json.dumps(entries))
+        return str(self.manifest)
+
+    def test_manifest_parsing(self):
+        """Test: Manifest entries become (device_id, backup) pairs in order"""
+        devices = load_device_manifest(self._write_manifest([
+            {'device_id': 'boox', 'backup': '/backups/boox/statistics.sqlite3'},
+            {'device_id': 'kobo', 'backup': '/backups/kobo/statistics.sqlite3'},
+        ]))
+
+        self.assertEqual(devices, [
+            ('boox', '/backups/boox/statistics.sqlite3'),
+            ('kobo', '/backups/kobo/statistics.sqlite3'),
+        ])
+
+    def test_invalid_manifests_rejected(self):
+        """Test: Empty lists, missing keys and duplicate devices raise ValueError"""
+        for entries in ([], {'device_id': 'boox'}, [{'device_id': 'boox'}],
+                        [{'device_id': 'a', 'backup': 'x'}, {'device_id': 'a', 'backup': 'y'}]):
+            with self.subTest(entries=entries):
+                with self.assertRaises(ValueError):
+                    load_device_manifest(self._write_manifest(entries))
+
+    def test_prepare_device_on_bundled_db(self):
+        """Test: A worker returns picklable books, sessions and its high-water mark"""
+        import pickle
+        result = _prepare_device('boox', str(BUNDLED_STATISTICS_DB), 30, 'python', None)
+
+        self.assertIsNone(result['error'])
+        self.assertGreater(result['books_extracted'], 0)
+        self.assertGreater(result['aggregated'], 0)
+        self.assertIsNotNone(result['high_water_mark'])
+        self.assertEqual(pickle.loads(pickle.dumps(result))['records'], result['records'])
+
+    def test_prepare_device_missing_backup(self):
+        """Test: A missing backup is reported as an error, not raised"""
+        result = _prepare_device('kobo', str(Path(self.temp_dir.name) / 'missing.sqlite3'),
+                                 30, 'python', None)
+
+        self.assertIn('backup not found', result['error'])
+        self.assertFalse((Path(self.temp_dir.name) / 'missing.sqlite3').exists())
+
+
+class TestStartup(unittest.TestCase):
+    """Heavy dependencies load only when the stage that needs them runs"""
+
+    SCRIPTS_DIR = Path(__file__).parent.parent / 'resources' / 'scripts'
+    DEFERRED = ('psycopg2', 'numpy', 'pyarrow', 'requests', 'dotenv')
+
+    def _loaded_after(self, code):
+        import subprocess
+        probe = (f"import json, sys\n{code}\n"
+                 f"print(json.dumps(sorted({{m.split('.')[0] for m in sys.modules}} & set({self.DEFERRED!r}))))")
+        completed = subprocess.run([sys.executable, '-c', probe], cwd=self.SCRIPTS_DIR,
+                                   capture_output=True, text=True, timeout=60)
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        return json.loads(completed.stdout.splitlines()[-1])
+
+    def test_imports_defer_heavy_modules(self):
+        """Test: Importing either ETL script loads no database, HTTP or array library"""
+        self.assertEqual(self._loaded_after("import extract_koreader_stats, enrich_hardcover_metadata"), [])
+
+    def test_help_defers_heavy_modules(self):
+        """Test: --help exits without loading psycopg2, numpy or pyarrow"""
+        code = ("import extract_koreader_stats\n"
+                "sys.argv = ['extract_koreader_stats.py', '--help']\n"
+                "try:\n    extract_koreader_stats.main()\nexcept SystemExit:\n    pass")
+        self.assertEqual(self._loaded_after(code), [])
+
+    def test_lazy_module_loads_on_first_use(self):
+        """Test: Attribute access imports the module; a missing module fails up front"""
+        from etl_imports import LazyModule
+        self.assertEqual(LazyModule('json').dumps([1]), '[1]')
+        with self.assertRaises(ImportError):
+            LazyModule('no_such_module_for_etl')
+
+
 # ============================================================================
 # Test Execution Helpers
 # ============================================================================